@@ -0,0 +1,59 @@
+"""
+KOT のレスポンスの dict のまま保持した場合と、components.records のレコードに変換した場合のメモリ使用量を比べる
+
+$ poetry run python -m benchmark.compact_records --employees 1000 --days 60
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from components.records import compact_daily_schedules, compact_daily_workings
+
+from .payloads import generate_daily_schedules, generate_daily_workings
+
+
+def _measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        retained = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del retained
+    return size
+
+
+def run(employees: int, days: int) -> dict:
+    workings_json = json.dumps(generate_daily_workings(employees, days), ensure_ascii=False)
+    schedules_json = json.dumps(generate_daily_schedules(employees, days), ensure_ascii=False)
+
+    raw = _measure(lambda: (json.loads(workings_json), json.loads(schedules_json)))
+    compact = _measure(
+        lambda: (
+            [compact_daily_workings(daily_data) for daily_data in json.loads(workings_json)],
+            [compact_daily_schedules(daily_schedule) for daily_schedule in json.loads(schedules_json)],
+        )
+    )
+    return {
+        "employees": employees,
+        "days": days,
+        "raw_bytes": raw,
+        "compact_bytes": compact,
+        "saved_ratio": round(1 - compact / raw, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.employees, args.days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+
+def percentile(sorted_values: list, ratio: float) -> float:
+    """昇順に並んだ値から、線形補間でパーセンタイルを求める"""
+    if not sorted_values:
+        return 0.0
+    index = (len(sorted_values) - 1) * ratio
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (index - lower)
+
+
+def measure(name: str, fn, iterations: int, warmup: int = 1, ops_per_call: int = 1) -> dict:
+    """
+    fn を繰り返し実行して、レイテンシのパーセンタイル・スループット・ピークメモリを計測する
+
+    時間の計測とメモリの計測は、tracemalloc のオーバーヘッドが時間に影響しないように別々に実行する
+
+    Args:
+        ops_per_call: fn の1回の呼び出しで処理する件数（スループットの計算に使う）
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        call_started_at = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started_at)
+    elapsed = time.perf_counter() - started_at
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_call": ops_per_call,
+        "throughput_ops_per_sec": round(iterations * ops_per_call / elapsed, 3) if elapsed > 0 else None,
+        "latency_ms": latency_summary(latencies),
+        "peak_memory_bytes": peak,
+    }
+
+
+def latency_summary(latencies: list) -> dict:
+    """秒単位のレイテンシのリストから、ミリ秒単位の最小・パーセンタイル・最大・平均を求める"""
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    return {
+        "min": round(latencies[0] * 1000, 4),
+        "p50": round(percentile(latencies, 0.5) * 1000, 4),
+        "p90": round(percentile(latencies, 0.9) * 1000, 4),
+        "p99": round(percentile(latencies, 0.99) * 1000, 4),
+        "max": round(latencies[-1] * 1000, 4),
+        "mean": round(sum(latencies) / len(latencies) * 1000, 4),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """結果を比較するときに必要な実行環境の情報"""
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def save(results: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """
+    同じ名前のベンチマークについて、ベースラインからの変化率を返す
+
+    Returns:
+        list: [{"name": ..., "p50_ratio": 1.05, "throughput_ratio": 0.95, "peak_memory_ratio": 1.0}]
+    """
+    baseline_by_name = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        base = baseline_by_name.get(result["name"])
+        if base is None:
+            continue
+        rows.append(
+            {
+                "name": result["name"],
+                "p50_ratio": _ratio(result["latency_ms"]["p50"], base["latency_ms"]["p50"]),
+                "p99_ratio": _ratio(result["latency_ms"]["p99"], base["latency_ms"]["p99"]),
+                "throughput_ratio": _ratio(result["throughput_ops_per_sec"], base["throughput_ops_per_sec"]),
+                "peak_memory_ratio": _ratio(result["peak_memory_bytes"], base["peak_memory_bytes"]),
+            }
+        )
+    return rows
+
+
+def _ratio(value, base):
+    if not value or not base:
+        return None
+    return round(value / base, 3)
@@ -0,0 +1,420 @@
+"""
+朝の出勤ラッシュを再現して、打刻のレイテンシと KOT API・Slack API の呼び出し回数を計測する負荷試験
+
+KOT API はモックサーバー（benchmark.mock_kot_server）、Slack API は localhost:8888 のモックサーバーに置き換え、
+create_app() で作った bot に「おはー」のメッセージと /clock-in コマンドを 9:00 前後に集中する間隔で送る。
+KOT API の制限時間帯（08:30 ～ 10:00）は、打刻を KOT API に送る経路を計測するために無効にする
+
+$ poetry run python -m benchmark.load_test --users 300 --burst-minutes 20 --speedup 60 \
+    --kot-latency-ms 300 --kot-rate-limit 10 --output load_test.json
+
+計測する項目
+- punch_latency_ms: メッセージ・コマンドが届いてから、打刻の応答が Slack に投稿されるまでの時間
+- kot.calls_per_punch: 打刻1件あたりの KOT API の呼び出し回数（打刻後の勤怠エラーチェックを含む）
+- slack.messages_per_punch: 打刻1件あたりの Slack へのメッセージの投稿数（勤怠エラーの通知を含む）
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
+
+from slack_bolt import BoltRequest
+
+from components import requester
+from components.deferred import get_deferred_executor
+from components.rate_limiter import RateLimiter
+from components.repo import Employee
+from components.requester import KOTRequester, get_rate_limiter, get_retry_budget, get_session_pool
+from components.strategy.local_file_data_strategy import LocalFileDataStrategy
+from components.usecase import get_employee_directory, get_single_flight_stats
+from handler.jp import helper
+from handler.jp.timecard_check import invalidate_error_map_cache
+from run import create_app
+
+from .harness import environment, latency_summary, save
+from .mock_kot_server import MockKOTServer
+
+# create_app(is_test=True) の WebClient の接続先
+SLACK_API_PORT = 8888
+CLOCK_IN_MESSAGES = ["おはー", "おはー", "おはー", "おはー！", "おはー!?"]
+CLOCK_IN_RESPONSE = "だこくしたよ"
+
+
+class MockSlackServer(ThreadingHTTPServer):
+    """chat.postMessage で投稿されたメッセージを、チャンネルごとに受信時刻とともに記録する Slack API のモックサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "localhost", port: int = SLACK_API_PORT):
+        super().__init__((host, port), _MockSlackHandler)
+        self._lock = threading.Condition()
+        self._messages = {}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), name="mock-slack-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def record(self, channel: str, text: str):
+        with self._lock:
+            self._messages.setdefault(channel, []).append((time.perf_counter(), text))
+            self._lock.notify_all()
+
+    def messages(self) -> dict:
+        """{チャンネル: [(受信時刻, テキスト)]}"""
+        with self._lock:
+            return {channel: list(messages) for channel, messages in self._messages.items()}
+
+    def wait_for_channels(self, channels, timeout: float) -> bool:
+        """全てのチャンネルに1件以上メッセージが投稿されるまで待つ"""
+        with self._lock:
+            return self._lock.wait_for(lambda: all(channel in self._messages for channel in channels), timeout=timeout)
+
+    def reset(self):
+        with self._lock:
+            self._messages = {}
+
+
+class _MockSlackHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockSlackServer
+
+    auth_test_response = {
+        "ok": True,
+        "url": "https://subarachnoid.slack.com/",
+        "team": "Subarachnoid Workspace",
+        "user": "bot",
+        "team_id": "T0G9PQBBK",
+        "user_id": "W23456789",
+        "bot_id": "BZYBOTHED",
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        params = json.loads(body) if body.startswith("{") else {k: v[0] for k, v in parse_qs(body).items()}
+
+        if self.path == "/auth.test":
+            response = self.auth_test_response
+        else:
+            if self.path == "/chat.postMessage":
+                self.server.record(params.get("channel"), params.get("text"))
+            response = {"ok": True}
+
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+
+def burst_offsets(users: int, burst_minutes: float, speedup: float, seed: int = 0) -> list:
+    """
+    9:00 を中心に正規分布で集中する打刻の到着時刻を、試験開始からの実時間の秒数で返す
+
+    burst_minutes 分の範囲（9:00 の前後 burst_minutes / 2 分）に収め、speedup 倍に縮めた時間で再現する
+    """
+    rng = random.Random(seed)
+    half_window = burst_minutes * 60 / 2
+    offsets = []
+    for _ in range(users):
+        offset = min(max(rng.gauss(0, half_window / 2), -half_window), half_window)
+        offsets.append((offset + half_window) / speedup)
+    return sorted(offsets)
+
+
+def _user_id(i: int) -> str:
+    return f"ULOAD{i:04d}"
+
+
+def _channel_id(i: int) -> str:
+    # 打刻の応答を打刻ごとに区別できるように、ユーザーごとに別のチャンネル（DM）から送る
+    return f"DLOAD{i:04d}"
+
+
+def _message_request(i: int, text: str) -> BoltRequest:
+    now = datetime.now()
+    ts = f"{int(now.timestamp())}.{now.strftime('%f')}"
+    body = {
+        "team_id": "T111",
+        "api_app_id": "A111",
+        "event": {
+            "type": "message",
+            "text": text,
+            "user": _user_id(i),
+            "ts": ts,
+            "team": "T111",
+            "channel": _channel_id(i),
+            "event_ts": ts,
+        },
+        "type": "event_callback",
+        "event_id": f"EvLOAD{i:04d}",
+        "event_time": int(now.timestamp()),
+    }
+    return BoltRequest(body=body, mode="socket_mode")
+
+
+def _command_request(i: int, command: str) -> BoltRequest:
+    body = {
+        "team_id": "T111",
+        "team_domain": "test-domain",
+        "channel_id": _channel_id(i),
+        "channel_name": "directmessage",
+        "user_id": _user_id(i),
+        "user_name": f"user-{i:04d}",
+        "command": command,
+        "text": "",
+        "api_app_id": "A111",
+        "response_url": "https://hooks.slack.com/commands/T111/111/xxxxx",
+        "trigger_id": "111.111.xxx",
+    }
+    return BoltRequest(body=body, mode="socket_mode")
+
+
+def _count_succeeded(messages: dict) -> int:
+    return sum(1 for channel_messages in messages.values() if CLOCK_IN_RESPONSE in (channel_messages[0][1] or ""))
+
+
+def _wait_for_deferred_jobs(submitted: int, timeout: float):
+    executor = get_deferred_executor()
+    deadline = time.monotonic() + timeout
+    while executor.stats()["submitted"] + executor.stats()["rejected"] < submitted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    executor.wait_until_idle(timeout=max(deadline - time.monotonic(), 0))
+
+
+def _reset_caches():
+    Employee.clear_cache()
+    invalidate_error_map_cache()
+    get_employee_directory().clear()
+    get_session_pool().close()
+    get_retry_budget().reset()
+
+
+def run(
+    users: int,
+    burst_minutes: float,
+    speedup: float,
+    command_ratio: float = 0.3,
+    concurrency: int = 10,
+    kot_latency_ms: float = 0,
+    kot_latency_jitter_ms: float = 0,
+    kot_error_rate: float = 0,
+    kot_rate_limit: float = 0,
+    kot_rate_limit_burst: int = 10,
+    client_rate_limit: float = None,
+    client_rate_limit_burst: float = 10,
+    client_rate_limit_reserved: float = 2,
+    timeout: float = 60,
+    seed: int = 0,
+) -> dict:
+    rng = random.Random(seed)
+    offsets = burst_offsets(users, burst_minutes, speedup, seed=seed)
+    # 到着順にユーザーを割り当て、一部の人は /clock-in コマンドで打刻する
+    punches = [
+        (offset, i, "command" if rng.random() < command_ratio else "message") for i, offset in enumerate(offsets)
+    ]
+
+    kot_server = MockKOTServer(
+        employees=users,
+        latency_ms=kot_latency_ms,
+        latency_jitter_ms=kot_latency_jitter_ms,
+        error_rate=kot_error_rate,
+        rate_limit=kot_rate_limit,
+        rate_limit_burst=kot_rate_limit_burst,
+        seed=seed,
+    )
+    slack_server = MockSlackServer()
+
+    with ExitStack() as stack:
+        kot_server.start()
+        stack.callback(kot_server.stop)
+        slack_server.start()
+        stack.callback(slack_server.stop)
+
+        data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(mock.patch.object(KOTRequester, "KOT_API_BASE_URL", kot_server.url))
+        stack.enter_context(mock.patch.object(helper, "KOT_API_RESTRICTED_TIME_RANGES", []))
+        if client_rate_limit is not None:
+            # 指定しない場合は環境変数（KOT_RATE_LIMIT_PER_SECOND など）で設定したレート制限を使う
+            rate_limiter = RateLimiter(
+                rate=client_rate_limit, burst=client_rate_limit_burst, reserved=client_rate_limit_reserved
+            )
+            stack.enter_context(mock.patch.object(requester, "_rate_limiter", rate_limiter))
+        stack.enter_context(mock.patch.dict(os.environ, {"DATA_STRATEGY": "LocalFileDataStrategy"}))
+        stack.enter_context(mock.patch.object(LocalFileDataStrategy, "DATA_DIR", data_dir))
+        stack.enter_context(
+            mock.patch.object(LocalFileDataStrategy, "DATA_JSON", os.path.join(data_dir, "employee_data.json"))
+        )
+        _reset_caches()
+        stack.callback(_reset_caches)
+        LocalFileDataStrategy().write({_user_id(i): f"key-{i:04d}" for i in range(users)})
+
+        app = create_app(is_test=True)
+        slack_server.reset()
+        kot_server.reset_stats()
+
+        deferred_jobs_before = get_deferred_executor().stats()["submitted"]
+        arrived_at = {}
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load-test") as executor:
+            for offset, i, kind in punches:
+                delay = started_at + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if kind == "command":
+                    request = _command_request(i, "/clock-in")
+                else:
+                    request = _message_request(i, rng.choice(CLOCK_IN_MESSAGES))
+                arrived_at[_channel_id(i)] = time.perf_counter()
+                executor.submit(app.dispatch, request)
+
+        completed = slack_server.wait_for_channels(arrived_at.keys(), timeout=timeout)
+        finished_at = time.perf_counter()
+        messages = slack_server.messages()
+        # 打刻に成功すると打刻後の勤怠エラーチェックが登録されるので、全て登録されて終わるまで待ってから呼び出し回数を集計する
+        _wait_for_deferred_jobs(deferred_jobs_before + _count_succeeded(messages), timeout)
+
+        messages = slack_server.messages()
+        kot_stats = kot_server.stats()
+        session_pool_stats = get_session_pool().stats()
+        retry_budget_stats = get_retry_budget().stats()
+        rate_limiter_stats = get_rate_limiter().stats()
+
+    latencies = []
+    succeeded = failed = unanswered = 0
+    for channel, punch_arrived_at in arrived_at.items():
+        channel_messages = messages.get(channel)
+        if not channel_messages:
+            unanswered += 1
+            continue
+        responded_at, text = channel_messages[0]
+        latencies.append(responded_at - punch_arrived_at)
+        if CLOCK_IN_RESPONSE in (text or ""):
+            succeeded += 1
+        else:
+            failed += 1
+
+    slack_messages = sum(len(channel_messages) for channel_messages in messages.values())
+    elapsed = finished_at - started_at
+    return {
+        "environment": environment(),
+        "parameters": {
+            "users": users,
+            "burst_minutes": burst_minutes,
+            "speedup": speedup,
+            "command_ratio": command_ratio,
+            "concurrency": concurrency,
+            "kot_latency_ms": kot_latency_ms,
+            "kot_latency_jitter_ms": kot_latency_jitter_ms,
+            "kot_error_rate": kot_error_rate,
+            "kot_rate_limit": kot_rate_limit,
+            "kot_rate_limit_burst": kot_rate_limit_burst,
+            "client_rate_limit": client_rate_limit,
+            "client_rate_limit_burst": client_rate_limit_burst,
+            "client_rate_limit_reserved": client_rate_limit_reserved,
+            "seed": seed,
+        },
+        "punches": {
+            "total": len(punches),
+            "messages": sum(1 for _, _, kind in punches if kind == "message"),
+            "commands": sum(1 for _, _, kind in punches if kind == "command"),
+            "succeeded": succeeded,
+            "failed": failed,
+            "unanswered": unanswered,
+            "completed": completed,
+        },
+        "punch_latency_ms": latency_summary(latencies),
+        "throughput_punches_per_sec": round(len(latencies) / elapsed, 3) if elapsed > 0 else None,
+        "kot": {
+            **kot_stats,
+            "calls_per_punch": round(kot_stats["calls"] / len(punches), 3) if punches else None,
+            "requests_sent": session_pool_stats["requests"],
+            "connections": session_pool_stats["connections"],
+            "retry_budget": retry_budget_stats,
+            "rate_limiter": rate_limiter_stats,
+        },
+        "slack": {
+            "messages": slack_messages,
+            "messages_per_punch": round(slack_messages / len(punches), 3) if punches else None,
+        },
+        "deferred_jobs": get_deferred_executor().stats(),
+        "single_flight": get_single_flight_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--burst-minutes", type=float, default=20, help="9:00 を中心に打刻が集中する時間の幅（分）")
+    parser.add_argument("--speedup", type=float, default=60, help="時間を何倍に縮めて再現するか")
+    parser.add_argument("--command-ratio", type=float, default=0.3, help="/clock-in コマンドで打刻する人の割合")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="同時に処理するイベント数（SocketModeHandler と同じ）"
+    )
+    parser.add_argument("--kot-latency-ms", type=float, default=300)
+    parser.add_argument("--kot-latency-jitter-ms", type=float, default=100)
+    parser.add_argument("--kot-error-rate", type=float, default=0)
+    parser.add_argument("--kot-rate-limit", type=float, default=0, help="KOT API が1秒あたりに受け付けるリクエスト数")
+    parser.add_argument("--kot-rate-limit-burst", type=int, default=10)
+    parser.add_argument(
+        "--client-rate-limit",
+        type=float,
+        help="bot が KOT API に送る1秒あたりのリクエスト数（未指定の場合は環境変数の設定）",
+    )
+    parser.add_argument("--client-rate-limit-burst", type=float, default=10)
+    parser.add_argument("--client-rate-limit-reserved", type=float, default=2)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    results = run(
+        users=args.users,
+        burst_minutes=args.burst_minutes,
+        speedup=args.speedup,
+        command_ratio=args.command_ratio,
+        concurrency=args.concurrency,
+        kot_latency_ms=args.kot_latency_ms,
+        kot_latency_jitter_ms=args.kot_latency_jitter_ms,
+        kot_error_rate=args.kot_error_rate,
+        kot_rate_limit=args.kot_rate_limit,
+        kot_rate_limit_burst=args.kot_rate_limit_burst,
+        client_rate_limit=args.client_rate_limit,
+        client_rate_limit_burst=args.client_rate_limit_burst,
+        client_rate_limit_reserved=args.client_rate_limit_reserved,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    if args.output:
+        save(results, args.output)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
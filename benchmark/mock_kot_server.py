@@ -0,0 +1,268 @@
+"""
+負荷試験用の KOT API のモックサーバー
+
+レスポンスの遅延・エラーの割合・レート制限（429）を設定できる。単体で起動して、bot の接続先にすることもできる
+
+$ poetry run python -m benchmark.mock_kot_server --port 8080 --latency-ms 200 --rate-limit 10
+$ KOT_API_BASE_URL=http://localhost:8080 poetry run python run.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .payloads import generate_active_employees, generate_daily_schedules, generate_daily_workings
+
+
+def _route(method: str, path: str) -> str:
+    """集計用に、パスを従業員キーなどを含まない API の単位にまとめる"""
+    if path.startswith("/daily-workings/timerecord/"):
+        path = "/daily-workings/timerecord/{employeeKey}"
+    elif path.startswith("/employees/"):
+        path = "/employees/{code}"
+    return f"{method} {path}"
+
+
+def _errors(message: str, code: int) -> dict:
+    return {"errors": [{"message": message, "code": code}]}
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class MockKOTServer(ThreadingHTTPServer):
+    """
+    KOT API のモックサーバー
+
+    Args:
+        employees: 従業員数。従業員キーは key-0000 から順番につける（benchmark.payloads と同じ）
+        latency_ms: レスポンスを返すまでの遅延（ミリ秒）。latency_jitter_ms の範囲でばらつかせる
+        error_rate: この割合のリクエストに error_status でエラーを返す
+        rate_limit: 1秒あたりに受け付けるリクエスト数。超えた場合は 429 を返す。0 の場合は制限しない
+        rate_limit_burst: レート制限で、一度に受け付けられるリクエスト数
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 0,
+        employees: int = 100,
+        latency_ms: float = 0,
+        latency_jitter_ms: float = 0,
+        error_rate: float = 0,
+        error_status: int = HTTPStatus.INTERNAL_SERVER_ERROR,
+        rate_limit: float = 0,
+        rate_limit_burst: int = 10,
+        retry_after: int = 1,
+        seed: int = 0,
+    ):
+        super().__init__((host, port), _MockKOTHandler)
+        self.employees = employees
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.seed = seed
+        self._rate_limiter = _TokenBucket(rate_limit, rate_limit_burst) if rate_limit > 0 else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._payloads = {}
+        self._calls = Counter()
+        self._statuses = Counter()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), name="mock-kot-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """
+        受け付けたリクエスト数を返す
+
+        Returns:
+            { "calls": 合計, "by_route": API ごとの件数, "by_status": ステータスコードごとの件数 }
+        """
+        with self._lock:
+            return {
+                "calls": sum(self._calls.values()),
+                "by_route": dict(self._calls),
+                "by_status": {str(status): count for status, count in sorted(self._statuses.items())},
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls.clear()
+            self._statuses.clear()
+
+    def _admit(self, route: str):
+        """
+        リクエストを集計し、レート制限・エラーの注入で返すステータスコードと遅延（秒）を決める
+
+        Returns:
+            (ステータスコード, 遅延)。正常に処理する場合のステータスコードは None
+        """
+        with self._lock:
+            self._calls[route] += 1
+            if self._rate_limiter is not None and not self._rate_limiter.take():
+                status = HTTPStatus.TOO_MANY_REQUESTS
+            elif self.error_rate > 0 and self._random.random() < self.error_rate:
+                status = self.error_status
+            else:
+                status = None
+            delay = self.latency_ms + self._random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        return status, max(delay, 0) / 1000
+
+    def _record_status(self, status: int):
+        with self._lock:
+            self._statuses[int(status)] += 1
+
+    def _daily_payload(self, generate, query: dict) -> bytes:
+        start = date.fromisoformat(query["start"][0])
+        end = date.fromisoformat(query["end"][0])
+        key = (generate.__name__, start, end)
+        with self._lock:
+            payload = self._payloads.get(key)
+        if payload is None:
+            days = (end - start).days + 1
+            payload = json.dumps(generate(self.employees, days, start=start, seed=self.seed)).encode("utf-8")
+            with self._lock:
+                self._payloads[key] = payload
+        return payload
+
+    def employee(self, code: str):
+        if not code.isdigit() or int(code) >= self.employees:
+            return None
+        return generate_active_employees(int(code) + 1)[-1]
+
+
+class _MockKOTHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockKOTServer
+
+    def log_message(self, format, *args):
+        # 負荷試験の出力が埋もれないようにアクセスログは出さない
+        pass
+
+    def _send(self, status: int, body, headers: dict = None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server._record_status(status)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _handle(self, method: str):
+        parsed = urlparse(self.path)
+        route = _route(method, parsed.path)
+        body = self._read_body() if method == "POST" else None
+
+        status, delay = self.server._admit(route)
+        if delay:
+            time.sleep(delay)
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            return self._send(
+                status, _errors("Too Many Requests", 429), headers={"Retry-After": str(self.server.retry_after)}
+            )
+        if status is not None:
+            return self._send(status, _errors("Injected error", int(status)))
+
+        query = parse_qs(parsed.query)
+        if method == "GET" and parsed.path == "/daily-workings":
+            return self._send(HTTPStatus.OK, self.server._daily_payload(generate_daily_workings, query))
+        if method == "GET" and parsed.path == "/daily-schedules":
+            return self._send(HTTPStatus.OK, self.server._daily_payload(generate_daily_schedules, query))
+        if method == "GET" and parsed.path == "/employees":
+            return self._send(HTTPStatus.OK, generate_active_employees(self.server.employees))
+        if method == "GET" and parsed.path.startswith("/employees/"):
+            employee = self.server.employee(parsed.path.rsplit("/", 1)[1])
+            if employee is None:
+                return self._send(HTTPStatus.NOT_FOUND, _errors("従業員が見つかりません", 404))
+            return self._send(HTTPStatus.OK, employee)
+        if method == "POST" and parsed.path.startswith("/daily-workings/timerecord/"):
+            employee_key = parsed.path.rsplit("/", 1)[1]
+            return self._send(HTTPStatus.CREATED, {"employeeKey": employee_key, **body})
+        if method == "POST" and parsed.path == "/daily-workings/timerecord":
+            return self._send(HTTPStatus.CREATED, body)
+        return self._send(HTTPStatus.NOT_FOUND, _errors("Not Found", 404))
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--employees", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0, help="1秒あたりに受け付けるリクエスト数（0 は無制限）")
+    parser.add_argument("--rate-limit-burst", type=int, default=10)
+    args = parser.parse_args()
+
+    server = MockKOTServer(
+        host=args.host,
+        port=args.port,
+        employees=args.employees,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+    )
+    print(f"mock KOT API: {server.url}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import random
+from datetime import date, timedelta
+
+# ベンチマーク用に KOT のレスポンスを模した合成データを作る
+
+LAST_NAMES = ["山田", "熊本", "大阪", "らぷ", "佐藤", "鈴木", "高橋", "田中"]
+FIRST_NAMES = ["伝蔵", "太郎", "花子", "らす", "一郎", "次郎", "三郎", "四郎"]
+SCHEDULE_TYPE_NAMES = ["通常勤務", "通常勤務", "通常勤務", "通常勤務", "通常勤務", "法定休日", "所定休日"]
+
+
+def _employee(i: int) -> dict:
+    return {
+        "code": f"{i:04d}",
+        "lastName": LAST_NAMES[i % len(LAST_NAMES)],
+        "firstName": FIRST_NAMES[i // len(LAST_NAMES) % len(FIRST_NAMES)],
+        "lastNamePhonetics": "ヤマダ",
+        "firstNamePhonetics": "デンゾウ",
+        "divisionCode": "1000",
+        "divisionName": "開発部",
+        "gender": "male",
+        "typeCode": "1",
+        "typeName": "正社員",
+        "key": f"key-{i:04d}",
+    }
+
+
+def _dates(days: int, start: date):
+    return [(start + timedelta(days=day)).isoformat() for day in range(days)]
+
+
+def generate_daily_workings(
+    employees: int, days: int, start: date = date(2023, 3, 1), seed: int = 0, error_rate: float = 0.03
+) -> list:
+    """
+    /daily-workings のレスポンス
+
+    error_rate の割合で勤怠エラーにし、同じ割合で勤怠記録なし（スケジュールだけある）にする
+    """
+    rng = random.Random(seed)
+    response = []
+    for date_str in _dates(days, start):
+        daily_workings = []
+        for i in range(employees):
+            if rng.random() < error_rate:
+                continue
+            daily_workings.append(
+                {
+                    "date": date_str,
+                    "employeeKey": f"key-{i:04d}",
+                    "currentDateEmployee": _employee(i),
+                    "workPlaceDivisionCode": "1000",
+                    "workPlaceDivisionName": "本社",
+                    "isClosing": False,
+                    "isHelp": False,
+                    "isError": rng.random() < error_rate,
+                    "workdayTypeName": "平日",
+                    "assigned": 480,
+                    "unassigned": 0,
+                    "overtime": rng.randint(0, 120),
+                    "lateNight": 0,
+                    "breakTime": 60,
+                }
+            )
+        response.append({"date": date_str, "dailyWorkings": daily_workings})
+    return response
+
+
+def generate_daily_schedules(employees: int, days: int, start: date = date(2023, 3, 1), seed: int = 0) -> list:
+    """/daily-schedules のレスポンス"""
+    rng = random.Random(seed)
+    response = []
+    for date_str in _dates(days, start):
+        daily_schedules = []
+        for i in range(employees):
+            daily_schedules.append(
+                {
+                    "date": date_str,
+                    "employeeKey": f"key-{i:04d}",
+                    "currentDateEmployee": _employee(i),
+                    "scheduleTypeName": rng.choice(SCHEDULE_TYPE_NAMES),
+                    "clockInSchedule": f"{date_str}T10:00:00+09:00",
+                    "clockOutSchedule": f"{date_str}T19:00:00+09:00",
+                    "breakSchedules": [],
+                }
+            )
+        response.append({"date": date_str, "dailySchedules": daily_schedules})
+    return response
+
+
+def generate_active_employees(employees: int) -> list:
+    """/employees のレスポンス"""
+    return [_employee(i) for i in range(employees)]
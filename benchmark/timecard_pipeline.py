@@ -0,0 +1,104 @@
+"""
+勤怠エラーチェックの処理時間・メモリ使用量を計測する
+
+$ poetry run python -m benchmark.timecard_pipeline --employees 1000 --days 60 --error-rate 0.03 \
+    --output benchmark/results/current.json --baseline benchmark/results/baseline.json
+
+計測する処理
+- compute_error_map: _compute_error_map（KOT のレスポンスの dict）
+- compute_error_map_compact: _compute_error_map（components.records のレコード）
+- build_timecard_errors: TimecardErrors.build（従業員ごとの索引の作成）
+- user_lookup: check_timecard_errors_for_user で行う、1人分のエラー日付の取得と通知メッセージの構築
+- announcement_message: announce_timecard_errors で行う、アナウンスメッセージの構築
+"""
+
+import argparse
+import json
+
+from components.records import compact_daily_schedules, compact_daily_workings
+from handler.jp.timecard_check import (
+    TimecardErrors,
+    _build_announcement_message,
+    _build_user_error_message,
+    _compute_error_map,
+)
+
+from .harness import compare, environment, measure, save
+from .payloads import generate_active_employees, generate_daily_schedules, generate_daily_workings
+
+
+def run(employees: int, days: int, error_rate: float, iterations: int, seed: int = 0) -> dict:
+    timecard_data = generate_daily_workings(employees, days, seed=seed, error_rate=error_rate)
+    schedule_data = generate_daily_schedules(employees, days, seed=seed)
+    active_employee_codes = {employee["code"] for employee in generate_active_employees(employees)}
+    compact_timecard_data = [compact_daily_workings(daily_data) for daily_data in timecard_data]
+    compact_schedule_data = [compact_daily_schedules(daily_schedule) for daily_schedule in schedule_data]
+
+    error_data = _compute_error_map(timecard_data, schedule_data, active_employee_codes)
+    timecard_errors = TimecardErrors.build(error_data)
+    employee_keys = [f"key-{i:04d}" for i in range(employees)]
+
+    def user_lookup():
+        for employee_key in employee_keys:
+            user_error_dates = timecard_errors.dates_for(employee_key)
+            if user_error_dates:
+                _build_user_error_message(user_error_dates)
+
+    results = [
+        measure(
+            "compute_error_map",
+            lambda: _compute_error_map(timecard_data, schedule_data, active_employee_codes),
+            iterations,
+        ),
+        measure(
+            "compute_error_map_compact",
+            lambda: _compute_error_map(compact_timecard_data, compact_schedule_data, active_employee_codes),
+            iterations,
+        ),
+        measure("build_timecard_errors", lambda: TimecardErrors.build(error_data), iterations),
+        measure("user_lookup", user_lookup, iterations, ops_per_call=len(employee_keys)),
+        measure("announcement_message", lambda: _build_announcement_message(error_data), iterations),
+    ]
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "employees": employees,
+            "days": days,
+            "error_rate": error_rate,
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "dataset": {
+            "error_dates": len(error_data),
+            "error_entries": sum(len(entries) for entries in error_data.values()),
+            "employees_with_errors": len(timecard_errors.dates_by_employee),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインの結果のJSONファイル")
+    args = parser.parse_args()
+
+    results = run(args.employees, args.days, args.error_rate, args.iterations, args.seed)
+    if args.output:
+        save(results, args.output)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(json.dumps({"compare": compare(baseline, results)}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
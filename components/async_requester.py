@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+from .instrumentation import KOTCall, kot_call
+from .json_stream import JSONArrayParser, NotJSONArrayError
+from .rate_limiter import RateLimiter
+from .requester import KOTException, KOTRequester, get_rate_limiter, get_retry_policy
+from .retry import parse_retry_after
+
+
+def _create_trace_config() -> aiohttp.TraceConfig:
+    """
+    新しく張ったコネクションの DNS の名前解決と接続の時間を、リクエストの trace_request_ctx に渡した KOTCall に記録する
+
+    aiohttp は TCP の接続と TLS のハンドシェイクを分けて計測できないので、TLS の時間は connect に含める
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_dns_resolvehost_start(session, context, params):
+        context.dns_started_at = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        if isinstance(context.trace_request_ctx, KOTCall):
+            context.trace_request_ctx.add_phase("dns", time.perf_counter() - context.dns_started_at)
+
+    async def on_connection_create_start(session, context, params):
+        context.connection_started_at = time.perf_counter()
+        if isinstance(context.trace_request_ctx, KOTCall):
+            context.dns_before = context.trace_request_ctx.phases.get("dns", 0.0)
+
+    async def on_connection_create_end(session, context, params):
+        call = context.trace_request_ctx
+        if isinstance(call, KOTCall):
+            elapsed = time.perf_counter() - context.connection_started_at
+            call.add_phase("connect", max(elapsed - (call.phases.get("dns", 0.0) - context.dns_before), 0))
+
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+class AsyncKOTSessionPool:
+    """
+    AsyncKOTRequester が使う aiohttp のセッションをプロセス全体で共有する
+
+    aiohttp のセッションはイベントループに紐づくため、ループが変わった場合は作り直す
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        self._loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+                trace_configs=[_create_trace_config()],
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+_async_session_pool = AsyncKOTSessionPool(
+    pool_size=int(os.environ.get("KOT_HTTP_POOL_SIZE", "10")),
+    connect_timeout=float(os.environ.get("KOT_HTTP_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.environ.get("KOT_HTTP_READ_TIMEOUT", "30")),
+)
+
+
+def get_async_session_pool() -> AsyncKOTSessionPool:
+    return _async_session_pool
+
+
+class AsyncKOTRequester:
+    """KOTRequester の asyncio 版"""
+
+    def __init__(
+        self, session_pool: AsyncKOTSessionPool = None, retry_policies: dict = None, rate_limiter: RateLimiter = None
+    ):
+        self.base_url = KOTRequester.KOT_API_BASE_URL
+        self.session_pool = session_pool or get_async_session_pool()
+        self.retry_policies = retry_policies or {method: get_retry_policy(method) for method in ("GET", "POST", "PUT")}
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Authorization": "Bearer {token}".format(token=KOTRequester.KOT_TOKEN),
+        }
+        self.proxy = KOTRequester.KOT_HTTPS_PROXY or None
+
+    async def _send(self, method: str, uri: str, call: KOTCall, **kwargs) -> aiohttp.ClientResponse:
+        """KOTRequester._send の asyncio 版。返したレスポンスは呼び出し側で release する"""
+        url = self.base_url + uri
+        policy = self.retry_policies[method]
+        session = await self.session_pool.get_session()
+        priority = KOTRequester.RATE_LIMIT_PRIORITIES[method]
+        policy.record_request()
+        attempt = 1
+        while True:
+            await self.rate_limiter.acquire_async(priority, timeout=KOTRequester.RATE_LIMIT_MAX_WAIT)
+            call.attempts = attempt
+            started_at = time.perf_counter()
+            connecting_before = call.connecting_time
+            try:
+                resp = await session.request(
+                    method, url, headers=self.headers, proxy=self.proxy, trace_request_ctx=call, **kwargs
+                )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                call.status = None
+                # 接続できなかった場合は KOT に届いていないので、打刻の POST でも再送してよい
+                delay = policy.next_delay(attempt, request_sent=not isinstance(e, aiohttp.ClientConnectorError))
+                if delay is None:
+                    raise
+            else:
+                elapsed = time.perf_counter() - started_at
+                call.add_phase("wait", max(elapsed - (call.connecting_time - connecting_before), 0))
+                call.status = resp.status
+                delay = None
+                if resp.status in policy.retry_statuses:
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    delay = policy.next_delay(attempt, status=resp.status, retry_after=retry_after)
+                if delay is None:
+                    try:
+                        resp.raise_for_status()
+                    except aiohttp.ClientResponseError:
+                        resp.release()
+                        raise
+                    return resp
+                resp.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, uri):
+        return await self._request("GET", uri)
+
+    async def get_stream(self, uri):
+        """KOTRequester.get_stream の asyncio 版。要素を1つずつ返す非同期イテレータ"""
+        parser = JSONArrayParser()
+        with kot_call("GET", uri) as call:
+            async with await self._send("GET", uri, call) as resp:
+                try:
+                    chunks = resp.content.iter_chunked(KOTRequester.STREAM_CHUNK_SIZE)
+                    while True:
+                        try:
+                            with call.measure("transfer"):
+                                chunk = await chunks.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        call.bytes += len(chunk)
+                        with call.measure("json_decode"):
+                            items = parser.feed(chunk)
+                        for item in items:
+                            yield item
+                    for item in parser.close():
+                        yield item
+                except NotJSONArrayError as e:
+                    if isinstance(e.document, dict) and "errors" in e.document:
+                        raise KOTException(e.document["errors"][0]["message"])
+                    raise
+
+    async def post(self, uri, payload):
+        return await self._request("POST", uri, data=payload)
+
+    async def put(self, uri, payload):
+        return await self._request("PUT", uri, json=payload)
+
+    async def _request(self, method, uri, **kwargs):
+        with kot_call(method, uri) as call:
+            async with await self._send(method, uri, call, **kwargs) as resp:
+                with call.measure("transfer"):
+                    body = await resp.read()
+                call.bytes = len(body)
+                with call.measure("json_decode"):
+                    resp_json = json.loads(await resp.text())
+        if "errors" in resp_json:
+            raise KOTException(resp_json["errors"][0]["message"])
+        return resp_json
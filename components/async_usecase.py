@@ -0,0 +1,72 @@
+import asyncio
+import datetime
+import json
+
+from .async_requester import AsyncKOTRequester
+from .instrumentation import timed_usecase
+from .repo import Employee
+from .usecase import RecordType, _async_single_flight, _get_working_date, get_employee_directory
+
+
+@timed_usecase("register_user")
+async def register_user(user, kot_user_code) -> dict:
+    # 保持している従業員一覧にいない場合だけ KOT から取得する
+    directory = get_employee_directory()
+    resp_dict = directory.lookup(kot_user_code)
+    if resp_dict is None:
+        requester = AsyncKOTRequester()
+        resp_dict = directory.add(kot_user_code, await requester.get("/employees/{}".format(kot_user_code)))
+    employee_key = resp_dict["key"]
+    # ストレージへの書き込みはブロッキングするのでスレッドで実行する
+    await asyncio.to_thread(Employee.create, user, employee_key)
+    return {"last_name": resp_dict["lastName"], "first_name": resp_dict["firstName"]}
+
+
+@timed_usecase("record_time")
+async def record_time(record_type: RecordType, employee_key, recorded_at: datetime.datetime = None):
+    recorded_at = recorded_at or datetime.datetime.now()
+    requester = AsyncKOTRequester()
+    payload = json.dumps(
+        {
+            "time": recorded_at.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+            "date": _get_working_date(recorded_at),
+            "code": record_type.value,
+        }
+    )
+    await requester.post("/daily-workings/timerecord/{}".format(employee_key), payload)
+
+
+@timed_usecase("get_daily_timacard_data")
+async def get_daily_timacard_data(from_date, to_date, compact=None):
+    """日別勤怠データを取得する（usecase.get_daily_timacard_data の asyncio 版）"""
+    requester = AsyncKOTRequester()
+    uri = f"/daily-workings?&start={from_date}&end={to_date}&additionalFields=currentDateEmployee"
+
+    return await _async_single_flight.do((uri, compact), lambda: _get_stream_list(requester, uri, compact))
+
+
+@timed_usecase("get_daily_schedule_data")
+async def get_daily_schedule_data(from_date, to_date, compact=None):
+    """日別スケジュールデータを取得する（usecase.get_daily_schedule_data の asyncio 版）"""
+    requester = AsyncKOTRequester()
+    uri = f"/daily-schedules?&start={from_date}&end={to_date}&additionalFields=currentDateEmployee"
+
+    return await _async_single_flight.do((uri, compact), lambda: _get_stream_list(requester, uri, compact))
+
+
+async def _get_stream_list(requester: AsyncKOTRequester, uri: str, compact=None) -> list:
+    """usecase._get_stream_list の asyncio 版"""
+    if compact is None:
+        return [daily_data async for daily_data in requester.get_stream(uri)]
+    return [compact(daily_data) async for daily_data in requester.get_stream(uri)]
+
+
+@timed_usecase("get_active_employees")
+async def get_active_employees() -> list:
+    """従業員データを取得する（usecase.get_active_employees の asyncio 版）。従業員一覧は同期版と共有する"""
+    directory = get_employee_directory()
+    if directory.is_stale():
+        requester = AsyncKOTRequester()
+        uri = f"/employees"
+        directory.load(await _async_single_flight.do(uri, lambda: requester.get(uri)))
+    return directory.active_employees()
@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    有効期限付きのインメモリキャッシュ
+
+    有効期限切れのエントリは次に参照されたときに削除する。max_entries を超えた場合は一番長く参照されていないエントリを捨てる
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """キャッシュされている値を返す。存在しない・有効期限切れの場合はNoneを返す"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if time.monotonic() < expires_at:
+                    self._hits += 1
+                    # 参照されたエントリを最後に移動して、max_entries を超えたときに捨てられないようにする
+                    self._entries[key] = self._entries.pop(key)
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # 一番長く参照されていないエントリを捨てる
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        """指定されたキー、もしくは全てのエントリを削除する"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
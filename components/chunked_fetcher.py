@@ -0,0 +1,113 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+def split_date_range(from_date: str, to_date: str, chunk_days: int) -> list:
+    """
+    日付範囲を chunk_days 日ごとに分割する。chunk_days が0以下の場合は分割しない
+
+    Returns:
+        list: [("2025-02-01", "2025-02-07"), ("2025-02-08", "2025-02-10")]
+    """
+    if chunk_days <= 0:
+        return [(from_date, to_date)]
+
+    chunks = []
+    chunk_from = date.fromisoformat(from_date)
+    end = date.fromisoformat(to_date)
+    while chunk_from <= end:
+        chunk_to = min(chunk_from + timedelta(days=chunk_days - 1), end)
+        chunks.append((chunk_from.isoformat(), chunk_to.isoformat()))
+        chunk_from = chunk_to + timedelta(days=1)
+    return chunks
+
+
+class ChunkedFetcher:
+    """
+    日付範囲を指定して取得するデータ（勤怠データ・スケジュールデータ）を、範囲を分割して並行に取得する
+
+    ジョブは (fetch, from_date, to_date) のタプルで、fetch(from_date, to_date) は日付順のリストを返すこと。
+    同時に実行するリクエスト数は max_workers で制限する
+    """
+
+    def __init__(self, chunk_days: int, max_workers: int, name: str = "chunked-fetch"):
+        self.chunk_days = chunk_days
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def _split(self, jobs: list) -> list:
+        return [
+            [
+                (fetch, chunk_from, chunk_to)
+                for chunk_from, chunk_to in split_date_range(from_date, to_date, self.chunk_days)
+            ]
+            for fetch, from_date, to_date in jobs
+        ]
+
+    def fetch(self, jobs: list) -> list:
+        """
+        ジョブごとに、分割して取得した結果を日付順につなげたリストを返す
+
+        いずれかのリクエストが失敗した場合は、その例外を送出する
+        """
+        chunked_jobs = self._split(jobs)
+        chunk_count = sum(len(chunks) for chunks in chunked_jobs)
+        if chunk_count <= 1 or self.max_workers <= 1:
+            return [
+                self._stitch(fetch(chunk_from, chunk_to) for fetch, chunk_from, chunk_to in chunks)
+                for chunks in chunked_jobs
+            ]
+
+        executor = self._get_executor()
+        futures = [
+            [executor.submit(fetch, chunk_from, chunk_to) for fetch, chunk_from, chunk_to in chunks]
+            for chunks in chunked_jobs
+        ]
+        return [self._stitch(future.result() for future in chunk_futures) for chunk_futures in futures]
+
+    async def fetch_async(self, jobs: list) -> list:
+        """fetch の asyncio 版。fetch はコルーチン関数であること"""
+        semaphore = asyncio.Semaphore(max(self.max_workers, 1))
+
+        async def run(fetch, chunk_from, chunk_to):
+            async with semaphore:
+                return await fetch(chunk_from, chunk_to)
+
+        results = []
+        for chunks in self._split(jobs):
+            results.append(asyncio.gather(*(run(*chunk) for chunk in chunks)))
+        return [self._stitch(chunk_results) for chunk_results in await asyncio.gather(*results)]
+
+    @staticmethod
+    def _stitch(chunk_results) -> list:
+        stitched = []
+        for result in chunk_results:
+            stitched.extend(result)
+        return stitched
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_chunked_fetcher = ChunkedFetcher(
+    chunk_days=int(os.environ.get("KOT_FETCH_CHUNK_DAYS", "7")),
+    max_workers=int(os.environ.get("KOT_FETCH_MAX_WORKERS", "4")),
+)
+
+
+def get_chunked_fetcher() -> ChunkedFetcher:
+    return _chunked_fetcher
@@ -0,0 +1,79 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger()
+
+
+class Coalescer:
+    """
+    短い時間内に届いたリクエストをまとめて1回で処理する
+
+    最初のリクエストから window 秒経つか、max_batch_size 件溜まった時点で submit_batch にまとめて渡す。
+    submit_batch は受け取ったリストと同じ順番で、各リクエストの結果（失敗した場合は例外）のリストを返す
+    """
+
+    def __init__(self, window: float, max_batch_size: int, submit_batch, name: str = "coalescer"):
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.submit_batch = submit_batch
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, item) -> Future:
+        future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take_pending()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            self._run_batch(batch)
+        return future
+
+    def _take_pending(self) -> list:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list):
+        items = [item for item, _ in batch]
+        with self._lock:
+            self._batches += 1
+            self._items += len(items)
+
+        try:
+            results = self.submit_batch(items)
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.exception(f"{self.name}: batch of {len(batch)} items failed")
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self._batches, "items": self._items, "pending": len(self._pending)}
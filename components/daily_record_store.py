@@ -0,0 +1,129 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+class DailyRecordStore:
+    """
+    KOT の日別データ（daily-workings, daily-schedules）を日付ごとに保持するストア
+
+    過去の日のデータはほとんど変わらないため、以下の日だけを KOT から取得し直して保持しているデータに反映する
+    - まだ取得していない日
+    - 今日から recent_days 日以内の日（打刻漏れの修正などで変わりやすい）
+    - 前回取得してから revalidate_after 秒以上経った日
+    取得し直す日は連続した範囲ごとにまとめて1回のリクエストで取得する
+
+    compact を指定した場合は、取得した1日分のデータを compact で変換してから保持する。
+    受信しながら変換済みのデータを merge に渡せるように、compact は変換済みのデータをそのまま返すこと
+    """
+
+    def __init__(self, recent_days: int, revalidate_after: float, name: str = "daily-record-store", compact=None):
+        self.recent_days = recent_days
+        self.revalidate_after = revalidate_after
+        self.name = name
+        self.compact = compact
+        self._lock = threading.Lock()
+        # { date: (取得した時刻, その日のデータ) } データがなかった日は None を保持する
+        self._records = {}
+        self._fetches = 0
+        self._fetched_dates = 0
+        self._reused_dates = 0
+
+    def plan(self, from_date, to_date, today: date = None) -> list:
+        """
+        取得し直す必要がある日付を連続した範囲ごとにまとめて返す
+
+        Returns:
+            list: [("2025-02-01", "2025-02-03"), ("2025-02-20", "2025-02-28")]
+        """
+        from_date, to_date = _parse_date(from_date), _parse_date(to_date)
+        today = today or datetime.now().date()
+        recent_from = today - timedelta(days=self.recent_days)
+        now = time.monotonic()
+
+        runs = []
+        run_from = None
+        reused = 0
+        with self._lock:
+            day = from_date
+            while day <= to_date:
+                record = self._records.get(day)
+                stale = record is None or day >= recent_from or now - record[0] >= self.revalidate_after
+                if stale:
+                    if run_from is None:
+                        run_from = day
+                else:
+                    reused += 1
+                    if run_from is not None:
+                        runs.append((run_from, day - timedelta(days=1)))
+                        run_from = None
+                day += timedelta(days=1)
+            if run_from is not None:
+                runs.append((run_from, to_date))
+            self._reused_dates += reused
+
+        return [(run_from.isoformat(), run_to.isoformat()) for run_from, run_to in runs]
+
+    def merge(self, from_date, to_date, entries: list):
+        """範囲内の取得結果を反映する。結果に含まれない日はデータなしとして記録する"""
+        from_date, to_date = _parse_date(from_date), _parse_date(to_date)
+        entries_by_date = {}
+        for entry in entries:
+            entry_date = entry.get("date")
+            if entry_date:
+                entries_by_date[_parse_date(entry_date)] = self.compact(entry) if self.compact else entry
+
+        now = time.monotonic()
+        with self._lock:
+            self._fetches += 1
+            day = from_date
+            while day <= to_date:
+                self._records[day] = (now, entries_by_date.get(day))
+                self._fetched_dates += 1
+                day += timedelta(days=1)
+
+    def select(self, from_date, to_date) -> list:
+        """保持しているデータのうち、範囲内のデータを日付順に返す"""
+        from_date, to_date = _parse_date(from_date), _parse_date(to_date)
+        with self._lock:
+            return [
+                record[1]
+                for day, record in sorted(self._records.items())
+                if from_date <= day <= to_date and record[1] is not None
+            ]
+
+    def get_range(self, from_date, to_date, fetch) -> list:
+        """
+        範囲内のデータを返す。足りない日・古くなった日は fetch(from_date, to_date) で取得して反映する
+
+        fetch が例外を送出した場合、そのまま呼び出し元に送出する
+        """
+        for run_from, run_to in self.plan(from_date, to_date):
+            self.merge(run_from, run_to, fetch(run_from, run_to))
+        return self.select(from_date, to_date)
+
+    def prune(self, before_date):
+        """指定された日より前のデータを削除する"""
+        before_date = _parse_date(before_date)
+        with self._lock:
+            for day in [day for day in self._records if day < before_date]:
+                del self._records[day]
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dates": len(self._records),
+                "fetches": self._fetches,
+                "fetched_dates": self._fetched_dates,
+                "reused_dates": self._reused_dates,
+            }
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger()
+
+
+class DeferredJobExecutor:
+    """
+    Slack への応答を返した後に実行すればよい処理（打刻後の勤怠エラーチェックなど）をバックグラウンドで実行する
+
+    同時実行数は max_workers、実行待ち + 実行中のジョブ数は max_queue_size で制限し、
+    上限を超えたジョブは実行せずに捨てる
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, name: str = "deferred-job"):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._executor = None
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._failed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs) -> bool:
+        """
+        ジョブを登録する
+
+        Returns:
+            bool: 登録できた場合はTrue、キューが一杯で捨てた場合はFalse
+        """
+        with self._condition:
+            if self._pending >= self.max_queue_size:
+                self._rejected += 1
+                logger.warning(f"{self.name}: queue is full, drop job {getattr(fn, '__name__', fn)}")
+                return False
+            self._pending += 1
+            self._submitted += 1
+            executor = self._get_executor()
+
+        try:
+            executor.submit(self._run, fn, *args, **kwargs)
+        except Exception:
+            # shutdown 後などで登録できなかった場合は、実行待ちとして数えたジョブを戻す
+            with self._condition:
+                self._pending -= 1
+                self._submitted -= 1
+                self._condition.notify_all()
+            raise
+        return True
+
+    def _run(self, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            with self._condition:
+                self._failed += 1
+            logger.exception(f"{self.name}: job {getattr(fn, '__name__', fn)} failed")
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def wait_until_idle(self, timeout: float = None) -> bool:
+        """実行待ち・実行中のジョブがなくなるまで待つ"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "pending": self._pending,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class AsyncDeferredJobRunner:
+    """
+    DeferredJobExecutor の asyncio 版
+
+    コルーチン関数をタスクとして実行し、同時実行数は max_concurrency、実行待ち + 実行中のジョブ数は max_queue_size で制限する
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_size: int, name: str = "async-deferred-job"):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._tasks = set()
+        self._semaphore = None
+        self._loop = None
+        self._submitted = 0
+        self._rejected = 0
+        self._failed = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def submit(self, coro_fn, *args, **kwargs) -> bool:
+        """
+        ジョブを登録する。イベントループ内から呼び出すこと
+
+        Returns:
+            bool: 登録できた場合はTrue、キューが一杯で捨てた場合はFalse
+        """
+        if len(self._tasks) >= self.max_queue_size:
+            self._rejected += 1
+            logger.warning(f"{self.name}: queue is full, drop job {getattr(coro_fn, '__name__', coro_fn)}")
+            return False
+
+        self._submitted += 1
+        task = asyncio.get_running_loop().create_task(self._run(coro_fn, *args, **kwargs))
+        # タスクがGCされないように完了するまで参照を保持する
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, coro_fn, *args, **kwargs):
+        async with self._get_semaphore():
+            try:
+                await coro_fn(*args, **kwargs)
+            except Exception:
+                self._failed += 1
+                logger.exception(f"{self.name}: job {getattr(coro_fn, '__name__', coro_fn)} failed")
+
+    async def wait_until_idle(self):
+        """実行待ち・実行中のジョブがなくなるまで待つ"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._tasks),
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "failed": self._failed,
+        }
+
+
+_deferred_executor = DeferredJobExecutor(
+    max_workers=int(os.environ.get("DEFERRED_JOB_WORKERS", "2")),
+    max_queue_size=int(os.environ.get("DEFERRED_JOB_QUEUE_SIZE", "100")),
+)
+
+
+def get_deferred_executor() -> DeferredJobExecutor:
+    return _deferred_executor
+
+
+_async_deferred_runner = AsyncDeferredJobRunner(
+    max_concurrency=int(os.environ.get("DEFERRED_JOB_WORKERS", "2")),
+    max_queue_size=int(os.environ.get("DEFERRED_JOB_QUEUE_SIZE", "100")),
+)
+
+
+def get_async_deferred_runner() -> AsyncDeferredJobRunner:
+    return _async_deferred_runner
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger()
+
+
+class EmployeeDirectory:
+    """
+    KOT の従業員一覧（/employees）をメモリに保持し、従業員コード・従業員キーから引けるようにする
+
+    一覧は refresh_interval 秒ごとに取得し直す。取得し直すのは、一覧が古くなってから参照されたとき（オンデマンド）と、
+    start() で起動したバックグラウンドスレッドから定期的に行う場合がある。
+    従業員コードで引いて見つからなかった場合だけ、fetch_one で KOT から1人分を取得する
+    """
+
+    def __init__(self, fetch_all, fetch_one, refresh_interval: float, name: str = "employee-directory"):
+        self.fetch_all = fetch_all  # fetch_all() -> [{"key": ..., "code": ..., "lastName": ..., "firstName": ...}]
+        self.fetch_one = fetch_one  # fetch_one(code) -> {"key": ..., "code": ..., "lastName": ..., "firstName": ...}
+        self.refresh_interval = refresh_interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._employees = []
+        self._by_code = {}
+        self._by_key = {}
+        self._loaded_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._refreshes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def load(self, employees: list):
+        """取得した従業員一覧で索引を作り直す"""
+        by_code = {employee.get("code"): employee for employee in employees}
+        by_key = {employee.get("key"): employee for employee in employees}
+        with self._lock:
+            self._employees = list(employees)
+            self._by_code = by_code
+            self._by_key = by_key
+            self._loaded_at = time.monotonic()
+            self._refreshes += 1
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def refresh(self):
+        """KOT から従業員一覧を取得し直す"""
+        with self._refresh_lock:
+            self.load(self.fetch_all())
+
+    def _refresh_if_stale(self):
+        if not self.is_stale():
+            return
+        with self._refresh_lock:
+            # 待っている間に他のスレッドが取得し直した場合は取得しない
+            if self.is_stale():
+                self.load(self.fetch_all())
+
+    def active_employees(self) -> list:
+        """在籍している従業員の一覧を返す。一覧が古い場合は取得し直す"""
+        self._refresh_if_stale()
+        with self._lock:
+            return self._employees
+
+    def get_by_code(self, code) -> dict:
+        """
+        従業員コードから従業員を返す
+
+        保持している一覧にない場合（一覧を取得する前や、一覧の取得後に入社した人）は、KOT から取得して索引に追加する
+        """
+        employee = self.lookup(code)
+        if employee is None:
+            employee = self.add(code, self.fetch_one(code))
+        return employee
+
+    def lookup(self, code):
+        """保持している一覧から従業員コードで引く。見つからない場合はNoneを返す"""
+        with self._lock:
+            employee = self._by_code.get(code)
+            if employee is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return employee
+
+    def add(self, code, employee: dict) -> dict:
+        """KOT から個別に取得した従業員を索引に追加する。在籍者の一覧には次に取得し直すまで追加しない"""
+        with self._lock:
+            self._by_code[code] = employee
+            if employee.get("key") is not None:
+                self._by_key[employee["key"]] = employee
+        return employee
+
+    def get_by_key(self, employee_key):
+        """従業員キーから従業員を返す。保持している一覧にない場合はNoneを返す"""
+        with self._lock:
+            return self._by_key.get(employee_key)
+
+    def clear(self):
+        with self._lock:
+            self._employees = []
+            self._by_code = {}
+            self._by_key = {}
+            self._loaded_at = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "employees": len(self._employees),
+                "refreshes": self._refreshes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def start(self, can_refresh=None):
+        """
+        バックグラウンドで定期的に従業員一覧を取得し直す
+
+        Args:
+            can_refresh: 取得してよいかを返す関数（KOT API の利用制限時間帯を避けるためなど）
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(can_refresh,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, can_refresh):
+        while not self._stop_event.is_set():
+            if can_refresh is None or can_refresh():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception(f"{self.name}: failed to refresh employees")
+            self._stop_event.wait(self.refresh_interval)
@@ -0,0 +1,274 @@
+import functools
+import inspect
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger()
+
+# URI の従業員キーなどを置き換えて、集計する単位（エンドポイントのテンプレート）にする
+_ENDPOINT_TEMPLATES = [
+    (re.compile(r"^/daily-workings/timerecord/[^/]+$"), "/daily-workings/timerecord/{employeeKey}"),
+    (re.compile(r"^/employees/[^/]+$"), "/employees/{code}"),
+]
+
+# KOTCall の所要時間の内訳（to_dict に出す順番）
+PHASES = ("dns", "connect", "tls", "wait", "transfer", "json_decode")
+
+
+def endpoint_template(uri: str) -> str:
+    """'/employees/1234?date=...' → '/employees/{code}'"""
+    path = uri.split("?", 1)[0]
+    for pattern, template in _ENDPOINT_TEMPLATES:
+        if pattern.match(path):
+            return template
+    return path
+
+
+class KOTCall:
+    """
+    KOT API の呼び出し1回分（再送を含む）の計測結果
+
+    時間は秒。phases には計測した内訳だけを持ち、再送した場合は合計になる。dns・connect・tls は新しくコネクションを張った場合だけ計測する。
+    requests 版は名前解決と TLS のハンドシェイクを分けずに connect に、aiohttp 版は TLS のハンドシェイクを connect に含めるので、
+    それぞれ計測しない内訳は phases に含まれない。
+    wait はリクエストを送ってからレスポンスヘッダーを受け取るまで、transfer はレスポンスボディの受信にかかった時間
+    """
+
+    def __init__(self, method: str, uri: str):
+        self.method = method
+        self.endpoint = endpoint_template(uri)
+        self.status = None
+        self.bytes = 0
+        self.attempts = 0
+        self.error = None
+        self.duration = None
+        self.phases = {}
+        self._started_at = time.perf_counter()
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+    @property
+    def connecting_time(self) -> float:
+        """コネクションを張るのにかかった時間（dns + connect + tls）"""
+        return sum(self.phases.get(phase, 0.0) for phase in ("dns", "connect", "tls"))
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, phase: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, time.perf_counter() - started_at)
+
+    def finish(self, error: BaseException = None):
+        self.duration = time.perf_counter() - self._started_at
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "error": self.error,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            # 計測していない内訳は 0 と区別できるように出さない
+            **{f"{phase}_ms": round(self.phases[phase] * 1000, 3) for phase in PHASES if phase in self.phases},
+        }
+
+
+_kot_call_hooks = []
+_current = threading.local()
+
+
+def add_kot_call_hook(hook):
+    """KOT API の呼び出しが終わるたびに KOTCall を受け取って呼び出される関数を追加する"""
+    _kot_call_hooks.append(hook)
+
+
+def remove_kot_call_hook(hook):
+    _kot_call_hooks.remove(hook)
+
+
+def emit_kot_call(call: KOTCall):
+    for hook in list(_kot_call_hooks):
+        try:
+            hook(call)
+        except Exception:
+            # 計測の失敗で KOT API の呼び出しを失敗させない
+            logger.exception(f"kot call hook {getattr(hook, '__name__', hook)} failed")
+
+
+@contextmanager
+def kot_call(method: str, uri: str):
+    """with ブロックの中の KOT API の呼び出しを計測し、終わったら hook に渡す"""
+    call = KOTCall(method, uri)
+    try:
+        yield call
+    except GeneratorExit:
+        # get_stream のイテレータを最後まで読まずに閉じた場合
+        call.finish()
+        raise
+    except BaseException as e:
+        call.finish(error=e)
+        raise
+    else:
+        call.finish()
+    finally:
+        emit_kot_call(call)
+
+
+@contextmanager
+def connecting(call: KOTCall):
+    """
+    with ブロックの中で（同じスレッドで）新しく張ったコネクションの接続にかかった時間を call に記録する
+
+    requests（urllib3）はコネクションを張る処理に計測結果を渡せないので、スレッドごとに記録先を持つ
+    """
+    previous = getattr(_current, "call", None)
+    _current.call = call
+    try:
+        yield
+    finally:
+        _current.call = previous
+
+
+def current_kot_call():
+    return getattr(_current, "call", None)
+
+
+def _log_kot_call(call: KOTCall):
+    record = call.to_dict()
+    logger.info(json.dumps({"event": "kot_call", **record}), extra={"kot_call": record})
+
+
+def _record_kot_call_metrics(call: KOTCall):
+    registry = get_metrics_registry()
+    status = str(call.status) if call.status is not None else "error"
+    registry.counter("kot_requests_total", "KOT API の呼び出し数", ("method", "endpoint", "status")).inc(
+        method=call.method, endpoint=call.endpoint, status=status
+    )
+    registry.histogram(
+        "kot_request_duration_seconds", "KOT API の呼び出し（再送を含む）の所要時間", ("method", "endpoint")
+    ).observe(call.duration, method=call.method, endpoint=call.endpoint)
+    phase_histogram = registry.histogram(
+        "kot_request_phase_seconds", "KOT API の呼び出しの所要時間の内訳", ("method", "endpoint", "phase")
+    )
+    for phase, seconds in call.phases.items():
+        phase_histogram.observe(seconds, method=call.method, endpoint=call.endpoint, phase=phase)
+    registry.counter("kot_response_bytes_total", "KOT API から受信したバイト数", ("method", "endpoint")).inc(
+        call.bytes, method=call.method, endpoint=call.endpoint
+    )
+    registry.counter("kot_retries_total", "KOT API への再送の回数", ("method", "endpoint")).inc(
+        call.retries, method=call.method, endpoint=call.endpoint
+    )
+
+
+add_kot_call_hook(_log_kot_call)
+add_kot_call_hook(_record_kot_call_metrics)
+
+
+@contextmanager
+def timed(name: str, help: str, **labels):
+    """with ブロックの所要時間を、labels をラベルにしてヒストグラム name に記録する"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics_registry().histogram(name, help, tuple(labels)).observe(time.perf_counter() - started_at, **labels)
+
+
+def timed_calls(name: str, help: str, **labels):
+    """関数（async 関数を含む）の所要時間を、labels をラベルにしてヒストグラム name に記録するデコレーター"""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(name, help, **labels):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name, help, **labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_listener(fn):
+    """Slack のイベント・コマンドの listener の所要時間を、関数名ごとに計測するデコレーター"""
+    return timed_calls("slack_listener_duration_seconds", "Slack の listener の所要時間", listener=fn.__name__)(fn)
+
+
+def timed_punch(record_type):
+    """Slack のメッセージ・コマンドを受け取ってから打刻の応答を返すまでの所要時間を、打刻の種類ごとに計測するデコレーター"""
+    return timed_calls("punch_duration_seconds", "打刻の処理の所要時間", record_type=record_type.name)
+
+
+def _record_usecase(name: str, started_at: float, error: BaseException = None):
+    duration = time.perf_counter() - started_at
+    outcome = "error" if error is not None else "success"
+    get_metrics_registry().histogram(
+        "usecase_duration_seconds", "usecase の処理の所要時間", ("usecase", "outcome")
+    ).observe(duration, usecase=name, outcome=outcome)
+    record = {
+        "usecase": name,
+        "outcome": outcome,
+        "error": type(error).__name__ if error is not None else None,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    logger.info(json.dumps({"event": "usecase", **record}), extra={"usecase": record})
+
+
+def timed_usecase(name: str):
+    """usecase の関数（async 関数を含む）の所要時間を計測するデコレーター"""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started_at = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    _record_usecase(name, started_at, e)
+                    raise
+                _record_usecase(name, started_at)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                _record_usecase(name, started_at, e)
+                raise
+            _record_usecase(name, started_at)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,177 @@
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+
+
+def _skip_pattern(nesting: int) -> str:
+    """括弧・引用符以外の文字、閉じた文字列、nesting 段までの閉じた括弧を読み飛ばすパターン"""
+    token = _STRING
+    for _ in range(nesting):
+        inner = rf'[^"\[\]{{}}]*(?:(?:{token})[^"\[\]{{}}]*)*'
+        token = rf"{_STRING}|\{{{inner}\}}|\[{inner}\]"
+    return rf'[^"\[\]{{}}]*(?:(?:{token})[^"\[\]{{}}]*)*'
+
+
+# 要素の中で、括弧の深さを数えなくてよい部分を読み飛ばす。
+# 従業員ごとのオブジェクトなど浅い括弧はまとめて読み飛ばし、Python で1文字ずつ数える回数を減らす
+_SKIP = re.compile(_skip_pattern(2), re.DOTALL)
+# 文字列の中で、閉じる引用符か末尾のバックスラッシュの手前まで読み飛ばす
+_STRING_PART = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+# 数値・true・false・null の続き
+_SCALAR = re.compile(r'[^ \t\n\r,\[\]{}"]*')
+
+
+class NotJSONArrayError(ValueError):
+    """JSONの配列を期待していたが、それ以外の値だった場合の例外。document にデコードした値を持つ"""
+
+    def __init__(self, document):
+        super().__init__(f"expected JSON array, got {type(document).__name__}")
+        self.document = document
+
+
+class JSONArrayParser:
+    """
+    JSONの配列を少しずつ受け取りながら、要素を1つずつ取り出すパーサー
+
+    レスポンス全体の bytes・str・オブジェクトを同時にメモリに持たないように、デコードが終わった部分は捨てる。
+    要素の終わりは括弧の深さと文字列を追いながら受信したデータを1回だけ走査して見つけ、要素ごとに1回だけデコードする。
+    トップレベルが配列でない場合は全体を読み込んでから NotJSONArrayError を送出する
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json_decoder = json.JSONDecoder()
+        # 受信途中の要素（トップレベルが配列でない場合は全体）の文字列の断片
+        self._pending = []
+        # start: "[" を待っている, item: 要素を待っている, value: 要素の途中, separator: "," か "]" を待っている,
+        # done: 配列が閉じた, not_array: トップレベルが配列ではない
+        self._state = "start"
+        self._first_item = True
+        # 受信途中の要素の走査の状態
+        self._scalar = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, data: bytes) -> list:
+        """受信したデータを追加し、取り出せるようになった要素のリストを返す"""
+        return self._parse(self._decoder.decode(data), final=False)
+
+    def close(self) -> list:
+        """全てのデータを受信し終わったときに呼び出し、残りの要素のリストを返す"""
+        items = self._parse(self._decoder.decode(b"", final=True), final=True)
+        if self._state == "not_array":
+            raise NotJSONArrayError(json.loads("".join(self._pending)))
+        if self._state != "done":
+            raise ValueError("unexpected end of JSON array")
+        return items
+
+    def _parse(self, text: str, final: bool) -> list:
+        items = []
+        pos = 0
+        while True:
+            if self._state == "not_array":
+                self._pending.append(text[pos:])
+                break
+            if self._state == "value":
+                end = self._scan(text, pos, final)
+                if end < 0:
+                    # 要素の途中までしか受信していないので続きを待つ
+                    self._pending.append(text[pos:])
+                    break
+                items.append(self._decode(text[pos:end]))
+                pos = end
+                self._first_item = False
+                self._state = "separator"
+                continue
+
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos >= len(text):
+                break
+            char = text[pos]
+
+            if self._state == "start":
+                if char != "[":
+                    self._state = "not_array"
+                    continue
+                pos += 1
+                self._state = "item"
+            elif self._state == "item":
+                if char == "]" and self._first_item:
+                    pos += 1
+                    self._state = "done"
+                    continue
+                self._scalar = char not in '[{"'
+                self._depth = 0
+                self._in_string = self._escaped = False
+                self._state = "value"
+            elif self._state == "separator":
+                if char == ",":
+                    pos += 1
+                    self._state = "item"
+                elif char == "]":
+                    pos += 1
+                    self._state = "done"
+                else:
+                    raise ValueError(f"unexpected character {char!r} in JSON array")
+            else:
+                raise ValueError(f"unexpected character {char!r} after JSON array")
+        return items
+
+    def _scan(self, text: str, pos: int, final: bool) -> int:
+        """受信途中の要素を text の pos から走査し、要素が終わった位置（要素の直後）を返す。終わっていなければ -1"""
+        if self._scalar:
+            # 数値の途中で区切られている可能性があるので、区切り文字を受信するまで確定しない
+            end = _SCALAR.match(text, pos).end()
+            return end if end < len(text) or final else -1
+
+        while pos < len(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    pos += 1
+                    continue
+                pos = _STRING_PART.match(text, pos).end()
+                if pos >= len(text):
+                    break
+                # 閉じる引用符か、データの末尾で区切られたエスケープ
+                self._escaped = text[pos] == "\\"
+                self._in_string = self._escaped
+                pos += 1
+                if not self._in_string and self._depth == 0:
+                    return pos
+                continue
+
+            if self._depth > 0:
+                pos = _SKIP.match(text, pos).end()
+                if pos >= len(text):
+                    break
+            char = text[pos]
+            pos += 1
+            if char == '"':
+                self._in_string = True
+            else:
+                self._depth += 1 if char in "[{" else -1
+                if self._depth == 0:
+                    return pos
+        return -1
+
+    def _decode(self, text: str):
+        if self._pending:
+            text = "".join(self._pending) + text
+            self._pending = []
+        item, end = self._json_decoder.raw_decode(text)
+        if end != len(text):
+            raise ValueError(f"unexpected character {text[end]!r} in JSON array")
+        return item
+
+
+def iter_json_array(chunks, encoding: str = "utf-8"):
+    """bytes のイテレータ（requests の iter_content など）からJSONの配列の要素を1つずつ返す"""
+    parser = JSONArrayParser(encoding=encoding)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
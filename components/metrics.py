@@ -0,0 +1,218 @@
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger()
+
+# 秒単位のヒストグラムのデフォルトのバケット。KOT API の応答は数十ミリ秒〜数秒なのでその範囲を細かくする
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Metric:
+    TYPE = None
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels must be {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """増えるだけの値（リクエスト数など）"""
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list:
+        """
+        Returns:
+            [(ラベルの dict, 値)]
+        """
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: tuple):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """値の分布（所要時間など）。バケットごとの件数と合計を持つ"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = _HistogramValue(self.buckets)
+            histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def samples(self) -> list:
+        """
+        Returns:
+            [(ラベルの dict, {"buckets": [(上限, 上限以下の件数)], "sum": 合計, "count": 件数})]
+            バケットの件数は累積で、最後の上限は float("inf")
+        """
+        with self._lock:
+            samples = []
+            for key, histogram in self._values.items():
+                cumulative = 0
+                buckets = []
+                for upper, count in zip((*self.buckets, float("inf")), histogram.counts):
+                    cumulative += count
+                    buckets.append((upper, cumulative))
+                samples.append(
+                    (
+                        dict(zip(self.labelnames, key)),
+                        {"buckets": buckets, "sum": histogram.sum, "count": histogram.count},
+                    )
+                )
+            return samples
+
+
+class CallbackMetric(_Metric):
+    """
+    値を保持せずに、読み込むたびに fn を呼び出して値を取得するメトリクス
+
+    キューの長さや、キャッシュのヒット数など他のコンポーネントが stats() で持っている値を公開するのに使う
+
+    Args:
+        fn: [(ラベルの dict, 値)] を返す関数
+        type: "gauge"（増減する値）または "counter"（増えるだけの値）
+    """
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None, type: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.TYPE = type
+
+    def samples(self) -> list:
+        return [(dict(labels), value) for labels, value in self.fn()]
+
+
+class MetricsRegistry:
+    """
+    プロセス内のメトリクスをまとめて保持する
+
+    同じ名前のメトリクスは1つだけ作り、2回目以降は作成済みのものを返す
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"{name} is already registered as a different metric")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def callback(self, name: str, help: str, fn, labelnames=(), type: str = "gauge") -> CallbackMetric:
+        """fn を呼び出して値を取得するメトリクスを登録する。同じ名前で登録し直した場合は fn を置き換える"""
+        metric = self._get_or_create(CallbackMetric, name, help, labelnames, type=type)
+        metric.fn = fn
+        return metric
+
+    def get(self, name: str):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def collect(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def clear(self):
+        """全てのメトリクスの値を消す（テスト用）"""
+        for metric in self.collect():
+            metric.clear()
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """メトリクスを Prometheus のテキスト形式にする"""
+    lines = []
+    for metric in registry.collect():
+        try:
+            samples = metric.samples()
+        except Exception:
+            # 1つのメトリクスの取得に失敗しても、他のメトリクスは返す
+            logger.exception(f"failed to collect {metric.name}")
+            continue
+        help = metric.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {help}")
+        lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+        for labels, value in samples:
+            if metric.TYPE == "histogram":
+                for upper, count in value["buckets"]:
+                    bucket_labels = _format_labels({**labels, "le": _format_value(float(upper))})
+                    lines.append(f"{metric.name}_bucket{bucket_labels} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+_metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _metrics_registry
@@ -0,0 +1,62 @@
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import MetricsRegistry, get_metrics_registry, render_prometheus
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    bot と同じプロセスで、メトリクスを Prometheus のテキスト形式で返す HTTP サーバー
+
+    GET /metrics でメトリクスを、GET /healthz で 200 を返す
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, registry: MetricsRegistry = None):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry or get_metrics_registry()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def log_message(self, format, *args):
+        # 数十秒ごとにスクレイプされるのでアクセスログは出さない
+        pass
+
+    def _send(self, status: int, body: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            return self._send(HTTPStatus.OK, render_prometheus(self.server.registry))
+        if path == "/healthz":
+            return self._send(HTTPStatus.OK, "ok\n")
+        return self._send(HTTPStatus.NOT_FOUND, "not found\n")
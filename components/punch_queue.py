@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+
+from components.usecase import RecordType
+
+
+@dataclass(frozen=True)
+class QueuedPunch:
+    id: int
+    user_id: str
+    channel_id: str
+    employee_key: str
+    record_type: RecordType
+    recorded_at: datetime
+    attempts: int
+
+
+class PunchQueue:
+    """
+    KOT API を利用できない時間帯に受け付けた打刻を、打刻時刻とともにローカルの SQLite に保存しておくキュー
+
+    プロセスが再起動しても打刻が失われないように、状態の変更は全てファイルに書き込む。
+    複数のプロセスが同じキューから登録しても二重に打刻しないように、登録する前に claim で打刻を確保する
+    """
+
+    STATUS_PENDING = "pending"
+    # 確保して KOT に登録している途中
+    STATUS_IN_FLIGHT = "in_flight"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    # 登録している途中でプロセスが止まったなど、KOT に登録できたかわからない
+    STATUS_UNKNOWN = "unknown"
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS punch_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    channel_id TEXT NOT NULL,
+                    employee_key TEXT NOT NULL,
+                    record_type INTEGER NOT NULL,
+                    recorded_at TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TEXT NOT NULL,
+                    last_error TEXT,
+                    claimed_at TEXT
+                )
+                """
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(punch_queue)")]
+            if "claimed_at" not in columns:
+                # claimed_at を追加する前に作ったファイル
+                conn.execute("ALTER TABLE punch_queue ADD COLUMN claimed_at TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS punch_queue_pending ON punch_queue (status, next_attempt_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def enqueue(self, user_id: str, channel_id: str, employee_key: str, record_type: RecordType, recorded_at: datetime):
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO punch_queue (user_id, channel_id, employee_key, record_type, recorded_at, status, "
+                "next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    channel_id,
+                    employee_key,
+                    int(record_type),
+                    recorded_at.isoformat(),
+                    self.STATUS_PENDING,
+                    recorded_at.isoformat(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def get_ready(self, now: datetime, limit: int = 100) -> list:
+        """now の時点で登録を試せる打刻を、打刻時刻順に返す。登録する前に claim で確保すること"""
+        return self._select(
+            "WHERE status = ? AND next_attempt_at <= ? ORDER BY recorded_at, id LIMIT ?",
+            (self.STATUS_PENDING, now.isoformat(), limit),
+        )
+
+    def claim(self, punch_id: int, now: datetime) -> bool:
+        """
+        打刻を登録するために確保する
+
+        Returns:
+            bool: 確保できた場合はTrue、他のプロセスなどが先に確保していた場合はFalse
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE punch_queue SET status = ?, claimed_at = ? WHERE id = ? AND status = ?",
+                (self.STATUS_IN_FLIGHT, now.isoformat(), punch_id, self.STATUS_PENDING),
+            )
+            return cursor.rowcount == 1
+
+    def release_stale_claims(self, claimed_before: datetime, error: str) -> list:
+        """
+        claimed_before より前に確保したまま登録が終わっていない打刻を、登録できたかわからない打刻にする
+
+        登録している途中でプロセスが止まった打刻は、KOT に登録されている可能性があるので登録し直さない
+
+        Returns:
+            list: この呼び出しで状態を変えた打刻のリスト
+        """
+        punches = self._select(
+            "WHERE status = ? AND claimed_at <= ? ORDER BY recorded_at, id",
+            (self.STATUS_IN_FLIGHT, claimed_before.isoformat()),
+        )
+        released = []
+        with closing(self._connect()) as conn, conn:
+            for punch in punches:
+                cursor = conn.execute(
+                    "UPDATE punch_queue SET status = ?, last_error = ? WHERE id = ? AND status = ?",
+                    (self.STATUS_UNKNOWN, error, punch.id, self.STATUS_IN_FLIGHT),
+                )
+                if cursor.rowcount == 1:
+                    released.append(punch)
+        return released
+
+    def _select(self, condition: str, params: tuple) -> list:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, user_id, channel_id, employee_key, record_type, recorded_at, attempts FROM punch_queue "
+                + condition,
+                params,
+            ).fetchall()
+        return [
+            QueuedPunch(
+                id=row[0],
+                user_id=row[1],
+                channel_id=row[2],
+                employee_key=row[3],
+                record_type=RecordType(row[4]),
+                recorded_at=datetime.fromisoformat(row[5]),
+                attempts=row[6],
+            )
+            for row in rows
+        ]
+
+    def mark_done(self, punch_id: int):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE punch_queue SET status = ?, attempts = attempts + 1 WHERE id = ?",
+                (self.STATUS_DONE, punch_id),
+            )
+
+    def mark_retry(self, punch_id: int, error: str, next_attempt_at: datetime):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE punch_queue SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ? "
+                "WHERE id = ?",
+                (self.STATUS_PENDING, error, next_attempt_at.isoformat(), punch_id),
+            )
+
+    def mark_failed(self, punch_id: int, error: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE punch_queue SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (self.STATUS_FAILED, error, punch_id),
+            )
+
+    def count_pending(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM punch_queue WHERE status = ?", (self.STATUS_PENDING,)).fetchone()[
+                0
+            ]
+
+
+_punch_queue = None
+_punch_queue_lock = threading.Lock()
+
+
+def get_punch_queue() -> PunchQueue:
+    global _punch_queue
+    with _punch_queue_lock:
+        if _punch_queue is None:
+            _punch_queue = PunchQueue(
+                os.environ.get("PUNCH_QUEUE_PATH", os.path.join(os.environ["HOME"], ".kintai_paccho", "punch_queue.db"))
+            )
+        return _punch_queue
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    # 打刻など、ユーザーが応答を待っているリクエスト
+    HIGH = 0
+    # 勤怠エラーチェックの日別データの取得など、待たせても問題ないリクエスト
+    LOW = 1
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class _TokenBucket:
+    """tokens と updated_at（time.time()）だけを持つトークンバケットの状態"""
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+    def take(self, now: float, rate: float, burst: float, floor: float) -> float:
+        """
+        トークンを1つ取り出す。トークンが floor + 1 個未満の場合は取り出さない
+
+        Returns:
+            取り出せた場合は 0、取り出せなかった場合はトークンが貯まるまでの秒数
+        """
+        self.tokens = min(burst, self.tokens + max(now - self.updated_at, 0) * rate)
+        self.updated_at = now
+        if self.tokens >= floor + 1:
+            self.tokens -= 1
+            return 0.0
+        return (floor + 1 - self.tokens) / rate
+
+
+class _LocalBucketStore:
+    def __init__(self, burst: float):
+        self._bucket = _TokenBucket(burst, time.time())
+        self._lock = threading.Lock()
+
+    def transact(self, fn):
+        with self._lock:
+            return fn(self._bucket)
+
+
+class _FileBucketStore:
+    """
+    トークンバケットの状態をファイルに保存し、同じファイルを使うプロセス間でレート制限を共有する
+
+    読み書きの間は fcntl.flock で排他ロックを取る（同じプロセスの別のスレッドとも排他になる）
+    """
+
+    def __init__(self, path: str, burst: float):
+        self.path = os.path.expanduser(path)
+        self.burst = burst
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def transact(self, fn):
+        import fcntl
+
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                    bucket = _TokenBucket(float(state["tokens"]), float(state["updated_at"]))
+                except (ValueError, KeyError, TypeError):
+                    bucket = _TokenBucket(self.burst, time.time())
+                result = fn(bucket)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": bucket.tokens, "updated_at": bucket.updated_at}))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+
+class RateLimiter:
+    """
+    KOT API へのリクエストを rate 件/秒（一度に burst 件まで）に制限するトークンバケット
+
+    トークンが reserved 個以下の場合は Priority.HIGH のリクエストだけが取り出せるので、
+    勤怠エラーチェックなどの Priority.LOW のリクエストが続いても打刻は待たされない。
+    また、同じプロセスで Priority.HIGH のリクエストが待っている間は Priority.LOW のリクエストを送らない
+
+    Args:
+        rate: 1秒あたりのリクエスト数。0 の場合は制限しない
+        path: 指定した場合はトークンバケットの状態をこのファイルに保存し、同じファイルを使うプロセス間で共有する
+    """
+
+    def __init__(
+        self, rate: float, burst: float, reserved: float = 0, path: str = None, name: str = "kot-rate-limiter"
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.reserved = min(reserved, max(burst - 1, 0))
+        self.name = name
+        self._store = _FileBucketStore(path, burst) if path else _LocalBucketStore(burst)
+        self._condition = threading.Condition()
+        self._waiting_high = 0
+        self._acquired = 0
+        self._throttled = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _try_acquire(self, priority: Priority) -> float:
+        """トークンを取り出せた場合は 0、取り出せなかった場合は次に試すまで待つ秒数を返す"""
+        with self._condition:
+            if priority != Priority.HIGH and self._waiting_high > 0:
+                return 1 / self.rate
+        # ファイルのロックを待っている間に _condition を持ち続けないように、トークンバケットの排他は store に任せる
+        floor = 0 if priority == Priority.HIGH else self.reserved
+        return self._store.transact(lambda bucket: bucket.take(time.time(), self.rate, self.burst, floor))
+
+    def _begin(self, priority: Priority):
+        if priority == Priority.HIGH:
+            with self._condition:
+                self._waiting_high += 1
+
+    def _end(self, priority: Priority, acquired: bool, waited: float):
+        with self._condition:
+            if priority == Priority.HIGH:
+                self._waiting_high -= 1
+            if acquired:
+                self._acquired += 1
+            else:
+                self._timeouts += 1
+            if waited > 0:
+                self._throttled += 1
+                self._wait_seconds += waited
+            self._condition.notify_all()
+
+    def acquire(self, priority: Priority = Priority.LOW, timeout: float = None):
+        """
+        リクエストを送ってよくなるまで待つ
+
+        Raises:
+            RateLimitTimeout: timeout 秒待っても送れなかった場合
+        """
+        if not self.enabled:
+            return
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+        acquired = throttled = False
+        self._begin(priority)
+        try:
+            while True:
+                wait = self._try_acquire(priority)
+                if wait == 0:
+                    acquired = True
+                    return
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"{self.name}: waited more than {timeout} seconds")
+                    wait = min(wait, remaining)
+                throttled = True
+                with self._condition:
+                    self._condition.wait(wait)
+        finally:
+            self._end(priority, acquired, time.monotonic() - started_at if throttled else 0)
+
+    async def acquire_async(self, priority: Priority = Priority.LOW, timeout: float = None):
+        """
+        acquire の asyncio 版
+
+        状態をファイルで共有している場合は、他のプロセスがロックを取っている間イベントループを止めないように、
+        ファイルの読み書きはスレッドで実行する
+        """
+        if not self.enabled:
+            return
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+        acquired = throttled = False
+        self._begin(priority)
+        try:
+            while True:
+                if isinstance(self._store, _FileBucketStore):
+                    wait = await asyncio.to_thread(self._try_acquire, priority)
+                else:
+                    wait = self._try_acquire(priority)
+                if wait == 0:
+                    acquired = True
+                    return
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"{self.name}: waited more than {timeout} seconds")
+                    wait = min(wait, remaining)
+                throttled = True
+                await asyncio.sleep(wait)
+        finally:
+            self._end(priority, acquired, time.monotonic() - started_at if throttled else 0)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            { "acquired": 送信したリクエスト数, "throttled": 待たされたリクエスト数,
+              "timeouts": 待ちきれなかったリクエスト数, "wait_seconds": 待った時間の合計 }
+        """
+        with self._condition:
+            return {
+                "acquired": self._acquired,
+                "throttled": self._throttled,
+                "timeouts": self._timeouts,
+                "wait_seconds": round(self._wait_seconds, 3),
+            }
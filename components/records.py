@@ -0,0 +1,157 @@
+import sys
+import threading
+from collections.abc import Mapping
+from datetime import date
+
+# KOT の日別データ（daily-workings, daily-schedules）のうち、勤怠エラーチェックで使う項目だけを持つレコード
+#
+# KOT のレスポンスの dict と同じキーで値を参照できるように Mapping として実装しているので、
+# _compute_error_map やメッセージの構築処理はレスポンスの dict と区別せずに扱える。
+# レスポンスに含まれていなかった項目は None で持ち、キーも存在しない扱いにする
+
+
+class _Record(Mapping):
+    __slots__ = ()
+    # (KOT のキー, 属性名)
+    _FIELDS = ()
+
+    def __getitem__(self, key):
+        for field, attr in self._FIELDS:
+            if field == key:
+                value = getattr(self, attr)
+                if value is None:
+                    break
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field, attr in self._FIELDS if getattr(self, attr) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class EmployeeRecord(_Record):
+    """currentDateEmployee。同じ内容の従業員は1つのオブジェクトを共有する"""
+
+    __slots__ = ("code", "last_name", "first_name")
+    _FIELDS = (("code", "code"), ("lastName", "last_name"), ("firstName", "first_name"))
+
+    def __init__(self, code, last_name, first_name):
+        self.code = code
+        self.last_name = last_name
+        self.first_name = first_name
+
+
+class DailyWorkingRecord(_Record):
+    __slots__ = ("employee_key", "employee", "is_error")
+    _FIELDS = (("employeeKey", "employee_key"), ("currentDateEmployee", "employee"), ("isError", "is_error"))
+
+    def __init__(self, employee_key, employee, is_error):
+        self.employee_key = employee_key
+        self.employee = employee
+        self.is_error = is_error
+
+
+class DailyScheduleRecord(_Record):
+    __slots__ = ("employee_key", "employee", "schedule_type_name")
+    _FIELDS = (
+        ("employeeKey", "employee_key"),
+        ("currentDateEmployee", "employee"),
+        ("scheduleTypeName", "schedule_type_name"),
+    )
+
+    def __init__(self, employee_key, employee, schedule_type_name):
+        self.employee_key = employee_key
+        self.employee = employee
+        self.schedule_type_name = schedule_type_name
+
+
+class _DailyRecords(_Record):
+    """1日分のデータ。日付は ordinal で持つ"""
+
+    __slots__ = ("date_ordinal", "records")
+
+    def __init__(self, date_ordinal, records):
+        self.date_ordinal = date_ordinal
+        self.records = records
+
+    @property
+    def date_str(self):
+        return None if self.date_ordinal is None else date.fromordinal(self.date_ordinal).isoformat()
+
+
+class DailyWorkings(_DailyRecords):
+    __slots__ = ()
+    _FIELDS = (("date", "date_str"), ("dailyWorkings", "records"))
+
+
+class DailySchedules(_DailyRecords):
+    __slots__ = ()
+    _FIELDS = (("date", "date_str"), ("dailySchedules", "records"))
+
+
+_employees = {}
+_employees_lock = threading.Lock()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _compact_employee(employee):
+    if employee is None:
+        return None
+    key = (employee.get("code"), employee.get("lastName"), employee.get("firstName"))
+    record = _employees.get(key)
+    if record is None:
+        with _employees_lock:
+            record = _employees.setdefault(key, EmployeeRecord(*(_intern(value) for value in key)))
+    return record
+
+
+def _date_ordinal(value):
+    return None if value is None else date.fromisoformat(value).toordinal()
+
+
+def _compact_items(items, compact_item):
+    return None if items is None else tuple(compact_item(item) for item in items)
+
+
+def _compact_working(working: dict) -> DailyWorkingRecord:
+    is_error = working.get("isError")
+    return DailyWorkingRecord(
+        _intern(working.get("employeeKey")),
+        _compact_employee(working.get("currentDateEmployee")),
+        None if is_error is None else bool(is_error),
+    )
+
+
+def _compact_schedule(schedule: dict) -> DailyScheduleRecord:
+    return DailyScheduleRecord(
+        _intern(schedule.get("employeeKey")),
+        _compact_employee(schedule.get("currentDateEmployee")),
+        _intern(schedule.get("scheduleTypeName")),
+    )
+
+
+def compact_daily_workings(daily_data: dict) -> DailyWorkings:
+    """KOT の daily-workings の1日分を DailyWorkings に変換する。変換済みの場合はそのまま返す"""
+    if isinstance(daily_data, DailyWorkings):
+        return daily_data
+    return DailyWorkings(
+        _date_ordinal(daily_data.get("date")), _compact_items(daily_data.get("dailyWorkings"), _compact_working)
+    )
+
+
+def compact_daily_schedules(daily_schedule: dict) -> DailySchedules:
+    """KOT の daily-schedules の1日分を DailySchedules に変換する。変換済みの場合はそのまま返す"""
+    if isinstance(daily_schedule, DailySchedules):
+        return daily_schedule
+    return DailySchedules(
+        _date_ordinal(daily_schedule.get("date")),
+        _compact_items(daily_schedule.get("dailySchedules"), _compact_schedule),
+    )
@@ -1,27 +1,146 @@
 import json
 import os
+import threading
+import time
 
-from components.strategy.data_strategy import create_data_strategy
+from components.cache import TTLCache
+from components.instrumentation import timed
+from components.strategy.data_strategy import ConcurrentUpdateError, create_data_strategy
+
+
+class _EmployeeCache:
+    """Slack のユーザーID → KOT の EmployeeKey のマッピングをプロセス内に保持する"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.data = None
+            self.version = None
+            self.checked_at = None
+            self.hits = 0
+            self.misses = 0
+
+
+def _timed_strategy(strategy, operation: str):
+    return timed(
+        "data_strategy_duration_seconds",
+        "ストレージの読み書きの所要時間",
+        strategy=type(strategy).__name__,
+        operation=operation,
+    )
 
 
 class Employee:
+    _cache = _EmployeeCache()
+    # ユーザー単位で読み書きできるストレージの場合のキャッシュ
+    _point_cache = TTLCache(ttl=float(os.environ.get("EMPLOYEE_CACHE_TTL", "300")), max_entries=10000)
+
     @classmethod
     def create(cls, user_id, key):
-        user_data = cls._read()
-        user_data[user_id] = key  # KOT の従業員の EmployeeKey
-        cls._write(user_data)
+        strategy = create_data_strategy()
+        if strategy.SUPPORTS_POINT_LOOKUP:
+            try:
+                with _timed_strategy(strategy, "put"):
+                    strategy.put(user_id, key)
+            except ConcurrentUpdateError:
+                # 他のプロセスが書き込んだ値を次回読み込むように、保持している値も捨てる
+                cls._point_cache.invalidate(user_id)
+                raise
+            # 保存できた場合だけキャッシュする
+            cls._point_cache.set(user_id, key)
+            return
+
+        with cls._cache.lock, strategy.lock():
+            # 他のプロセスの変更を消さないように、書き込み前は必ずストレージから読み込む
+            user_data = cls._read()
+            user_data[user_id] = key  # KOT の従業員の EmployeeKey
+            cls._write(user_data)
+            cls._store_cache(user_data, create_data_strategy().version())
 
     @classmethod
     def get_key(cls, user_id):
-        data = cls._read()
+        strategy = create_data_strategy()
+        if strategy.SUPPORTS_POINT_LOOKUP:
+            return cls._get_key_by_point_lookup(strategy, user_id)
+
+        data = cls._read_cached()
         if user_id in data:
             return data[user_id]
         return None
 
+    @classmethod
+    def clear_cache(cls):
+        cls._cache.clear()
+        cls._point_cache.invalidate()
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        point_cache_stats = cls._point_cache.stats()
+        return {
+            "hits": cls._cache.hits + point_cache_stats["hits"],
+            "misses": cls._cache.misses + point_cache_stats["misses"],
+        }
+
+    @classmethod
+    def _get_key_by_point_lookup(cls, strategy, user_id):
+        key = cls._point_cache.get(user_id)
+        if key is not None:
+            return key
+
+        # 未登録のユーザーは他のプロセスで登録されるかもしれないのでキャッシュしない
+        with _timed_strategy(strategy, "get"):
+            key = strategy.get(user_id)
+        if key is not None:
+            cls._point_cache.set(user_id, key)
+        return key
+
+    @classmethod
+    def _read_cached(cls):
+        strategy = create_data_strategy()
+        cache = cls._cache
+        with cache.lock:
+            now = time.monotonic()
+            if cache.data is not None:
+                if now - cache.checked_at < strategy.VERSION_CHECK_INTERVAL:
+                    cache.hits += 1
+                    return cache.data
+
+                with _timed_strategy(strategy, "version"):
+                    version = strategy.version()
+                if version is not None and version == cache.version:
+                    cache.hits += 1
+                    cache.checked_at = now
+                    return cache.data
+            else:
+                with _timed_strategy(strategy, "version"):
+                    version = strategy.version()
+
+            # 読み込み中に更新された場合は次回の確認で読み込み直すように、バージョンは読み込み前の値を保持する
+            cache.misses += 1
+            with _timed_strategy(strategy, "read"):
+                data = strategy.read()
+            cls._store_cache(data, version)
+            return data
+
+    @classmethod
+    def _store_cache(cls, data, version):
+        cache = cls._cache
+        with cache.lock:
+            cache.data = data
+            cache.version = version
+            cache.checked_at = time.monotonic()
+
     @classmethod
     def _write(cls, data):
-        create_data_strategy().write(data)
+        strategy = create_data_strategy()
+        with _timed_strategy(strategy, "write"):
+            strategy.write(data)
 
     @classmethod
     def _read(cls):
-        return create_data_strategy().read()
+        strategy = create_data_strategy()
+        with _timed_strategy(strategy, "read"):
+            return strategy.read()
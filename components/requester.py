@@ -1,20 +1,253 @@
 import json
 import os
+import threading
+import time
+from contextlib import closing
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from .instrumentation import KOTCall, connecting, current_kot_call, kot_call
+from .json_stream import NotJSONArrayError, iter_json_array
+from .rate_limiter import Priority, RateLimiter, RateLimitTimeout
+from .retry import REJECTED_STATUSES, RetryBudget, RetryPolicy, parse_retry_after
 
 
 class KOTException(Exception):
     pass
 
 
+class _TimedConnectionMixin:
+    """
+    新しく張ったコネクションの接続にかかった時間を KOTCall に記録する
+
+    urllib3 の内部に依存しないように、DNS の名前解決・TCP の接続・TLS のハンドシェイク
+    （プロキシ経由の場合は CONNECT を含む）は分けずに、まとめて connect として記録する
+    """
+
+    def connect(self):
+        call = current_kot_call()
+        if call is None:
+            return super().connect()
+
+        with call.measure("connect"):
+            super().connect()
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """プロキシ経由の場合も含めて、コネクションに _TimedConnectionMixin を使う"""
+
+    _POOL_CLASSES = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = self._POOL_CLASSES
+        return manager
+
+
+class KOTSessionPool:
+    """
+    KOT API への HTTP コネクションをプロセス全体で共有するためのセッションプール
+
+    打刻のたびに TCP + TLS のハンドシェイクが発生しないように、keep-alive されたコネクションを使い回す
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        self._lock = threading.Lock()
+        self._request_count = 0
+
+    @property
+    def timeout(self):
+        return self.connect_timeout, self.read_timeout
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _TimedHTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def count_request(self):
+        with self._lock:
+            self._request_count += 1
+
+    def stats(self) -> dict:
+        """
+        プールの利用状況を返す
+
+        Returns:
+            { "requests": 送信したリクエスト数, "connections": 新規に張ったコネクション数, "pools": ホストごとのプール数 }
+        """
+        connections = 0
+        pools = 0
+        if self._session is not None:
+            for adapter in set(self._session.adapters.values()):
+                managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+                for manager in managers:
+                    for pool_key in manager.pools.keys():
+                        pool = manager.pools.get(pool_key)
+                        if pool is None:
+                            continue
+                        pools += 1
+                        connections += pool.num_connections
+        return {"requests": self._request_count, "connections": connections, "pools": pools}
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            self._request_count = 0
+
+
+_session_pool = KOTSessionPool(
+    pool_size=int(os.environ.get("KOT_HTTP_POOL_SIZE", "10")),
+    connect_timeout=float(os.environ.get("KOT_HTTP_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.environ.get("KOT_HTTP_READ_TIMEOUT", "30")),
+)
+
+
+def get_session_pool() -> KOTSessionPool:
+    return _session_pool
+
+
+_retry_budget = RetryBudget(
+    ratio=float(os.environ.get("KOT_RETRY_BUDGET_RATIO", "0.2")),
+    min_retries_per_second=float(os.environ.get("KOT_RETRY_BUDGET_MIN_PER_SECOND", "1")),
+)
+
+
+def _create_retry_policies() -> dict:
+    base_delay = float(os.environ.get("KOT_RETRY_BASE_DELAY", "0.5"))
+    max_retry_after = float(os.environ.get("KOT_RETRY_MAX_RETRY_AFTER", "30"))
+    # GET・PUT は何度送っても結果が変わらないので、接続エラーや 5xx でも再送する
+    idempotent_policy = RetryPolicy(
+        max_attempts=int(os.environ.get("KOT_RETRY_MAX_ATTEMPTS", "4")),
+        base_delay=base_delay,
+        max_delay=float(os.environ.get("KOT_RETRY_MAX_DELAY", "8")),
+        max_retry_after=max_retry_after,
+        budget=_retry_budget,
+    )
+    return {
+        "GET": idempotent_policy,
+        "PUT": idempotent_policy,
+        # POST は打刻なので、KOT に届かなかったことがわかる場合だけ再送する。Slack で応答を待っているので待ち時間は短くする
+        "POST": RetryPolicy(
+            max_attempts=int(os.environ.get("KOT_TIMERECORD_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=base_delay,
+            max_delay=float(os.environ.get("KOT_TIMERECORD_RETRY_MAX_DELAY", "4")),
+            idempotent=False,
+            max_retry_after=max_retry_after,
+            budget=_retry_budget,
+        ),
+    }
+
+
+_retry_policies = _create_retry_policies()
+
+
+def get_retry_policy(method: str) -> RetryPolicy:
+    return _retry_policies[method]
+
+
+def get_retry_budget() -> RetryBudget:
+    return _retry_budget
+
+
+# KOT API のレート制限（トークンごと）を超えないように、送信するペースを制限する。
+# トークンが KOT_RATE_LIMIT_RESERVED 個以下になったら打刻（POST）だけを送る
+_rate_limiter = RateLimiter(
+    rate=float(os.environ.get("KOT_RATE_LIMIT_PER_SECOND", "10")),
+    burst=float(os.environ.get("KOT_RATE_LIMIT_BURST", "10")),
+    reserved=float(os.environ.get("KOT_RATE_LIMIT_RESERVED", "2")),
+    path=os.environ.get("KOT_RATE_LIMIT_STATE_PATH") or None,
+)
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+
+def _is_request_not_sent(e: requests.RequestException) -> bool:
+    """接続できなかったなど、リクエストが KOT に届いていないことが確実な例外か"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError):
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def is_request_rejected(e: Exception) -> bool:
+    """
+    KOT がリクエストを処理していないことが確実な例外か
+
+    打刻の POST を送り直してよいのはこの場合だけ。タイムアウトや 500 などは KOT 側で打刻が登録されている可能性がある
+    """
+    if isinstance(e, RateLimitTimeout):
+        return True
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in REJECTED_STATUSES
+    if isinstance(e, requests.RequestException):
+        return _is_request_not_sent(e)
+    return False
+
+
 class KOTRequester:
-    KOT_API_BASE_URL = "https://api.kingtime.jp/v1.0"
+    # 負荷試験などでモックサーバーに接続する場合に変更する
+    KOT_API_BASE_URL = os.environ.get("KOT_API_BASE_URL", "https://api.kingtime.jp/v1.0")
     KOT_TOKEN = os.environ.get("KOT_TOKEN")
     KOT_HTTPS_PROXY = os.environ.get("KOT_HTTPS_PROXY")
+    # get_stream でソケットから一度に読み込むバイト数
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # レート制限で送信を待つ優先度。打刻（POST）は勤怠エラーチェックなどの GET より先に送る
+    RATE_LIMIT_PRIORITIES = {"GET": Priority.LOW, "PUT": Priority.LOW, "POST": Priority.HIGH}
+    # レート制限で送信を待つ最大の秒数
+    RATE_LIMIT_MAX_WAIT = float(os.environ.get("KOT_RATE_LIMIT_MAX_WAIT", "30"))
 
-    def __init__(self):
+    def __init__(
+        self, session_pool: KOTSessionPool = None, retry_policies: dict = None, rate_limiter: RateLimiter = None
+    ):
         self.base_url = self.KOT_API_BASE_URL
+        self.session_pool = session_pool or get_session_pool()
+        # {"GET": RetryPolicy, "POST": RetryPolicy, "PUT": RetryPolicy}。指定しない場合は環境変数の設定を使う
+        self.retry_policies = retry_policies or _retry_policies
+        self.rate_limiter = rate_limiter or get_rate_limiter()
         self.headers = {
             "Content-Type": "application/json; charset=utf-8",
             "Authorization": "Bearer {token}".format(token=self.KOT_TOKEN),
@@ -27,29 +260,102 @@ class KOTRequester:
             else None
         )
 
-    def get(self, uri):
+    def _send(self, method: str, uri: str, call: KOTCall, **kwargs) -> requests.Response:
+        """
+        RateLimiter で送信するペースを制限しながらリクエストを送信し、
+        一時的なエラー（429・5xx・接続エラー）の場合は RetryPolicy に従って再送する
+
+        再送しない場合や再送しても失敗した場合は、最後のエラーを送出する。
+        送信回数・ステータスコード・コネクションを張る時間・レスポンスヘッダーを受け取るまでの時間は call に記録する
+        """
         url = self.base_url + uri
-        resp = requests.get(url, headers=self.headers, proxies=self.proxies)
-        resp.raise_for_status()
-        resp_json = json.loads(resp.text)
+        policy = self.retry_policies[method]
+        send = getattr(self.session_pool.session, method.lower())
+        priority = self.RATE_LIMIT_PRIORITIES[method]
+        policy.record_request()
+        attempt = 1
+        while True:
+            # 再送も KOT のレート制限に数えられるので、送信のたびに待つ
+            self.rate_limiter.acquire(priority, timeout=self.RATE_LIMIT_MAX_WAIT)
+            self.session_pool.count_request()
+            call.attempts = attempt
+            started_at = time.perf_counter()
+            connecting_before = call.connecting_time
+            try:
+                with connecting(call):
+                    resp = send(
+                        url, headers=self.headers, proxies=self.proxies, timeout=self.session_pool.timeout, **kwargs
+                    )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                call.status = None
+                delay = policy.next_delay(attempt, request_sent=not _is_request_not_sent(e))
+                if delay is None:
+                    raise
+            else:
+                # レスポンスヘッダーを受け取るまでの時間から、コネクションを張った時間を除く
+                elapsed = time.perf_counter() - started_at
+                call.add_phase("wait", max(elapsed - (call.connecting_time - connecting_before), 0))
+                status = call.status = resp.status_code
+                delay = None
+                if status in policy.retry_statuses:
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    delay = policy.next_delay(attempt, status=status, retry_after=retry_after)
+                if delay is None:
+                    try:
+                        resp.raise_for_status()
+                    except requests.HTTPError:
+                        resp.close()
+                        raise
+                    return resp
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _request(self, method: str, uri: str, **kwargs):
+        with kot_call(method, uri) as call:
+            resp = self._send(method, uri, call, **kwargs)
+            with call.measure("transfer"):
+                content = resp.content
+            call.bytes = len(content)
+            with call.measure("json_decode"):
+                resp_json = json.loads(resp.text)
         if "errors" in resp_json:
             raise KOTException(resp_json["errors"][0]["message"])
         return resp_json
 
+    def get(self, uri):
+        return self._request("GET", uri)
+
+    def get_stream(self, uri):
+        """
+        レスポンスがJSONの配列のAPIを、要素を1つずつ返すイテレータとして取得する
+
+        レスポンス全体を読み込んでからデコードするのではなく、受信したデータから順に要素を取り出す。
+        リクエストはイテレータから最初の要素を取り出すときに送信する。再送するのはレスポンスを受信し始める前だけ
+        """
+        with kot_call("GET", uri) as call:
+            resp = self._send("GET", uri, call, stream=True)
+            with closing(resp):
+                try:
+                    yield from iter_json_array(self._iter_content(resp, call))
+                except NotJSONArrayError as e:
+                    if isinstance(e.document, dict) and "errors" in e.document:
+                        raise KOTException(e.document["errors"][0]["message"])
+                    raise
+
+    def _iter_content(self, resp: requests.Response, call: KOTCall):
+        """受信したデータを返しながら、受信にかかった時間（デコードの時間を除く）とバイト数を call に記録する"""
+        chunks = resp.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+        while True:
+            with call.measure("transfer"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            call.bytes += len(chunk)
+            yield chunk
+
     def post(self, uri, payload):
-        url = self.base_url + uri
-        resp = requests.post(url, headers=self.headers, data=payload, proxies=self.proxies)
-        resp.raise_for_status()
-        resp_json = json.loads(resp.text)
-        if "errors" in resp_json:
-            raise KOTException(resp_json["errors"][0]["message"])
-        return resp_json
+        return self._request("POST", uri, data=payload)
 
     def put(self, uri, payload):
-        url = self.base_url + uri
-        resp = requests.put(url, headers=self.headers, json=payload, proxies=self.proxies)
-        resp.raise_for_status()
-        resp_json = json.loads(resp.text)
-        if "errors" in resp_json:
-            raise KOTException(resp_json["errors"][0]["message"])
-        return resp_json
+        return self._request("PUT", uri, json=payload)
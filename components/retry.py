@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# 打刻などの冪等でないリクエストでも、KOT が処理せずに拒否したことがわかるので再送してよいステータスコード
+REJECTED_STATUSES = (429, 503)
+
+
+def parse_retry_after(value, now: datetime = None):
+    """
+    Retry-After ヘッダーの値（秒数または HTTP-date）を秒数にする
+
+    Returns:
+        待つ秒数。ヘッダーがない場合や解釈できない場合は None
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max((retry_at - now).total_seconds(), 0.0)
+
+
+class RetryBudget:
+    """
+    再送の回数を、直近 window 秒のリクエスト数の ratio 倍（少なくとも min_retries_per_second * window 回）に制限する
+
+    KOT が混み合っているときに、全てのリクエストが再送を繰り返して負荷をさらに増やす（リトライストーム）のを防ぐ。
+    プロセス内の全ての KOTRequester で共有する
+    """
+
+    def __init__(self, ratio: float, min_retries_per_second: float, window: float = 10):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests = deque()
+        self._retries = deque()
+        self._exhausted = 0
+
+    def _expire(self, now: float):
+        for timestamps in (self._requests, self._retries):
+            while timestamps and timestamps[0] <= now - self.window:
+                timestamps.popleft()
+
+    def record_request(self):
+        """再送ではないリクエストを送信するときに呼び出す"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """再送してよい場合は再送の回数に数えてTrueを返す"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            allowed = max(self.min_retries_per_second * self.window, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                self._exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries), "exhausted": self._exhausted}
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._retries.clear()
+            self._exhausted = 0
+
+
+class RetryPolicy:
+    """
+    KOT API へのリクエストを再送する条件と、再送までの待ち時間
+
+    待ち時間は base_delay * 2^(attempt - 1) を max_delay で頭打ちにした範囲からランダムに選ぶ（full jitter）。
+    Retry-After が返ってきた場合はその時間以上待ち、max_retry_after より長い場合は再送しない。
+
+    idempotent=False のリクエスト（打刻の POST）は、KOT に届かなかったことがわかる場合
+    （接続できなかった、REJECTED_STATUSES が返ってきた）だけ再送する。
+    タイムアウトや 500 などは KOT 側で打刻が登録されている可能性があり、再送すると二重に打刻されてしまうため再送しない
+
+    Args:
+        max_attempts: 最初のリクエストを含めた最大の送信回数。1 の場合は再送しない
+        retry_statuses: 再送するステータスコード
+        budget: 共有する RetryBudget。None の場合は再送の回数を制限しない
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        idempotent: bool = True,
+        retry_statuses=(429, 500, 502, 503, 504),
+        max_retry_after: float = 30,
+        budget: RetryBudget = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idempotent = idempotent
+        self.retry_statuses = tuple(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+
+    def is_retryable(self, status: int = None, request_sent: bool = True) -> bool:
+        """
+        Args:
+            status: レスポンスのステータスコード。接続エラーやタイムアウトでレスポンスがない場合は None
+            request_sent: リクエストが KOT に届いた可能性があるか（接続できなかった場合は False）
+        """
+        if status is None:
+            return self.idempotent or not request_sent
+        if status not in self.retry_statuses:
+            return False
+        return self.idempotent or status in REJECTED_STATUSES
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """attempt 回目の送信に失敗した後、次に送信するまで待つ秒数。Retry-After が長すぎる場合は None"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_delay(self, attempt: int, status: int = None, request_sent: bool = True, retry_after: float = None):
+        """
+        attempt 回目の送信に失敗したときに、再送するかどうかと待つ秒数を決める
+
+        Returns:
+            再送するまで待つ秒数。再送しない場合は None
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(status, request_sent):
+            return None
+        delay = self.backoff(attempt, retry_after)
+        if delay is None:
+            return None
+        if self.budget is not None and not self.budget.try_acquire():
+            return None
+        return delay
+
+    def record_request(self):
+        if self.budget is not None:
+            self.budget.record_request()
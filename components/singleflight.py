@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中の場合は新たに実行せず、実行中の処理の結果を共有する
+
+    結果のオブジェクトは呼び出し元の間で共有されるため、呼び出し元で変更しないこと
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._total = 0
+        self._deduplicated = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._deduplicated += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self._total, "deduplicated": self._deduplicated, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight の asyncio 版。同じキーの処理が実行中の場合は、実行中のタスクの結果を待って共有する
+
+    呼び出し元の1つがキャンセルされても、待っている他の呼び出し元のために処理は続ける
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._total = 0
+        self._deduplicated = 0
+
+    async def do(self, key, fn):
+        """fn は引数なしで呼び出すと awaitable を返す関数"""
+        self._total += 1
+        task = self._tasks.get(key)
+        if task is not None:
+            self._deduplicated += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # 待っている呼び出し元が全てキャンセルされた場合に、取得されなかった例外として警告が出ないようにする
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"calls": self._total, "deduplicated": self._deduplicated, "in_flight": len(self._tasks)}
@@ -0,0 +1,29 @@
+import os
+
+from components.cache import TTLCache
+from components.strategy.data_strategy import CacheDataStrategy, DataStrategy
+
+
+class InMemoryCacheDataStrategy(CacheDataStrategy):
+    """
+    プロセス内のメモリに保持するキャッシュの層
+
+    一番安い層なので DATA_STRATEGY_CACHES の先頭に置く。他のプロセスの登録は TTL が切れるまで反映されない
+    """
+
+    TTL = float(os.environ.get("DATA_CACHE_TTL", "300"))
+    MAX_ENTRIES = int(os.environ.get("DATA_CACHE_MAX_ENTRIES", "10000"))
+
+    def __init__(self, backend: DataStrategy):
+        super().__init__(backend)
+        self.cache = TTLCache(ttl=self.TTL, max_entries=self.MAX_ENTRIES)
+
+    def _get_cached(self, user_id):
+        return self.cache.get(user_id)
+
+    def _set_cached(self, data: dict):
+        for user_id, key in data.items():
+            self.cache.set(user_id, key)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
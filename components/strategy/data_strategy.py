@@ -1,20 +1,166 @@
+import importlib
 import os
+import threading
+from contextlib import nullcontext
+
+
+class ConcurrentUpdateError(Exception):
+    """put() で読み込んでから書き込むまでの間に、他のプロセスが同じユーザーを書き込んだため保存しなかった"""
 
 
 class DataStrategy:
+    # version() の確認間隔（秒）。0 の場合は読み込みのたびに確認する
+    VERSION_CHECK_INTERVAL = 0
+    # True の場合は read() で全件を読み込まずに get() / put() でユーザー単位に読み書きする
+    SUPPORTS_POINT_LOOKUP = False
+
     def read(self) -> dict:
         raise NotImplementedError()
 
     def write(self, data):
         raise NotImplementedError()
 
+    def version(self):
+        """
+        保存されているデータのバージョンを返す
+
+        read() よりも軽い処理でデータが変更されたかどうかを判定するために使う。
+        判定できない場合は None を返す
+        """
+        return None
+
+    def lock(self):
+        """
+        read() から write() までの間、他のプロセスから書き込まれないようにするロックを返す
+
+        ロックできないストレージの場合は何もしない
+        """
+        return nullcontext()
+
+    def get(self, user_id):
+        """指定したユーザーの EmployeeKey を返す。登録されていない場合は None を返す"""
+        return self.read().get(user_id)
+
+    def put(self, user_id, key):
+        """指定したユーザーの EmployeeKey を保存する"""
+        data = self.read()
+        data[user_id] = key
+        self.write(data)
+
+
+class CacheDataStrategy(DataStrategy):
+    """
+    backend の前段に置くキャッシュの層
+
+    ユーザー単位の読み込みは自分が持っていればそれを返し、持っていなければ backend から読み込んで保持する。
+    書き込みは backend に書き込んでから自分にも保持する（ライトスルー）。
+    未登録のユーザーは他のプロセスで登録されるかもしれないのでキャッシュしない
+    """
+
+    SUPPORTS_POINT_LOOKUP = True
+
+    def __init__(self, backend: DataStrategy):
+        self.backend = backend
+        self.VERSION_CHECK_INTERVAL = backend.VERSION_CHECK_INTERVAL
+
+    def _get_cached(self, user_id):
+        raise NotImplementedError()
+
+    def _set_cached(self, data: dict):
+        raise NotImplementedError()
+
+    def get(self, user_id):
+        key = self._get_cached(user_id)
+        if key is not None:
+            return key
+        key = self.backend.get(user_id)
+        if key is not None:
+            self._set_cached({user_id: key})
+        return key
+
+    def put(self, user_id, key):
+        self.backend.put(user_id, key)
+        self._set_cached({user_id: key})
+
+    def read(self) -> dict:
+        return self.backend.read()
+
+    def write(self, data):
+        self.backend.write(data)
+        self._set_cached(data)
+
+    def version(self):
+        return self.backend.version()
+
+    def lock(self):
+        return self.backend.lock()
+
+
+# DATA_STRATEGY・DATA_STRATEGY_CACHES に指定できる名前 → クラスのパス（使うときに import する）
+_registry = {
+    "LocalFileDataStrategy": "components.strategy.local_file_data_strategy.LocalFileDataStrategy",
+    "DynamoDBDataStrategy": "components.strategy.dynamodb_data_strategy.DynamoDBDataStrategy",
+    "DynamoDBItemDataStrategy": "components.strategy.dynamodb_item_data_strategy.DynamoDBItemDataStrategy",
+    "SQLiteDataStrategy": "components.strategy.sqlite_data_strategy.SQLiteDataStrategy",
+    "InMemoryCacheDataStrategy": "components.strategy.cache_data_strategy.InMemoryCacheDataStrategy",
+    "RedisCacheDataStrategy": "components.strategy.redis_cache_data_strategy.RedisCacheDataStrategy",
+}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_data_strategy(name: str, factory):
+    """
+    DATA_STRATEGY・DATA_STRATEGY_CACHES で指定できるストレージを追加する
+
+    Args:
+        factory: DataStrategy を作る関数（クラス）またはクラスのパス。キャッシュの層の場合は backend を引数に受け取る
+    """
+    _registry[name] = factory
+
+
+def _resolve(name: str):
+    if name not in _registry:
+        raise ValueError(f"Unknown data strategy: {name}")
+    factory = _registry[name]
+    if isinstance(factory, str):
+        module_name, class_name = factory.rsplit(".", 1)
+        factory = getattr(importlib.import_module(module_name), class_name)
+    return factory
+
+
+def _build_data_strategy(base: str, caches: tuple) -> DataStrategy:
+    strategy = _resolve(base)()
+    # 一番安いキャッシュ（先頭）から読み込むように、後ろのキャッシュから順に重ねる
+    for name in reversed(caches):
+        strategy = _resolve(name)(strategy)
+    return strategy
+
 
 def create_data_strategy() -> DataStrategy:
-    if os.environ.get("DATA_STRATEGY") == "DynamoDBDataStrategy":
-        from components.strategy.dynamodb_data_strategy import DynamoDBDataStrategy
+    """
+    環境変数で指定されたストレージを返す。同じ設定のストレージはプロセス内で1回だけ作る
+
+    DATA_STRATEGY: データを保存するストレージ。未設定の場合は LocalFileDataStrategy
+    DATA_STRATEGY_CACHES: DATA_STRATEGY の前段に置くキャッシュの層をカンマ区切りで指定する（読み込みは先頭から順に試す）
+        例: InMemoryCacheDataStrategy,RedisCacheDataStrategy
+
+    Raises:
+        ValueError: 登録されていない名前が指定された場合。run.py・run_async.py では起動時に呼び出して設定を確認する
+    """
+    base = os.environ.get("DATA_STRATEGY") or "LocalFileDataStrategy"
+    caches = tuple(name.strip() for name in os.environ.get("DATA_STRATEGY_CACHES", "").split(",") if name.strip())
+    key = (base, caches)
+    strategy = _instances.get(key)
+    if strategy is None:
+        with _instances_lock:
+            strategy = _instances.get(key)
+            if strategy is None:
+                strategy = _instances[key] = _build_data_strategy(base, caches)
+    return strategy
 
-        return DynamoDBDataStrategy()
-    else:
-        from components.strategy.local_file_data_strategy import LocalFileDataStrategy
 
-        return LocalFileDataStrategy()
+def clear_data_strategies():
+    """作成済みのストレージを破棄する（テストで設定を変える場合などに使う）"""
+    with _instances_lock:
+        _instances.clear()
@@ -12,6 +12,8 @@ class DataModel(Model):
     class Meta:
         table_name = os.environ["DYNAMODB_DATA_TABLE_NAME"]
         region = os.environ["DYNAMODB_REGION"]
+        # DynamoDB Local などに接続する場合に設定する（例: http://localhost:8000）
+        host = os.environ.get("DYNAMODB_HOST")
 
     key = UnicodeAttribute(hash_key=True)
     value = UnicodeAttribute()
@@ -20,6 +22,7 @@ class DataModel(Model):
 
 class DynamoDBDataStrategy(DataStrategy):
     DATA_KEY = "employee"
+    VERSION_CHECK_INTERVAL = float(os.environ.get("DYNAMODB_VERSION_CHECK_INTERVAL", "30"))
 
     def read(self) -> dict:
         try:
@@ -31,3 +34,11 @@ class DynamoDBDataStrategy(DataStrategy):
 
     def write(self, data):
         DataModel(hash_key=self.DATA_KEY, value=json.dumps(data), updated_at=datetime.now().isoformat()).save()
+
+    def version(self):
+        # value は取得せずに updated_at だけを取得する
+        try:
+            record = DataModel.get(hash_key=self.DATA_KEY, attributes_to_get=["updated_at"])
+            return self.DATA_KEY, record.updated_at
+        except DataModel.DoesNotExist:
+            return self.DATA_KEY, None
@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timezone
+
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute
+from pynamodb.exceptions import UpdateError
+from pynamodb.models import Model
+
+from components.strategy.data_strategy import ConcurrentUpdateError, DataStrategy
+
+
+class EmployeeItemModel(Model):
+    class Meta:
+        table_name = os.environ["DYNAMODB_EMPLOYEE_TABLE_NAME"]
+        region = os.environ["DYNAMODB_REGION"]
+        # DynamoDB Local などに接続する場合に設定する（例: http://localhost:8000）
+        host = os.environ.get("DYNAMODB_HOST")
+
+    user_id = UnicodeAttribute(hash_key=True)
+    employee_key = UnicodeAttribute()
+    # UTC の ISO 8601 形式。ログや調査用で、書き込みの順番の判定には使わない
+    updated_at = UnicodeAttribute()
+    # put() のたびに1増やす。write() で保存したアイテムや、追加する前に保存されたアイテムにはない
+    version = NumberAttribute(null=True)
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class DynamoDBItemDataStrategy(DataStrategy):
+    """
+    Slack のユーザーごとに1アイテムとして保存する
+
+    DynamoDBDataStrategy は全従業員分のマッピングを1アイテムに保存しているため、
+    読み書きのたびに全件を扱う必要があり、アイテムサイズの上限（400KB）にも引っかかる
+    """
+
+    SUPPORTS_POINT_LOOKUP = True
+
+    def get(self, user_id):
+        try:
+            return EmployeeItemModel.get(hash_key=user_id).employee_key
+        except EmployeeItemModel.DoesNotExist:
+            return None
+
+    def put(self, user_id, key):
+        """
+        読み込んだときの version から変わっていない場合だけ保存し、version を1増やす
+
+        Raises:
+            ConcurrentUpdateError: 読み込んでから書き込むまでの間に他のプロセスが同じユーザーを書き込んだ場合
+        """
+        try:
+            version = EmployeeItemModel.get(
+                hash_key=user_id, consistent_read=True, attributes_to_get=["version"]
+            ).version
+        except EmployeeItemModel.DoesNotExist:
+            version = None
+
+        # 各ホストの時計に依存しないように、書き込みの順番は version で判定する
+        if version is None:
+            condition = EmployeeItemModel.version.does_not_exist()
+        else:
+            condition = EmployeeItemModel.version == version
+        try:
+            EmployeeItemModel(hash_key=user_id).update(
+                actions=[
+                    EmployeeItemModel.employee_key.set(key),
+                    EmployeeItemModel.updated_at.set(_utcnow()),
+                    EmployeeItemModel.version.add(1),
+                ],
+                condition=condition,
+            )
+        except UpdateError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                raise ConcurrentUpdateError(f"{user_id} was updated concurrently") from e
+            raise
+
+    def read(self) -> dict:
+        return {item.user_id: item.employee_key for item in EmployeeItemModel.scan()}
+
+    def write(self, data):
+        """data に含まれるユーザーを全て保存する（data に含まれないユーザーは削除しない）"""
+        updated_at = _utcnow()
+        with EmployeeItemModel.batch_write() as batch:
+            for user_id, key in data.items():
+                batch.save(EmployeeItemModel(hash_key=user_id, employee_key=key, updated_at=updated_at))
@@ -1,24 +1,99 @@
 import json
 import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
 
 from components.strategy.data_strategy import DataStrategy
 
+# スレッドごとに、ロックを取っている JSON ファイルのパス。同じスレッドで lock() を入れ子にしてもデッドロックしないようにする
+_held_locks = threading.local()
+
+
+def _get_umask() -> int:
+    # umask は変更しないと取得できないので、他のスレッドがファイルを作る前の import 時に1回だけ取得する
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _get_umask()
+
 
 class LocalFileDataStrategy(DataStrategy):
+    """
+    Slack のユーザーID → KOT の EmployeeKey のマッピングを JSON ファイルに保存する
+
+    書き込みは一時ファイルに書いてから rename で置き換えるので、読み込み側が書きかけのファイルを読むことはない。
+    書き込み（読み込み→変更→書き込み）の間は、同じファイルを使うプロセス間で fcntl.flock の排他ロックを取る
+    """
+
     DATA_DIR = os.path.join(os.environ["HOME"], ".kintai_paccho")
     DATA_JSON = os.path.join(DATA_DIR, "employee_data.json")
 
     def read(self) -> dict:
         if not os.path.exists(self.DATA_JSON):
-            self.write({})
-        f = open(self.DATA_JSON, "r")
-        json_str = f.read()
-        f.close()
-        return json.loads(json_str)
+            # 確かめてから作るまでの間に他のプロセスが書き込んだ最初の登録を {} で上書きしないように、ロックを取って確かめ直す
+            with self.lock():
+                if not os.path.exists(self.DATA_JSON):
+                    self.write({})
+        with open(self.DATA_JSON, "r") as f:
+            return json.loads(f.read())
 
     def write(self, data):
-        if not os.path.exists(self.DATA_DIR):
-            os.makedirs(self.DATA_DIR, exist_ok=True)
-        f = open(self.DATA_JSON, "w")
-        f.write(json.dumps(data))
-        f.close()
+        with self.lock():
+            fd, temp_path = tempfile.mkstemp(dir=self.DATA_DIR, prefix=".employee_data.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    # mkstemp は 0600 で作るので、置き換えても他のユーザーが読めるように元のファイルのパーミッションに合わせる
+                    os.fchmod(f.fileno(), self._file_mode())
+                    f.write(json.dumps(data))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.DATA_JSON)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def _file_mode(self) -> int:
+        """JSON ファイルのパーミッション。ファイルがない場合は open() で作った場合と同じ 0666 & ~umask"""
+        try:
+            return stat.S_IMODE(os.stat(self.DATA_JSON).st_mode)
+        except FileNotFoundError:
+            return 0o666 & ~_UMASK
+
+    def put(self, user_id, key):
+        # 他のプロセスの登録を上書きしないように、読み込みから書き込みまでロックを取る
+        with self.lock():
+            super().put(user_id, key)
+
+    @contextmanager
+    def lock(self):
+        """同じ JSON ファイルを使うプロセス間で排他ロックを取る"""
+        import fcntl
+
+        held = getattr(_held_locks, "paths", None)
+        if held is None:
+            held = _held_locks.paths = set()
+        if self.DATA_JSON in held:
+            yield
+            return
+
+        os.makedirs(self.DATA_DIR, exist_ok=True)
+        with open(self.DATA_JSON + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            held.add(self.DATA_JSON)
+            try:
+                yield
+            finally:
+                held.discard(self.DATA_JSON)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def version(self):
+        # 書き込みのたびに rename で別のファイルに置き換わるので、同じ時刻・同じサイズで更新された場合も inode で判定できる
+        try:
+            file_stat = os.stat(self.DATA_JSON)
+        except FileNotFoundError:
+            return self.DATA_JSON, None
+        return self.DATA_JSON, file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
@@ -0,0 +1,60 @@
+"""
+DynamoDBDataStrategy（全従業員分を1アイテムに保存）から DynamoDBItemDataStrategy（ユーザーごとに1アイテム）に移行する
+
+$ poetry run python -m components.strategy.migrate_dynamodb_items [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+
+from components.strategy.dynamodb_data_strategy import DataModel, DynamoDBDataStrategy
+from components.strategy.dynamodb_item_data_strategy import DynamoDBItemDataStrategy, EmployeeItemModel
+
+logger = logging.getLogger()
+
+
+def migrate(dry_run: bool = False) -> dict:
+    """
+    移行を実行する
+
+    Returns:
+        dict: 移行したデータ
+    """
+    try:
+        record = DataModel.get(hash_key=DynamoDBDataStrategy.DATA_KEY)
+    except DataModel.DoesNotExist:
+        logger.info("migrate: source item does not exist")
+        return {}
+
+    data = json.loads(record.value)
+    logger.info(f"migrate: {len(data)} users found")
+    if dry_run:
+        return data
+
+    if not EmployeeItemModel.exists():
+        EmployeeItemModel.create_table(billing_mode="PAY_PER_REQUEST", wait=True)
+
+    DynamoDBItemDataStrategy().write(data)
+
+    migrated = DynamoDBItemDataStrategy().read()
+    missing = [user_id for user_id, key in data.items() if migrated.get(user_id) != key]
+    if missing:
+        raise RuntimeError(f"migrate: {len(missing)} users are not migrated: {missing}")
+
+    logger.info(f"migrate: {len(data)} users migrated")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="書き込みをせずに移行対象の件数だけ表示する")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    migrate(dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
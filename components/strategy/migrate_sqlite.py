@@ -0,0 +1,61 @@
+"""
+LocalFileDataStrategy（~/.kintai_paccho/employee_data.json）のデータを SQLiteDataStrategy に移行する
+
+$ poetry run python -m components.strategy.migrate_sqlite [--json PATH] [--db PATH] [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+import os
+
+from components.strategy.local_file_data_strategy import LocalFileDataStrategy
+from components.strategy.sqlite_data_strategy import SQLiteDataStrategy
+
+logger = logging.getLogger()
+
+
+def migrate(json_path: str = None, db_path: str = None, dry_run: bool = False) -> dict:
+    """
+    移行を実行する
+
+    Returns:
+        dict: 移行したデータ
+    """
+    json_path = json_path or LocalFileDataStrategy.DATA_JSON
+    if not os.path.exists(json_path):
+        logger.info(f"migrate: {json_path} does not exist")
+        return {}
+
+    with open(json_path) as f:
+        data = json.load(f)
+    logger.info(f"migrate: {len(data)} users found")
+    if dry_run:
+        return data
+
+    strategy = SQLiteDataStrategy(path=db_path)
+    strategy.write(data)
+
+    migrated = strategy.read()
+    missing = [user_id for user_id, key in data.items() if migrated.get(user_id) != key]
+    if missing:
+        raise RuntimeError(f"migrate: {len(missing)} users are not migrated: {missing}")
+
+    logger.info(f"migrate: {len(data)} users migrated to {strategy.path}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="移行元のJSONファイル（未指定の場合は LocalFileDataStrategy のファイル）")
+    parser.add_argument("--db", help="移行先のSQLiteファイル（未指定の場合は SQLITE_DATA_PATH）")
+    parser.add_argument("--dry-run", action="store_true", help="書き込みをせずに移行対象の件数だけ表示する")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    migrate(json_path=args.json, db_path=args.db, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import socket
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+from components.strategy.data_strategy import CacheDataStrategy, DataStrategy
+
+
+class RedisError(Exception):
+    pass
+
+
+def _encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+def _read_reply(f):
+    line = f.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by Redis")
+    kind, value = line[:1], line[1:-2]
+    if kind == b"+":
+        return value.decode("utf-8")
+    if kind == b"-":
+        raise RedisError(value.decode("utf-8"))
+    if kind == b":":
+        return int(value)
+    if kind == b"$":
+        length = int(value)
+        if length < 0:
+            return None
+        data = f.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by Redis")
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        length = int(value)
+        return None if length < 0 else [_read_reply(f) for _ in range(length)]
+    raise RedisError(f"Unknown reply: {line!r}")
+
+
+class RedisClient:
+    """
+    Redis プロトコル（RESP）で GET・SET などのコマンドを送る最小限のクライアント
+
+    スレッドごとに1本のコネクションを張って使い回す。エラーになったコネクションは閉じて、次のコマンドで張り直す。
+    Redis が落ちている間にコマンドのたびに接続を待たないように、接続できなかった場合は retry_interval 秒間は接続せずにエラーにする
+
+    Args:
+        url: redis://[:password@]host[:port][/db]
+    """
+
+    def __init__(self, url: str, timeout: float, retry_interval: float = 0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        # time.monotonic() がこの時刻になるまでは接続しない
+        self._unavailable_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        if time.monotonic() < self._unavailable_until:
+            raise ConnectionError("Redis is unavailable")
+
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            self._mark_unavailable()
+            raise
+        conn = (sock, sock.makefile("rb"))
+        try:
+            if self.password:
+                self._execute(conn, [("AUTH", self.password)])
+            if self.db:
+                self._execute(conn, [("SELECT", self.db)])
+        except BaseException:
+            # パスワードや DB の番号が間違っている場合など、認証していないコネクションを使い回さないように閉じる
+            self._mark_unavailable()
+            self._close(conn)
+            raise
+        self._local.conn = conn
+        return conn
+
+    def _mark_unavailable(self):
+        self._unavailable_until = time.monotonic() + self.retry_interval
+
+    @staticmethod
+    def _execute(conn, commands: list) -> list:
+        sock, f = conn
+        # 複数のコマンドはまとめて送ってから応答を読む（パイプライン）
+        sock.sendall(b"".join(_encode_command(*command) for command in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(_read_reply(f))
+            except RedisError as e:
+                replies.append(None)
+                error = error or e
+        if error is not None:
+            raise error
+        return replies
+
+    def pipeline(self, commands: list) -> list:
+        conn = self._connection()
+        try:
+            return self._execute(conn, commands)
+        except OSError:
+            # タイムアウトなど、応答しない Redis にもコマンドのたびに待たないようにする
+            self._mark_unavailable()
+            self.close()
+            raise
+        except ValueError:
+            self.close()
+            raise
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        sock, f = conn
+        f.close()
+        sock.close()
+
+
+class RedisCacheDataStrategy(CacheDataStrategy):
+    """
+    Redis（Redis プロトコルのサーバー）に保持する、プロセス間で共有するキャッシュの層
+
+    Redis に接続できない場合はキャッシュがないものとして backend を読み書きするので、Redis が落ちても打刻は止まらない
+    """
+
+    URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    KEY_PREFIX = os.environ.get("REDIS_CACHE_KEY_PREFIX", "kintai-paccho:employee:")
+    TTL = int(os.environ.get("REDIS_CACHE_TTL", "3600"))
+    SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "0.5"))
+    RETRY_INTERVAL = float(os.environ.get("REDIS_RETRY_INTERVAL", "10"))
+
+    def __init__(self, backend: DataStrategy, client: RedisClient = None):
+        super().__init__(backend)
+        self.client = client or RedisClient(self.URL, timeout=self.SOCKET_TIMEOUT, retry_interval=self.RETRY_INTERVAL)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get_cached(self, user_id):
+        try:
+            key = self.client.execute("GET", self.KEY_PREFIX + user_id)
+        except (OSError, ValueError, RedisError):
+            self._count("_errors")
+            return None
+        self._count("_hits" if key is not None else "_misses")
+        return key
+
+    def _set_cached(self, data: dict):
+        if not data:
+            return
+        commands = [("SET", self.KEY_PREFIX + user_id, key, "EX", self.TTL) for user_id, key in data.items()]
+        try:
+            self.client.pipeline(commands)
+        except (OSError, ValueError, RedisError):
+            self._count("_errors")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "errors": self._errors}
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+from components.strategy.data_strategy import DataStrategy
+
+_UPSERT_SQL = (
+    "INSERT INTO employees (user_id, employee_key, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET employee_key = excluded.employee_key, updated_at = excluded.updated_at"
+)
+_initialized_paths = set()
+_initialize_lock = threading.Lock()
+
+
+class SQLiteDataStrategy(DataStrategy):
+    """
+    Slack のユーザーID → KOT の EmployeeKey のマッピングを SQLite に1ユーザー1行で保存する
+
+    LocalFileDataStrategy と違い、登録・参照は1行ずつ（ユーザーIDの主キーで）行うので、全件の読み書きが発生しない。
+    WAL モードで開くので、同じファイルを複数のプロセスから読み書きしても、書き込み中に読み込みが待たされない
+    """
+
+    SUPPORTS_POINT_LOOKUP = True
+    DB_PATH = os.path.expanduser(
+        os.environ.get("SQLITE_DATA_PATH", os.path.join(os.environ["HOME"], ".kintai_paccho", "employee_data.db"))
+    )
+
+    def __init__(self, path: str = None):
+        self.path = path or self.DB_PATH
+        self._initialize()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _initialize(self):
+        # 移行スクリプトなどで同じファイルのインスタンスを複数作ることがあるので、テーブルの作成はファイルごとに1回だけ行う
+        with _initialize_lock:
+            if self.path in _initialized_paths:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS employees (
+                        user_id TEXT PRIMARY KEY,
+                        employee_key TEXT NOT NULL,
+                        updated_at TEXT NOT NULL
+                    ) WITHOUT ROWID
+                    """
+                )
+            _initialized_paths.add(self.path)
+
+    def get(self, user_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT employee_key FROM employees WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, user_id, key):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_UPSERT_SQL, (user_id, key, datetime.now().isoformat()))
+
+    def read(self) -> dict:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT user_id, employee_key FROM employees").fetchall())
+
+    def write(self, data):
+        """data に含まれるユーザーを全て保存する（data に含まれないユーザーは削除しない）"""
+        updated_at = datetime.now().isoformat()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(_UPSERT_SQL, [(user_id, key, updated_at) for user_id, key in data.items()])
@@ -1,14 +1,27 @@
 import datetime
 import json
+import os
 from enum import IntEnum
 
+import requests
+
+from .coalescer import Coalescer
+from .employee_directory import EmployeeDirectory
+from .instrumentation import timed_usecase
 from .repo import Employee
-from .requester import KOTRequester
+from .requester import KOTException, KOTRequester
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+# 同時に打刻した人の勤怠エラーチェックなどで、同じ GET が同時に発生した場合は1回のリクエストにまとめる
+_single_flight = SingleFlight()
+# async_usecase で使う asyncio 版。件数をまとめて返せるようにここに置く
+_async_single_flight = AsyncSingleFlight()
 
 
+@timed_usecase("register_user")
 def register_user(user, kot_user_code) -> dict:
-    requester = KOTRequester()
-    resp_dict = requester.get("/employees/{}".format(kot_user_code))
+    # 保持している従業員一覧にいない場合だけ KOT から取得する
+    resp_dict = get_employee_directory().get_by_code(kot_user_code)
     employee_key = resp_dict["key"]
     Employee.create(user, employee_key)
     return {"last_name": resp_dict["lastName"], "first_name": resp_dict["firstName"]}
@@ -21,71 +34,200 @@ class RecordType(IntEnum):
     END_BREAK = 4
 
 
-def record_time(record_type: RecordType, employee_key):
+@timed_usecase("record_time")
+def record_time(record_type: RecordType, employee_key, recorded_at: datetime.datetime = None):
+    """
+    打刻する
+
+    Args:
+        recorded_at: 打刻時刻。指定しない場合は現在時刻
+    """
+    recorded_at = recorded_at or datetime.datetime.now()
+    timerecord = {
+        "time": recorded_at.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+        "date": _get_working_date(recorded_at),
+        "code": record_type.value,
+    }
+
+    coalescer = get_timerecord_coalescer()
+    if coalescer is not None:
+        # 打刻時刻は呼び出された時点のものを使い、他の人の打刻とまとめて登録する
+        coalescer.submit({"employeeKey": employee_key, **timerecord}).result()
+        return
+
     requester = KOTRequester()
-    payload = json.dumps(
-        {
-            "time": datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S+09:00"),
-            "date": _get_working_date(),
-            "code": record_type.value,
-        }
-    )
+    payload = json.dumps(timerecord)
     requester.post("/daily-workings/timerecord/{}".format(employee_key), payload)
 
 
-def get_daily_timacard_data(from_date, to_date):
+@timed_usecase("record_times")
+def record_times(timerecords: list) -> list:
+    """
+    複数人の打刻をまとめて登録する
+
+    Args:
+        timerecords: [{"employeeKey": "...", "time": "...", "date": "...", "code": 1}]
+
+    Returns:
+        timerecords と同じ順番の登録結果のリスト。登録に失敗した打刻は KOTException になる
+        （1件ずつ登録し直した場合は requests.RequestException のこともある）
+    """
+    requester = KOTRequester()
+    try:
+        resp_json = requester.post("/daily-workings/timerecord", json.dumps(timerecords))
+    except (KOTException, requests.HTTPError) as e:
+        if not _is_invalid_timerecord_error(e):
+            raise
+        # 1件でも不正な打刻があるとまとめて失敗するので、どの打刻が失敗したのかわかるように1件ずつ登録し直す
+        return [_record_time_individually(requester, timerecord) for timerecord in timerecords]
+
+    results = []
+    for timerecord_result in resp_json:
+        if "errors" in timerecord_result:
+            results.append(KOTException(timerecord_result["errors"][0]["message"]))
+        else:
+            results.append(timerecord_result)
+    return results
+
+
+# 打刻の内容が不正で KOT が登録しなかったことを表すステータスコード。再送しても結果は変わらない
+_INVALID_TIMERECORD_STATUSES = (400, 422)
+
+
+def _is_invalid_timerecord_error(e: Exception) -> bool:
+    """KOT が打刻の内容を不正として拒否した例外か"""
+    if isinstance(e, KOTException):
+        return True
+    return (
+        isinstance(e, requests.HTTPError)
+        and e.response is not None
+        and e.response.status_code in _INVALID_TIMERECORD_STATUSES
+    )
+
+
+def _record_time_individually(requester: KOTRequester, timerecord: dict):
+    payload = {key: value for key, value in timerecord.items() if key != "employeeKey"}
+    try:
+        return requester.post("/daily-workings/timerecord/{}".format(timerecord["employeeKey"]), json.dumps(payload))
+    except (KOTException, requests.RequestException) as e:
+        # 他の人の打刻は続けて登録し、失敗はその打刻の結果として返す
+        return e
+
+
+# 朝の出勤ラッシュ時に KOT API へのリクエスト数を減らすため、設定されている場合は打刻をまとめて登録する
+_TIMERECORD_COALESCE_WINDOW_MS = int(os.environ.get("KOT_TIMERECORD_COALESCE_WINDOW_MS", "0"))
+_timerecord_coalescer = (
+    Coalescer(
+        window=_TIMERECORD_COALESCE_WINDOW_MS / 1000,
+        max_batch_size=int(os.environ.get("KOT_TIMERECORD_BATCH_SIZE", "100")),
+        submit_batch=record_times,
+        name="timerecord-coalescer",
+    )
+    if _TIMERECORD_COALESCE_WINDOW_MS > 0
+    else None
+)
+
+
+def get_timerecord_coalescer():
+    return _timerecord_coalescer
+
+
+@timed_usecase("get_daily_timacard_data")
+def get_daily_timacard_data(from_date, to_date, compact=None):
     """
     日別勤怠データを取得する
 
     Args:
         from_date: 取得開始日付（YYYY-MM-DD形式）
         to_date: 取得終了日付（YYYY-MM-DD形式）
+        compact: 指定した場合は、受信した1日分のデータごとに compact で変換して返す
 
     Returns:
-        辞書型の日別勤怠データ
+        辞書型の日別勤怠データ（compact を指定した場合は compact の戻り値）のリスト
     """
     requester = KOTRequester()
     uri = f"/daily-workings?&start={from_date}&end={to_date}&additionalFields=currentDateEmployee"
 
-    return requester.get(uri)
+    return _single_flight.do((uri, compact), lambda: _get_stream_list(requester, uri, compact))
 
 
-def get_daily_schedule_data(from_date, to_date):
+@timed_usecase("get_daily_schedule_data")
+def get_daily_schedule_data(from_date, to_date, compact=None):
     """
     日別スケジュールデータを取得する
 
     Args:
         from_date: 取得開始日付（YYYY-MM-DD形式）
         to_date: 取得終了日付（YYYY-MM-DD形式）
+        compact: 指定した場合は、受信した1日分のデータごとに compact で変換して返す
 
     Returns:
-        辞書型の日別スケジュールデータ
+        辞書型の日別スケジュールデータ（compact を指定した場合は compact の戻り値）のリスト
     """
     requester = KOTRequester()
     uri = f"/daily-schedules?&start={from_date}&end={to_date}&additionalFields=currentDateEmployee"
 
-    return requester.get(uri)
+    return _single_flight.do((uri, compact), lambda: _get_stream_list(requester, uri, compact))
 
 
+def _get_stream_list(requester: KOTRequester, uri: str, compact=None) -> list:
+    """
+    期間が長いとレスポンスが大きくなるので、レスポンス全体を読み込まずに1日分ずつデコードする
+
+    compact を指定した場合はデコードした1日分ずつ変換し、期間全体のレスポンスの dict を保持しない
+    """
+    if compact is None:
+        return list(requester.get_stream(uri))
+    return [compact(daily_data) for daily_data in requester.get_stream(uri)]
+
+
+@timed_usecase("get_active_employees")
 def get_active_employees() -> list:
     """
     従業員データを取得する
 
+    従業員一覧はメモリに保持しておき、EMPLOYEE_DIRECTORY_REFRESH_INTERVAL 秒経ったら取得し直す
+
     Returns:
         従業員データのリスト
     """
+    return get_employee_directory().active_employees()
+
+
+def _fetch_employees() -> list:
     requester = KOTRequester()
     uri = f"/employees"
 
-    return requester.get(uri)
+    return _single_flight.do(uri, lambda: requester.get(uri))
+
+
+def _fetch_employee(kot_user_code) -> dict:
+    return KOTRequester().get("/employees/{}".format(kot_user_code))
+
+
+_employee_directory = EmployeeDirectory(
+    fetch_all=_fetch_employees,
+    fetch_one=_fetch_employee,
+    refresh_interval=float(os.environ.get("EMPLOYEE_DIRECTORY_REFRESH_INTERVAL", "3600")),
+)
+
+
+def get_employee_directory() -> EmployeeDirectory:
+    return _employee_directory
+
+
+def get_single_flight_stats() -> dict:
+    """同時に発生した同じ GET をまとめた件数などを返す（asyncio 版の件数も含む）"""
+    sync_stats, async_stats = _single_flight.stats(), _async_single_flight.stats()
+    return {name: sync_stats[name] + async_stats[name] for name in sync_stats}
 
 
-def _get_working_date():
+def _get_working_date(now: datetime.datetime = None):
     """
     return today formatting '%Y-%m-%d'.
     before 5:00 AM, return yesterday.
     """
-    today = datetime.datetime.now()
+    today = now or datetime.datetime.now()
     if today.hour < 5:
         return (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
     return today.strftime("%Y-%m-%d")
@@ -0,0 +1,35 @@
+from components import async_usecase
+from components.requester import KOTException
+from components.strategy.data_strategy import ConcurrentUpdateError
+from components.typing import SlackRequest
+from handler.jp.helper import (
+    CONCURRENT_UPDATE_MESSAGE,
+    KOT_API_RESTRICTED_TIME_MESSAGE,
+    async_response,
+    is_kot_api_available,
+    response_kot_error,
+)
+
+
+async def register_employee_code(say, request: SlackRequest):
+    """configuration.register_employee_code の asyncio 版"""
+    if not is_kot_api_available():
+        await say(KOT_API_RESTRICTED_TIME_MESSAGE.format(operation="勤怠登録"))
+        return
+
+    if not request.text:
+        await say("従業員コードが読み取れなかったよ")
+        await say('"/employee-code 1234" のように入力するぱっちょ！')
+        return
+
+    try:
+        kot_username = await async_usecase.register_user(request.user_id, request.text)
+        await say(
+            "{last_name} {first_name}さんの設定が完了したぱっちょ！".format(
+                last_name=kot_username["last_name"], first_name=kot_username["first_name"]
+            )
+        )
+    except KOTException as e:
+        await async_response(say, response_kot_error, e)
+    except ConcurrentUpdateError:
+        await say(CONCURRENT_UPDATE_MESSAGE)
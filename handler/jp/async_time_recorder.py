@@ -0,0 +1,64 @@
+import asyncio
+
+from components import async_usecase
+from components.deferred import get_async_deferred_runner
+from components.instrumentation import timed_punch
+from components.repo import Employee
+from components.requester import KOTException
+from components.typing import SlackRequest
+from components.usecase import RecordType
+
+from .async_timecard_check import check_timecard_errors_for_user
+from .helper import (
+    async_response,
+    async_response_in_thread,
+    is_kot_api_available,
+    response_configuration_help,
+    response_general_error,
+    response_kot_error,
+)
+from .time_recorder import queue_punch
+
+# time_recorder の asyncio 版
+
+
+@timed_punch(RecordType.CLOCK_IN)
+async def record_clock_in(say, request: SlackRequest):
+    await _record(say, request, RecordType.CLOCK_IN, ":den_paccho1: < おはー　だこくしたよ〜", check_errors=True)
+
+
+@timed_punch(RecordType.CLOCK_OUT)
+async def record_clock_out(say, request: SlackRequest):
+    await _record(say, request, RecordType.CLOCK_OUT, ":gas_paccho_1: < おつー　打刻したよー", check_errors=True)
+
+
+@timed_punch(RecordType.START_BREAK)
+async def record_start_break(say, request: SlackRequest):
+    await _record(say, request, RecordType.START_BREAK, ":gas_paccho_1: < はーい　ゆっくり休んでねー")
+
+
+@timed_punch(RecordType.END_BREAK)
+async def record_end_break(say, request: SlackRequest):
+    await _record(say, request, RecordType.END_BREAK, ":den_paccho1: < おっけー　がんばっていこ〜")
+
+
+async def _record(say, request: SlackRequest, record_type: RecordType, message: str, check_errors: bool = False):
+    employee_key = await asyncio.to_thread(Employee.get_key, request.user_id)
+    if not employee_key:
+        return await async_response(say, response_configuration_help)
+
+    if not is_kot_api_available():
+        # キューへの保存は SQLite に書き込むのでスレッドで実行する
+        return await async_response_in_thread(say, queue_punch, request, record_type, employee_key)
+
+    try:
+        await async_usecase.record_time(record_type, employee_key)
+        await say(message)
+
+        if check_errors:
+            # 勤怠エラーチェックがある場合は通知（打刻の応答を待たせないようにバックグラウンドで実行する）
+            get_async_deferred_runner().submit(check_timecard_errors_for_user, request.user_id, say)
+    except KOTException as e:
+        await async_response(say, response_kot_error, e)
+    except Exception as e:
+        await async_response(say, response_general_error, e)
@@ -0,0 +1,115 @@
+import asyncio
+
+from components import async_usecase
+from components.chunked_fetcher import get_chunked_fetcher
+from components.records import compact_daily_schedules, compact_daily_workings
+from components.repo import Employee
+from components.requester import KOTException
+from components.typing import SlackRequest
+
+from .helper import (
+    KOT_API_RESTRICTED_TIME_MESSAGE,
+    async_response,
+    is_kot_api_available,
+    response_general_error,
+    response_kot_error,
+)
+from .timecard_check import (
+    _build_announcement_message,
+    _build_timecard_errors,
+    _build_user_error_message,
+    _daily_schedules_store,
+    _daily_workings_store,
+    _error_map_cache,
+    _get_date_range_for_error_check,
+    _merge_daily_record_stores,
+    _prune_daily_record_stores,
+)
+
+# timecard_check の asyncio 版。エラーの計算やメッセージの構築、キャッシュ、日別データのストアは同期版と共有する
+
+
+async def _fetch_daily_workings(from_date: str, to_date: str):
+    return await async_usecase.get_daily_timacard_data(
+        from_date=from_date, to_date=to_date, compact=compact_daily_workings
+    )
+
+
+async def _fetch_daily_schedules(from_date: str, to_date: str):
+    return await async_usecase.get_daily_schedule_data(
+        from_date=from_date, to_date=to_date, compact=compact_daily_schedules
+    )
+
+
+async def _get_error_data_for_date_range(from_date: str, to_date: str, use_cache: bool = True):
+    cache_key = (from_date, to_date)
+    if use_cache:
+        timecard_errors = _error_map_cache.get(cache_key)
+        if timecard_errors is not None:
+            return timecard_errors
+
+    # 勤怠データとスケジュールデータは範囲を分割して並行して取得する
+    _prune_daily_record_stores(from_date)
+    workings_runs = _daily_workings_store.plan(from_date, to_date)
+    schedules_runs = _daily_schedules_store.plan(from_date, to_date)
+
+    jobs = [(_fetch_daily_workings, run_from, run_to) for run_from, run_to in workings_runs]
+    jobs += [(_fetch_daily_schedules, run_from, run_to) for run_from, run_to in schedules_runs]
+    results = await get_chunked_fetcher().fetch_async(jobs)
+
+    _merge_daily_record_stores(workings_runs, schedules_runs, results)
+    timecard_data = _daily_workings_store.select(from_date, to_date)
+    schedule_data = _daily_schedules_store.select(from_date, to_date)
+
+    if len(timecard_data) == 0 or len(schedule_data) == 0:
+        return None
+
+    active_employees = await async_usecase.get_active_employees()
+    # 1か月分 × 全従業員の勤怠エラーの計算は CPU を使うので、他の Slack のイベントを止めないようにスレッドで実行する
+    return await asyncio.to_thread(_build_timecard_errors, cache_key, timecard_data, schedule_data, active_employees)
+
+
+async def check_timecard_errors_for_user(user_id: str, say=None):
+    """timecard_check.check_timecard_errors_for_user の asyncio 版"""
+    if not is_kot_api_available():
+        return
+
+    employee_key = await asyncio.to_thread(Employee.get_key, user_id)
+    if not employee_key:
+        return
+
+    from_date, to_date = _get_date_range_for_error_check()
+    timecard_errors = await _get_error_data_for_date_range(from_date, to_date)
+
+    if timecard_errors is None:
+        return
+
+    user_error_dates = timecard_errors.dates_for(employee_key)
+    if user_error_dates and say:
+        await say(_build_user_error_message(user_error_dates))
+
+
+async def announce_timecard_errors(say, request: SlackRequest):
+    """timecard_check.announce_timecard_errors の asyncio 版"""
+    try:
+        if not is_kot_api_available():
+            await say(KOT_API_RESTRICTED_TIME_MESSAGE.format(operation="勤怠関連の操作"))
+            return
+
+        from_date, to_date = _get_date_range_for_error_check()
+        timecard_errors = await _get_error_data_for_date_range(from_date, to_date, use_cache=False)
+
+        if timecard_errors is None:
+            await say(":den_paccho1: < 勤怠データまたはスケジュールデータが見つからなかったよ！")
+            return
+
+        if not timecard_errors.by_date:
+            await say(":den_paccho1: < 勤怠エラーの人はいないよ！やったね！")
+            return
+
+        await say(_build_announcement_message(timecard_errors.by_date))
+
+    except KOTException as e:
+        await async_response(say, response_kot_error, e)
+    except Exception as e:
+        await async_response(say, response_general_error, e)
@@ -1,9 +1,15 @@
 import datetime
 
 from components.requester import KOTException
+from components.strategy.data_strategy import ConcurrentUpdateError
 from components.typing import SlackRequest
 from components.usecase import register_user
-from handler.jp.helper import KOT_API_RESTRICTED_TIME_MESSAGE, is_kot_api_available, response_kot_error
+from handler.jp.helper import (
+    CONCURRENT_UPDATE_MESSAGE,
+    KOT_API_RESTRICTED_TIME_MESSAGE,
+    is_kot_api_available,
+    response_kot_error,
+)
 
 
 def register_employee_code(say, request: SlackRequest):
@@ -25,3 +31,5 @@ def register_employee_code(say, request: SlackRequest):
         )
     except KOTException as e:
         response_kot_error(say, e)
+    except ConcurrentUpdateError:
+        say(CONCURRENT_UPDATE_MESSAGE)
@@ -1,7 +1,10 @@
+import asyncio
 import logging
 from datetime import datetime
 from traceback import TracebackException
 
+from components.usecase import RecordType
+
 logger = logging.getLogger()
 
 # KingOfTime APIの制限時間帯の定数
@@ -10,8 +13,16 @@ KOT_API_RESTRICTED_TIME_RANGES = [
     ("1730", "1830"),  # 夕方の制限時間帯
 ]
 
+RECORD_TYPE_NAMES = {
+    RecordType.CLOCK_IN: "出勤",
+    RecordType.CLOCK_OUT: "退勤",
+    RecordType.START_BREAK: "休憩開始",
+    RecordType.END_BREAK: "休憩終了",
+}
+
 # 共通メッセージ定数
 KOT_API_RESTRICTED_TIME_MESSAGE = "[08:30 ～ 10:00, 17:30 ～ 18:30] の時間帯はAPIの都合で{operation}できないんだ。ごめん:paccho:"
+CONCURRENT_UPDATE_MESSAGE = "同時に設定が変更されたので登録しなかったぱっちょ！もう一度入力してね"
 
 
 def response_configuration_help(say):
@@ -36,6 +47,22 @@ def response_general_error(say, e: Exception):
     say(f"エラーが発生したぱっちょ！しばらく待ってからもう一度試してみてね！ ```{msg}```")
 
 
+async def async_response(say, response_fn, *args):
+    """response_configuration_help などの同期の say を呼ぶ関数を、async の say で使う"""
+    messages = []
+    response_fn(messages.append, *args)
+    for message in messages:
+        await say(message)
+
+
+async def async_response_in_thread(say, response_fn, *args):
+    """async_response と同じ。ファイルや DB に書き込むなどブロッキングする response_fn をスレッドで実行する"""
+    messages = []
+    await asyncio.to_thread(response_fn, messages.append, *args)
+    for message in messages:
+        await say(message)
+
+
 def is_kot_api_available():
     """
     KingOfTime APIが現在利用可能かどうかをチェックする
@@ -0,0 +1,119 @@
+from components.deferred import get_deferred_executor
+from components.metrics import MetricsRegistry, get_metrics_registry
+from components.punch_queue import get_punch_queue
+from components.repo import Employee
+from components.requester import get_rate_limiter, get_retry_budget
+from components.strategy.data_strategy import CacheDataStrategy, create_data_strategy
+from components.usecase import get_employee_directory, get_single_flight_stats
+
+from .timecard_check import get_daily_record_store_stats, get_error_map_cache_stats
+
+
+def _cache_stats() -> dict:
+    """キャッシュの名前 → {"hits": ヒット数, "misses": ミス数}"""
+    directory_stats = get_employee_directory().stats()
+    stats = {
+        "employee": Employee.cache_stats(),
+        "employee_directory": {"hits": directory_stats["hits"], "misses": directory_stats["misses"]},
+        "timecard_errors": get_error_map_cache_stats(),
+    }
+    # 保持している日のデータを使い回せた日数をヒット、KOT から取得し直した日数をミスとして数える
+    for name, store_stats in get_daily_record_store_stats().items():
+        stats[name] = {"hits": store_stats["reused_dates"], "misses": store_stats["fetched_dates"]}
+
+    # DATA_STRATEGY_CACHES で重ねたキャッシュの層
+    strategy = create_data_strategy()
+    while isinstance(strategy, CacheDataStrategy):
+        if hasattr(strategy, "stats"):
+            stats[f"data_strategy:{type(strategy).__name__}"] = strategy.stats()
+        strategy = strategy.backend
+    return stats
+
+
+def _socket_mode_queue_depth(socket_mode_handler) -> list:
+    client = socket_mode_handler.client
+    samples = [({"queue": "received"}, client.message_queue.qsize())]
+    # listener を実行するスレッドプールの空きを待っているメッセージ（asyncio 版にはスレッドプールはない）
+    work_queue = getattr(getattr(client, "message_workers", None), "_work_queue", None)
+    if work_queue is not None:
+        samples.append(({"queue": "workers"}, work_queue.qsize()))
+    return samples
+
+
+def register_process_metrics(registry: MetricsRegistry = None, socket_mode_handler=None):
+    """
+    各コンポーネントが stats() で持っている値を、メトリクスとして読み込めるように registry に登録する
+
+    KOT API の呼び出し・usecase・listener・打刻の所要時間は、それぞれの処理で registry に記録している
+
+    Args:
+        socket_mode_handler: 指定した場合は Slack から受け取ったメッセージのキューの長さも登録する
+    """
+    registry = registry or get_metrics_registry()
+
+    registry.callback(
+        "cache_hits_total",
+        "キャッシュのヒット数",
+        lambda: [({"cache": name}, stats["hits"]) for name, stats in _cache_stats().items()],
+        labelnames=("cache",),
+        type="counter",
+    )
+    registry.callback(
+        "cache_misses_total",
+        "キャッシュのミス数",
+        lambda: [({"cache": name}, stats["misses"]) for name, stats in _cache_stats().items()],
+        labelnames=("cache",),
+        type="counter",
+    )
+    registry.callback(
+        "kot_single_flight_deduplicated_total",
+        "同時に発生した同じ GET を1回のリクエストにまとめた件数",
+        lambda: [({}, get_single_flight_stats()["deduplicated"])],
+        type="counter",
+    )
+    registry.callback(
+        "kot_rate_limit_throttled_total",
+        "レート制限で送信を待たされた KOT API のリクエスト数",
+        lambda: [({}, get_rate_limiter().stats()["throttled"])],
+        type="counter",
+    )
+    registry.callback(
+        "kot_rate_limit_timeouts_total",
+        "レート制限で送信を待ちきれなかった KOT API のリクエスト数",
+        lambda: [({}, get_rate_limiter().stats()["timeouts"])],
+        type="counter",
+    )
+    registry.callback(
+        "kot_retry_budget_exhausted_total",
+        "再送の回数の上限に達して再送しなかった KOT API のリクエスト数",
+        lambda: [({}, get_retry_budget().stats()["exhausted"])],
+        type="counter",
+    )
+    registry.callback(
+        "deferred_jobs_pending",
+        "実行を待っている、または実行中のバックグラウンドジョブの数",
+        lambda: [({}, get_deferred_executor().stats()["pending"])],
+    )
+    registry.callback(
+        "deferred_jobs_total",
+        "バックグラウンドジョブの数",
+        lambda: [
+            ({"result": result}, count)
+            for result, count in get_deferred_executor().stats().items()
+            if result in ("submitted", "rejected", "failed")
+        ],
+        labelnames=("result",),
+        type="counter",
+    )
+    registry.callback(
+        "punch_queue_pending",
+        "KOT API の制限時間帯に受け付けて、まだ登録していない打刻の数",
+        lambda: [({}, get_punch_queue().count_pending())],
+    )
+    if socket_mode_handler is not None:
+        registry.callback(
+            "slack_socket_mode_queue_depth",
+            "Slack から受け取って、listener の実行を待っているメッセージの数",
+            lambda: _socket_mode_queue_depth(socket_mode_handler),
+            labelnames=("queue",),
+        )
@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+from components.punch_queue import PunchQueue, QueuedPunch
+from components.requester import KOTException, is_request_rejected
+from components.usecase import record_time
+
+from .helper import RECORD_TYPE_NAMES, is_kot_api_available
+
+logger = logging.getLogger()
+
+
+def _is_rejected_by_kot(e: Exception) -> bool:
+    """KOT がエラーを返して、打刻を登録しなかったことがわかる例外か"""
+    if isinstance(e, KOTException):
+        return True
+    response = getattr(e, "response", None) if isinstance(e, requests.HTTPError) else None
+    return response is not None and 400 <= response.status_code < 500
+
+
+class PunchQueueDrainer:
+    """
+    KOT API を利用できない時間帯に受け付けた打刻を、利用できるようになってから登録する
+
+    打刻が集中しないように rate_per_second 件/秒 のペースで登録し、KOT が処理していないことが確実な失敗
+    （429・503・接続できなかった）の場合だけ retry_interval 秒後に max_attempts 回まで再試行する。
+    タイムアウトや 500 などは KOT 側で打刻が登録されている可能性があり、再試行すると二重に打刻されてしまうので再試行しない。
+    登録できたら（諦めたら）Slack で本人に通知する。
+
+    複数のプロセスが同じキューから登録しても二重に打刻しないように、打刻はキューで確保してから登録する。
+    確保してから claim_timeout 秒経っても登録が終わっていない打刻は、登録している途中でプロセスが止まったとみなし、
+    登録し直さずに本人に確認してもらう
+    """
+
+    def __init__(
+        self,
+        queue: PunchQueue,
+        notify,
+        rate_per_second: float = 2.0,
+        max_attempts: int = 5,
+        retry_interval: float = 60,
+        poll_interval: float = 30,
+        claim_timeout: float = 600,
+    ):
+        self.queue = queue
+        self.notify = notify  # notify(channel_id, text)
+        self.rate_per_second = rate_per_second
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def drain_once(self) -> int:
+        """
+        登録できる打刻を全て登録する
+
+        Returns:
+            int: 登録を試した打刻の件数
+        """
+        if not is_kot_api_available():
+            return 0
+
+        for punch in self.queue.release_stale_claims(
+            claimed_before=datetime.now() - timedelta(seconds=self.claim_timeout), error="interrupted while submitting"
+        ):
+            self._notify(punch, self._unknown_message(punch))
+
+        processed = 0
+        while not self._stop_event.is_set():
+            punches = self.queue.get_ready(now=datetime.now())
+            if not punches:
+                break
+
+            for punch in punches:
+                if self._stop_event.is_set() or not is_kot_api_available():
+                    return processed
+                if not self.queue.claim(punch.id, now=datetime.now()):
+                    # 他のプロセスが先に確保した
+                    continue
+                self._submit(punch)
+                processed += 1
+                self._stop_event.wait(1 / self.rate_per_second)
+
+        return processed
+
+    def _submit(self, punch: QueuedPunch):
+        record_type_name = RECORD_TYPE_NAMES[punch.record_type]
+        recorded_at = punch.recorded_at.strftime("%H:%M")
+        try:
+            record_time(punch.record_type, punch.employee_key, recorded_at=punch.recorded_at)
+        except Exception as e:
+            logger.exception(f"failed to submit queued punch: id={punch.id}")
+            rejected = is_request_rejected(e)
+            if rejected and punch.attempts + 1 < self.max_attempts:
+                self.queue.mark_retry(punch.id, str(e), datetime.now() + timedelta(seconds=self.retry_interval))
+                return
+
+            self.queue.mark_failed(punch.id, str(e))
+            if rejected or _is_rejected_by_kot(e):
+                text = (
+                    f"<@{punch.user_id}> :gas_paccho_1: < {recorded_at} の{record_type_name}を打刻できなかったよ…"
+                    "King of Time で直接打刻してね！"
+                )
+            else:
+                text = self._unknown_message(punch)
+            self._notify(punch, text)
+            return
+
+        self.queue.mark_done(punch.id)
+        self._notify(
+            punch, f"<@{punch.user_id}> :den_paccho1: < 受け付けていた {recorded_at} の{record_type_name}を打刻したよ〜"
+        )
+
+    @staticmethod
+    def _unknown_message(punch: QueuedPunch) -> str:
+        record_type_name = RECORD_TYPE_NAMES[punch.record_type]
+        recorded_at = punch.recorded_at.strftime("%H:%M")
+        return (
+            f"<@{punch.user_id}> :gas_paccho_1: < {recorded_at} の{record_type_name}を打刻できたかわからなかったよ…"
+            "King of Time で打刻されているか確認してね！"
+        )
+
+    def _notify(self, punch: QueuedPunch, text: str):
+        try:
+            self.notify(punch.channel_id, text)
+        except Exception:
+            logger.exception(f"failed to notify queued punch result: id={punch.id}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="punch-queue-drainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.drain_once()
+            except Exception:
+                logger.exception("punch queue drainer failed")
+            self._stop_event.wait(self.poll_interval)
+
+
+def create_punch_queue_drainer(queue: PunchQueue, notify) -> PunchQueueDrainer:
+    return PunchQueueDrainer(
+        queue=queue,
+        notify=notify,
+        rate_per_second=float(os.environ.get("PUNCH_QUEUE_RATE_PER_SECOND", "2")),
+        max_attempts=int(os.environ.get("PUNCH_QUEUE_MAX_ATTEMPTS", "5")),
+        retry_interval=float(os.environ.get("PUNCH_QUEUE_RETRY_INTERVAL", "60")),
+        poll_interval=float(os.environ.get("PUNCH_QUEUE_POLL_INTERVAL", "30")),
+        claim_timeout=float(os.environ.get("PUNCH_QUEUE_CLAIM_TIMEOUT", "600")),
+    )
@@ -1,23 +1,58 @@
+from datetime import datetime
+
+from components.deferred import get_deferred_executor
+from components.instrumentation import timed_punch
+from components.punch_queue import get_punch_queue
 from components.repo import Employee
 from components.requester import KOTException
 from components.typing import SlackRequest
 from components.usecase import RecordType, record_time
 
-from .helper import response_configuration_help, response_general_error, response_kot_error
+from .helper import (
+    RECORD_TYPE_NAMES,
+    is_kot_api_available,
+    response_configuration_help,
+    response_general_error,
+    response_kot_error,
+)
 from .timecard_check import check_timecard_errors_for_user
 
 
+def queue_punch(say, request: SlackRequest, record_type: RecordType, employee_key):
+    """KOT API を利用できない時間帯の打刻を、打刻時刻とともにキューに保存して後で登録する"""
+    recorded_at = datetime.now()
+    try:
+        get_punch_queue().enqueue(
+            user_id=request.user_id,
+            channel_id=request.channel_id,
+            employee_key=employee_key,
+            record_type=record_type,
+            recorded_at=recorded_at,
+        )
+    except Exception as e:
+        return response_general_error(say, e)
+
+    say(
+        f":den_paccho1: < いまは King of Time のAPIが使えない時間帯だから、{recorded_at.strftime('%H:%M')} の"
+        f"{RECORD_TYPE_NAMES[record_type]}として受け付けたよ！使えるようになったら打刻してお知らせするね〜"
+    )
+
+
+@timed_punch(RecordType.CLOCK_IN)
 def record_clock_in(say, request: SlackRequest):
     employee_key = Employee.get_key(request.user_id)
     if not employee_key:
         return response_configuration_help(say)
 
+    if not is_kot_api_available():
+        return queue_punch(say, request, RecordType.CLOCK_IN, employee_key)
+
     try:
         record_time(RecordType.CLOCK_IN, employee_key)
         say(":den_paccho1: < おはー　だこくしたよ〜")
 
-        # 勤怠エラーチェックがある場合は通知
-        check_timecard_errors_for_user(request.user_id, say)
+        # 勤怠エラーチェックがある場合は通知（打刻の応答を待たせないようにバックグラウンドで実行する）
+        get_deferred_executor().submit(check_timecard_errors_for_user, request.user_id, say)
 
     except KOTException as e:
         response_kot_error(say, e)
@@ -25,28 +60,36 @@ def record_clock_in(say, request: SlackRequest):
         response_general_error(say, e)
 
 
+@timed_punch(RecordType.CLOCK_OUT)
 def record_clock_out(say, request: SlackRequest):
     employee_key = Employee.get_key(request.user_id)
     if not employee_key:
         return response_configuration_help(say)
 
+    if not is_kot_api_available():
+        return queue_punch(say, request, RecordType.CLOCK_OUT, employee_key)
+
     try:
         record_time(RecordType.CLOCK_OUT, employee_key)
         say(":gas_paccho_1: < おつー　打刻したよー")
 
-        # 勤怠エラーチェックがある場合は通知
-        check_timecard_errors_for_user(request.user_id, say)
+        # 勤怠エラーチェックがある場合は通知（打刻の応答を待たせないようにバックグラウンドで実行する）
+        get_deferred_executor().submit(check_timecard_errors_for_user, request.user_id, say)
     except KOTException as e:
         response_kot_error(say, e)
     except Exception as e:
         response_general_error(say, e)
 
 
+@timed_punch(RecordType.START_BREAK)
 def record_start_break(say, request: SlackRequest):
     employee_key = Employee.get_key(request.user_id)
     if not employee_key:
         return response_configuration_help(say)
 
+    if not is_kot_api_available():
+        return queue_punch(say, request, RecordType.START_BREAK, employee_key)
+
     try:
         record_time(RecordType.START_BREAK, employee_key)
         say(":gas_paccho_1: < はーい　ゆっくり休んでねー")
@@ -56,11 +99,15 @@ def record_start_break(say, request: SlackRequest):
         response_general_error(say, e)
 
 
+@timed_punch(RecordType.END_BREAK)
 def record_end_break(say, request: SlackRequest):
     employee_key = Employee.get_key(request.user_id)
     if not employee_key:
         return response_configuration_help(say)
 
+    if not is_kot_api_available():
+        return queue_punch(say, request, RecordType.END_BREAK, employee_key)
+
     try:
         record_time(RecordType.END_BREAK, employee_key)
         say(":den_paccho1: < おっけー　がんばっていこ〜")
@@ -1,10 +1,16 @@
 import json
+import logging
 import os
 import pathlib
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from dateutil.relativedelta import relativedelta
 
+from components.cache import TTLCache
+from components.chunked_fetcher import get_chunked_fetcher
+from components.daily_record_store import DailyRecordStore
+from components.records import compact_daily_schedules, compact_daily_workings
 from components.repo import Employee
 from components.requester import KOTException
 from components.typing import SlackRequest
@@ -12,6 +18,49 @@ from components.usecase import get_active_employees, get_daily_schedule_data, ge
 
 from .helper import KOT_API_RESTRICTED_TIME_MESSAGE, is_kot_api_available, response_general_error, response_kot_error
 
+logger = logging.getLogger()
+
+# 先月1日～前日までのデータは1日の中ではほとんど変わらないので、打刻ごとの勤怠エラーチェックではキャッシュを使う
+_error_map_cache = TTLCache(ttl=float(os.environ.get("TIMECARD_ERROR_CACHE_TTL", "600")))
+
+# 勤怠データ・スケジュールデータは日付ごとに保持しておき、直近の日と古くなった日だけを取得し直す
+# 保持するデータは勤怠エラーチェックで使う項目だけのレコードに変換してメモリを節約する
+_TIMECARD_STORE_RECENT_DAYS = int(os.environ.get("TIMECARD_STORE_RECENT_DAYS", "7"))
+_TIMECARD_STORE_REVALIDATE_SECONDS = float(os.environ.get("TIMECARD_STORE_REVALIDATE_SECONDS", "3600"))
+_daily_workings_store = DailyRecordStore(
+    recent_days=_TIMECARD_STORE_RECENT_DAYS,
+    revalidate_after=_TIMECARD_STORE_REVALIDATE_SECONDS,
+    name="daily-workings",
+    compact=compact_daily_workings,
+)
+_daily_schedules_store = DailyRecordStore(
+    recent_days=_TIMECARD_STORE_RECENT_DAYS,
+    revalidate_after=_TIMECARD_STORE_REVALIDATE_SECONDS,
+    name="daily-schedules",
+    compact=compact_daily_schedules,
+)
+
+
+@dataclass(frozen=True)
+class TimecardErrors:
+    by_date: dict  # _compute_error_map の結果
+    dates_by_employee: dict  # { "employeeKey": ["2025-02-01", "2025-02-03"] } 日付は昇順
+
+    @classmethod
+    def build(cls, error_data: dict) -> "TimecardErrors":
+        """エラーデータから従業員ごとのエラー日付の索引を作る"""
+        dates_by_employee = {}
+        for date_str in sorted(error_data.keys()):
+            for entry in error_data[date_str]:
+                dates = dates_by_employee.setdefault(entry.get("employeeKey"), [])
+                # 同じ日に同じ人のエラーが複数あっても日付は1つだけにする
+                if not dates or dates[-1] != date_str:
+                    dates.append(date_str)
+        return cls(by_date=error_data, dates_by_employee=dates_by_employee)
+
+    def dates_for(self, employee_key) -> list:
+        return self.dates_by_employee.get(employee_key, [])
+
 
 def _get_date_range_for_error_check():
     """先月1日～前日までの日付範囲を取得する"""
@@ -26,122 +75,179 @@ def _get_date_range_for_error_check():
 
 
 def _fetch_timecard_and_schedule(from_date: str, to_date: str):
-    """勤怠データとスケジュールデータを取得する"""
-    timecard_data = get_daily_timacard_data(from_date=from_date, to_date=to_date)
-    schedule_data = get_daily_schedule_data(from_date=from_date, to_date=to_date)
-    return timecard_data, schedule_data
+    """
+    勤怠データとスケジュールデータを取得する。保持しているデータで足りない日だけをKOTから取得する
+
+    取得する範囲は KOT_FETCH_CHUNK_DAYS 日ごとに分割し、勤怠データとスケジュールデータをまとめて並行に取得する
+    """
+    _prune_daily_record_stores(from_date)
+    workings_runs = _daily_workings_store.plan(from_date, to_date)
+    schedules_runs = _daily_schedules_store.plan(from_date, to_date)
+
+    jobs = [(_fetch_daily_workings, run_from, run_to) for run_from, run_to in workings_runs]
+    jobs += [(_fetch_daily_schedules, run_from, run_to) for run_from, run_to in schedules_runs]
+    results = get_chunked_fetcher().fetch(jobs)
+
+    _merge_daily_record_stores(workings_runs, schedules_runs, results)
+    return _daily_workings_store.select(from_date, to_date), _daily_schedules_store.select(from_date, to_date)
+
+
+def _fetch_daily_workings(from_date: str, to_date: str):
+    # 受信した1日分ずつ保持する形式に変換して、期間全体のレスポンスの dict を保持しないようにする
+    return get_daily_timacard_data(from_date=from_date, to_date=to_date, compact=compact_daily_workings)
+
+
+def _fetch_daily_schedules(from_date: str, to_date: str):
+    return get_daily_schedule_data(from_date=from_date, to_date=to_date, compact=compact_daily_schedules)
+
+
+def _merge_daily_record_stores(workings_runs: list, schedules_runs: list, results: list):
+    """取得した結果を、plan で返された範囲ごとにストアに反映する。results は勤怠データ、スケジュールデータの順に並んでいること"""
+    for (run_from, run_to), entries in zip(workings_runs, results[: len(workings_runs)]):
+        _daily_workings_store.merge(run_from, run_to, entries)
+    for (run_from, run_to), entries in zip(schedules_runs, results[len(workings_runs) :]):
+        _daily_schedules_store.merge(run_from, run_to, entries)
+
+
+def _prune_daily_record_stores(from_date: str):
+    """チェック対象の期間より前のデータは使わないので削除する"""
+    _daily_workings_store.prune(from_date)
+    _daily_schedules_store.prune(from_date)
 
 
-def _get_error_data_for_date_range(from_date: str, to_date: str):
-    """指定された日付範囲のエラーデータを取得する"""
+def _get_error_data_for_date_range(from_date: str, to_date: str, use_cache: bool = True):
+    """
+    指定された日付範囲のエラーデータを取得する
+
+    Returns:
+        TimecardErrors: データが取得できなかった場合はNone
+
+    Args:
+        use_cache: Falseの場合は勤怠エラーのキャッシュを使わずに計算し直し、計算結果でキャッシュを更新する
+            （勤怠データ・スケジュールデータは直近の日と古くなった日だけを取得し直す）
+    """
+    cache_key = (from_date, to_date)
+    if use_cache:
+        timecard_errors = _error_map_cache.get(cache_key)
+        if timecard_errors is not None:
+            return timecard_errors
+
     timecard_data, schedule_data = _fetch_timecard_and_schedule(from_date=from_date, to_date=to_date)
 
     if len(timecard_data) == 0 or len(schedule_data) == 0:
         return None
 
     active_employees = get_active_employees()
+    return _build_timecard_errors(cache_key, timecard_data, schedule_data, active_employees)
+
+
+def _build_timecard_errors(cache_key, timecard_data, schedule_data, active_employees) -> TimecardErrors:
+    """取得したデータから勤怠エラーを計算してキャッシュする"""
     active_employee_codes = {emp["code"] for emp in active_employees}
     error_data = _compute_error_map(timecard_data, schedule_data, active_employee_codes)
+    # 従業員ごとの索引もキャッシュしておき、データが変わらない間は全ユーザーで使い回す
+    timecard_errors = TimecardErrors.build(error_data)
+    _error_map_cache.set(cache_key, timecard_errors)
 
-    return error_data
+    return timecard_errors
+
+
+def invalidate_error_map_cache(from_date: str = None, to_date: str = None):
+    """
+    勤怠エラーのキャッシュを削除する
+
+    日付範囲を指定しない場合は、保持している勤怠データ・スケジュールデータも含めて全て削除する
+    """
+    if from_date is None or to_date is None:
+        _error_map_cache.invalidate()
+        _daily_workings_store.clear()
+        _daily_schedules_store.clear()
+    else:
+        _error_map_cache.invalidate((from_date, to_date))
+
+
+def get_error_map_cache_stats() -> dict:
+    return _error_map_cache.stats()
 
 
-def _compute_error_map(timecard_data: list, schedule_data: list, active_employee_codes: set) -> dict:
+def get_daily_record_store_stats() -> dict:
+    return {"daily_workings": _daily_workings_store.stats(), "daily_schedules": _daily_schedules_store.stats()}
+
+
+def _compute_error_map(timecard_data, schedule_data, active_employee_codes: set) -> dict:
     """
     勤怠エラーのマップを構築する共通ロジック
 
+    勤怠データ・スケジュールデータはそれぞれ1回ずつ先頭から読むだけなので、リストの代わりにイテレータを渡してもよい。
+    勤怠データを読み終わってからスケジュールデータを読み始める
+
     Returns:
         dict: 日付ごとのエラーデータ
         { "2025-02-01": [{ "code": "0009", "lastName": "山田", "firstName": "伝蔵", "isError": True ...}] }
     """
 
     # ----------------------------------------
-    # 勤怠データから勤怠エラーの人を抽出
+    # 勤怠データから勤怠エラーの人と、勤怠記録がある人を抽出
     # ----------------------------------------
 
     # 日付ごとのエラーデータ格納用
     # 勤怠エラーがある人のデータを日付ごとに格納する
     # { "2025-02-01": { "code": "0009", "lastName": "山田", "firstName": 伝蔵", "isError": True ....} }
     error_data = {}
+    # 勤怠記録がある (日付, 従業員キー) の組
+    timecard_recorded = set()
 
     for daily_data in timecard_data:
+        timecard_date = daily_data.get("date", "")
         error_timecard = []
         for daily_working in daily_data["dailyWorkings"]:
+            timecard_recorded.add((timecard_date, daily_working.get("employeeKey", "")))
             if daily_working["isError"]:
                 error_timecard.append(daily_working)
 
         if error_timecard:
-            timecard_date = daily_data.get("date", "不明")
-            error_data[timecard_date] = error_timecard
+            error_data[daily_data.get("date", "不明")] = error_timecard
 
     # ----------------------------------------
-    # スケジュールデータから勤怠情報なしの人を抽出
+    # スケジュールデータから、「通常勤務」だが勤怠記録がない人を抽出
     # ----------------------------------------
 
     # 退職タイミングによって退職者の勤務予定が中途半端に作成されているため、退職者の勤務予定を除外する必要がある
 
-    # スケジュールで「通常勤務」の人と日付のマッピングを作成
-    scheduled_normal_work = {}
+    # 日付ごとの勤怠記録なしのデータ。日付の順番はスケジュールデータで「通常勤務」の人が最初に出てきた順にする
+    missing_timecard = {}
     for daily_schedule in schedule_data:
         schedule_date = daily_schedule.get("date", "")
-        daily_schedules = daily_schedule.get("dailySchedules", [])
 
-        for schedule in daily_schedules:
+        for schedule in daily_schedule.get("dailySchedules", []):
+            employee = schedule.get("currentDateEmployee", {})
             # 従業員番号比較で退職者のデータは除外
-            if schedule.get("currentDateEmployee", {}).get("code") not in active_employee_codes:
+            if employee.get("code") not in active_employee_codes:
                 continue
 
             # 通常勤務のスケジュールのみ対象
-            if schedule.get("scheduleTypeName") == "通常勤務":
-                employee = schedule.get("currentDateEmployee", {})
-                employee_key = schedule.get("employeeKey", "")
-
-                if schedule_date not in scheduled_normal_work:
-                    scheduled_normal_work[schedule_date] = []
-
-                scheduled_normal_work[schedule_date].append(
-                    {"employeeKey": employee_key, "currentDateEmployee": employee}
-                )
-
-    # 勤怠データから勤怠記録がある社員のキーを日付ごとに抽出
-    timecard_recorded = {}
-    for daily_data in timecard_data:
-        timecard_date = daily_data.get("date", "")
-        daily_workings = daily_data.get("dailyWorkings", [])
-
-        if timecard_date not in timecard_recorded:
-            timecard_recorded[timecard_date] = set()
-
-        for working in daily_workings:
-            employee_key = working.get("employeeKey", "")
-            timecard_recorded[timecard_date].add(employee_key)
-
-    # スケジュールでは「通常勤務」だが勤怠記録がない社員を抽出
-    for day, employees in scheduled_normal_work.items():
-        # その日の勤怠記録がある社員のセット
-        recorded_employees = timecard_recorded.get(day, set())
-        missing_timecard = []
+            if schedule.get("scheduleTypeName") != "通常勤務":
+                continue
 
-        for employee_data in employees:
-            employee_key = employee_data.get("employeeKey", "")
+            missing_on_date = missing_timecard.setdefault(schedule_date, [])
+            employee_key = schedule.get("employeeKey", "")
             # 勤怠記録がない場合
-            if employee_key not in recorded_employees:
-                # エラー情報として追加
-                employee_info = employee_data.get("currentDateEmployee", {})
-                missing_timecard.append(
+            if (schedule_date, employee_key) not in timecard_recorded:
+                missing_on_date.append(
                     {
                         "employeeKey": employee_key,
-                        "currentDateEmployee": employee_info,
+                        "currentDateEmployee": employee,
                         "isError": True,  # 勤怠記録なしもエラー扱い
                     }
                 )
 
-        # エラーデータに追加
-        if missing_timecard:
+    # エラーデータに追加
+    for day, missing_on_date in missing_timecard.items():
+        if missing_on_date:
             if day in error_data:
-                error_data[day].extend(missing_timecard)
+                error_data[day].extend(missing_on_date)
             else:
-                error_data[day] = missing_timecard
+                error_data[day] = missing_on_date
 
     return error_data
 
@@ -164,32 +270,29 @@ def check_timecard_errors_for_user(user_id: str, say=None):
         return
 
     from_date, to_date = _get_date_range_for_error_check()
-    error_data = _get_error_data_for_date_range(from_date, to_date)
+    timecard_errors = _get_error_data_for_date_range(from_date, to_date)
 
-    if error_data is None:
+    if timecard_errors is None:
         return
 
-    # 対象ユーザーのエラー日付を収集
-    user_error_dates = []
-    for date_str, entries in error_data.items():
-        for entry in entries:
-            if entry.get("employeeKey") == employee_key:
-                user_error_dates.append(date_str)
-                break
+    # 対象ユーザーのエラー日付（昇順）
+    user_error_dates = timecard_errors.dates_for(employee_key)
 
     # エラーがある場合のみ通知を送信
     if user_error_dates and say:
-        # 日付をソートして表示用に整形
-        sorted_dates = sorted(user_error_dates)
-        date_display = "\n".join(sorted_dates)
+        say(_build_user_error_message(user_error_dates))
 
-        message = ":alert: 勤怠エラーがあるみたい！早めに修正しようね！:alert:\n\n"
-        message += "```\n■勤怠エラーになっている日\n"
-        message += f"{date_display}\n"
-        message += "```\n\n"
-        message += "さぁ今すぐ修正しに行こう！ :gaspaccho_fall: → https://login.ta.kingoftime.jp/admin"
 
-        say(message)
+def _build_user_error_message(user_error_dates: list) -> str:
+    """本人向けの勤怠エラー通知メッセージを構築する"""
+    date_display = "\n".join(user_error_dates)
+
+    message = ":alert: 勤怠エラーがあるみたい！早めに修正しようね！:alert:\n\n"
+    message += "```\n■勤怠エラーになっている日\n"
+    message += f"{date_display}\n"
+    message += "```\n\n"
+    message += "さぁ今すぐ修正しに行こう！ :gaspaccho_fall: → https://login.ta.kingoftime.jp/admin"
+    return message
 
 
 def announce_timecard_errors(say, request: SlackRequest):
@@ -205,48 +308,55 @@ def announce_timecard_errors(say, request: SlackRequest):
 
         # 勤怠エラーデータを取得
         from_date, to_date = _get_date_range_for_error_check()
-        print(f"date range: {from_date} to {to_date}")
-        error_data = _get_error_data_for_date_range(from_date, to_date)
+        logger.info(json.dumps({"event": "announce_timecard_errors", "from_date": from_date, "to_date": to_date}))
+        # 明示的に呼ばれたときは最新のデータでアナウンスする
+        timecard_errors = _get_error_data_for_date_range(from_date, to_date, use_cache=False)
 
         # データが空の場合のチェック
-        if error_data is None:
+        if timecard_errors is None:
             say(":den_paccho1: < 勤怠データまたはスケジュールデータが見つからなかったよ！")
             return
 
+        error_data = timecard_errors.by_date
+
         if not error_data:
             say(":den_paccho1: < 勤怠エラーの人はいないよ！やったね！")
             return
 
-        # ----------------------------------------
-        # 通知メッセージ構築 & 送信
-        # ----------------------------------------
-        # メッセージの表示サンプル:
-        # :den_paccho1: < 勤怠エラーがある人をお知らせするよ！
-        #
-        # ■2023-04-01
-        # 0009 山田 伝蔵
-        # 0010 熊本 太郎
-        #
-        # ■2023-04-02
-        # 0100 らぷ らす
-        message = ":den_paccho1: < 勤怠エラーがある人をお知らせするよ！\n\n"
-
-        # 日付順でエラーを表示
-        for day in sorted(error_data.keys()):
-            message += f"■{day}\n"
-            # 従業員番号順でエラー対象者を表示する
-            sorted_workings = sorted(error_data[day], key=lambda w: w.get("currentDateEmployee", {}).get("code", "不明"))
-            for working in sorted_workings:
-                employee = working.get("currentDateEmployee", {})
-                code = employee.get("code", "不明")
-                last_name = employee.get("lastName", "")
-                first_name = employee.get("firstName", "")
-                message += f"{code} {last_name} {first_name}\n"
-            message += "\n"
-
-        say(message)
+        say(_build_announcement_message(error_data))
 
     except KOTException as e:
         response_kot_error(say, e)
     except Exception as e:
         response_general_error(say, e)
+
+
+def _build_announcement_message(error_data: dict) -> str:
+    """
+    勤怠エラーがある人のアナウンスメッセージを構築する
+
+    メッセージの表示サンプル:
+    :den_paccho1: < 勤怠エラーがある人をお知らせするよ！
+
+    ■2023-04-01
+    0009 山田 伝蔵
+    0010 熊本 太郎
+
+    ■2023-04-02
+    0100 らぷ らす
+    """
+    message = ":den_paccho1: < 勤怠エラーがある人をお知らせするよ！\n\n"
+
+    # 日付順でエラーを表示
+    for day in sorted(error_data.keys()):
+        message += f"■{day}\n"
+        # 従業員番号順でエラー対象者を表示する
+        sorted_workings = sorted(error_data[day], key=lambda w: w.get("currentDateEmployee", {}).get("code", "不明"))
+        for working in sorted_workings:
+            employee = working.get("currentDateEmployee", {})
+            code = employee.get("code", "不明")
+            last_name = employee.get("lastName", "")
+            first_name = employee.get("firstName", "")
+            message += f"{code} {last_name} {first_name}\n"
+        message += "\n"
+    return message
@@ -6,8 +6,16 @@ from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk import WebClient
 
+from components.instrumentation import timed_listener
+from components.metrics_server import MetricsServer
+from components.punch_queue import get_punch_queue
+from components.strategy.data_strategy import create_data_strategy
 from components.typing import SlackRequest
+from components.usecase import get_employee_directory
 from handler.jp.configuration import register_employee_code
+from handler.jp.helper import is_kot_api_available
+from handler.jp.metrics import register_process_metrics
+from handler.jp.punch_queue_drainer import create_punch_queue_drainer
 from handler.jp.time_recorder import record_clock_in, record_clock_out, record_end_break, record_start_break
 from handler.jp.timecard_check import announce_timecard_errors
 
@@ -40,6 +48,7 @@ def create_app(is_test=False):
         get_test_command_name = get_command_name
 
     @app.event("app_mention")
+    @timed_listener
     def handle_app_mention_events(event, say):
         # 勤怠エラーがある人をアナウンスする
         if "勤怠エラー" in event["text"].lower():
@@ -48,43 +57,52 @@ def create_app(is_test=False):
 
     # record timestamp
     @app.message(re.compile("^おはー[！？!?]*$"))
+    @timed_listener
     def record_clock_in_listener(message, say):
         record_clock_in(say, SlackRequest.build_from_message(message))
 
     @app.command(get_test_command_name("clock-in"))
+    @timed_listener
     def record_clock_in_command(ack, command, say):
         ack()
         record_clock_in(say, SlackRequest.build_from_command(command))
 
     @app.message(re.compile("^(店じまい|おつー)[！？!?]*$"))
+    @timed_listener
     def record_clock_out_listener(message, say):
         record_clock_out(say, SlackRequest.build_from_message(message))
 
     @app.command(get_test_command_name("clock-out"))
+    @timed_listener
     def record_clock_out_command(ack, command, say):
         ack()
         record_clock_out(say, SlackRequest.build_from_command(command))
 
     @app.message(re.compile("^休憩開始$"))
+    @timed_listener
     def record_start_break_listener(message, say):
         record_start_break(say, SlackRequest.build_from_message(message))
 
     @app.command(get_test_command_name("start-break"))
+    @timed_listener
     def record_start_break_command(ack, command, say):
         ack()
         record_start_break(say, SlackRequest.build_from_command(command))
 
     @app.message(re.compile("^休憩終了$"))
+    @timed_listener
     def record_end_break_listener(message, say):
         record_end_break(say, SlackRequest.build_from_message(message))
 
     @app.command(get_test_command_name("end-break"))
+    @timed_listener
     def record_end_break_command(ack, command, say):
         ack()
         record_end_break(say, SlackRequest.build_from_command(command))
 
     # setting
     @app.command(get_test_command_name("employee-code"))
+    @timed_listener
     def employee_code_command(ack, command, say):
         ack()
         register_employee_code(say, SlackRequest.build_from_command(command))
@@ -110,6 +128,29 @@ if __name__ == "__main__":
     logger.addHandler(logging.StreamHandler())
     logger.info("start slackbot")
 
+    # DATA_STRATEGY・DATA_STRATEGY_CACHES の設定が間違っている場合は、Slack のリクエストを受け付ける前に起動を失敗させる
+    create_data_strategy()
+
     app = create_app()
 
-    SocketModeHandler(app, os.environ["SLACK_APP_TOKEN"]).start()
+    # KOT API の制限時間帯に受け付けた打刻を、制限時間帯が終わったら登録する
+    drainer = create_punch_queue_drainer(
+        get_punch_queue(), notify=lambda channel_id, text: app.client.chat_postMessage(channel=channel_id, text=text)
+    )
+    drainer.start()
+
+    # 勤怠エラーチェックや従業員コードの登録で使う従業員一覧を定期的に取得し直す
+    get_employee_directory().start(can_refresh=is_kot_api_available)
+
+    handler = SocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
+
+    # METRICS_PORT が設定されている場合は、同じプロセスで /metrics を返す HTTP サーバーを起動する
+    if os.environ.get("METRICS_PORT"):
+        register_process_metrics(socket_mode_handler=handler)
+        metrics_server = MetricsServer(
+            host=os.environ.get("METRICS_HOST", "127.0.0.1"), port=int(os.environ["METRICS_PORT"])
+        )
+        metrics_server.start()
+        logger.info(f"metrics server: {metrics_server.url}/metrics")
+
+    handler.start()
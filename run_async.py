@@ -0,0 +1,151 @@
+"""
+asyncio 版の起動スクリプト
+
+KOT API の呼び出しを待っている間もスレッドを占有しないため、1プロセスで多くの打刻を同時に処理できる。
+同期版（run.py）と同じ環境変数で動作する
+
+$ poetry run python run_async.py
+"""
+
+import asyncio
+import logging
+import os
+import re
+
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+
+from components.instrumentation import timed_listener
+from components.metrics_server import MetricsServer
+from components.punch_queue import get_punch_queue
+from components.strategy.data_strategy import create_data_strategy
+from components.typing import SlackRequest
+from components.usecase import get_employee_directory
+from handler.jp.async_configuration import register_employee_code
+from handler.jp.async_time_recorder import record_clock_in, record_clock_out, record_end_break, record_start_break
+from handler.jp.async_timecard_check import announce_timecard_errors
+from handler.jp.helper import is_kot_api_available
+from handler.jp.metrics import register_process_metrics
+from handler.jp.punch_queue_drainer import create_punch_queue_drainer
+from run import get_command_name
+
+
+def create_async_app(is_test=False):
+    if is_test:
+        client = AsyncWebClient(token="xoxb-valid", base_url="http://localhost:8888")
+        app = AsyncApp(client=client, signing_secret="secret")
+
+        # テスト環境では強制的にテスト用コマンド名を使用
+        def get_test_command_name(base_name):
+            return f"/{base_name}"
+
+    else:
+        token = os.environ["SLACK_BOT_TOKEN"]
+        app = AsyncApp(token=token)
+        # 本番環境では環境変数に応じてコマンド名を生成
+        get_test_command_name = get_command_name
+
+    @app.event("app_mention")
+    @timed_listener
+    async def handle_app_mention_events(event, say):
+        # 勤怠エラーがある人をアナウンスする
+        if "勤怠エラー" in event["text"].lower():
+            request = SlackRequest(channel_id=event["channel"], user_id=event["user"], text=event["text"])
+            await announce_timecard_errors(say, request)
+
+    # record timestamp
+    @app.message(re.compile("^おはー[！？!?]*$"))
+    @timed_listener
+    async def record_clock_in_listener(message, say):
+        await record_clock_in(say, SlackRequest.build_from_message(message))
+
+    @app.command(get_test_command_name("clock-in"))
+    @timed_listener
+    async def record_clock_in_command(ack, command, say):
+        await ack()
+        await record_clock_in(say, SlackRequest.build_from_command(command))
+
+    @app.message(re.compile("^(店じまい|おつー)[！？!?]*$"))
+    @timed_listener
+    async def record_clock_out_listener(message, say):
+        await record_clock_out(say, SlackRequest.build_from_message(message))
+
+    @app.command(get_test_command_name("clock-out"))
+    @timed_listener
+    async def record_clock_out_command(ack, command, say):
+        await ack()
+        await record_clock_out(say, SlackRequest.build_from_command(command))
+
+    @app.message(re.compile("^休憩開始$"))
+    @timed_listener
+    async def record_start_break_listener(message, say):
+        await record_start_break(say, SlackRequest.build_from_message(message))
+
+    @app.command(get_test_command_name("start-break"))
+    @timed_listener
+    async def record_start_break_command(ack, command, say):
+        await ack()
+        await record_start_break(say, SlackRequest.build_from_command(command))
+
+    @app.message(re.compile("^休憩終了$"))
+    @timed_listener
+    async def record_end_break_listener(message, say):
+        await record_end_break(say, SlackRequest.build_from_message(message))
+
+    @app.command(get_test_command_name("end-break"))
+    @timed_listener
+    async def record_end_break_command(ack, command, say):
+        await ack()
+        await record_end_break(say, SlackRequest.build_from_command(command))
+
+    # setting
+    @app.command(get_test_command_name("employee-code"))
+    @timed_listener
+    async def employee_code_command(ack, command, say):
+        await ack()
+        await register_employee_code(say, SlackRequest.build_from_command(command))
+
+    return app
+
+
+async def main():
+    # DATA_STRATEGY・DATA_STRATEGY_CACHES の設定が間違っている場合は、Slack のリクエストを受け付ける前に起動を失敗させる
+    create_data_strategy()
+
+    app = create_async_app()
+
+    # KOT API の制限時間帯に受け付けた打刻を、制限時間帯が終わったら登録する
+    loop = asyncio.get_running_loop()
+    drainer = create_punch_queue_drainer(
+        get_punch_queue(),
+        notify=lambda channel_id, text: asyncio.run_coroutine_threadsafe(
+            app.client.chat_postMessage(channel=channel_id, text=text), loop
+        ).result(),
+    )
+    drainer.start()
+
+    # 勤怠エラーチェックや従業員コードの登録で使う従業員一覧を定期的に取得し直す
+    get_employee_directory().start(can_refresh=is_kot_api_available)
+
+    handler = AsyncSocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
+
+    # METRICS_PORT が設定されている場合は、/metrics を返す HTTP サーバーをスレッドで起動する
+    if os.environ.get("METRICS_PORT"):
+        register_process_metrics(socket_mode_handler=handler)
+        metrics_server = MetricsServer(
+            host=os.environ.get("METRICS_HOST", "127.0.0.1"), port=int(os.environ["METRICS_PORT"])
+        )
+        metrics_server.start()
+        logging.getLogger().info(f"metrics server: {metrics_server.url}/metrics")
+
+    await handler.start_async()
+
+
+if __name__ == "__main__":
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.StreamHandler())
+    logger.info("start slackbot (asyncio)")
+
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+import unittest
+
+from benchmark.load_test import burst_offsets, run
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_burst_offsets(self):
+        offsets = burst_offsets(users=100, burst_minutes=20, speedup=60, seed=0)
+
+        self.assertEqual(len(offsets), 100)
+        self.assertListEqual(offsets, sorted(offsets))
+        # 20分を60倍に縮めるので20秒以内に収まり、中央（9:00）に集中する
+        self.assertGreaterEqual(offsets[0], 0)
+        self.assertLessEqual(offsets[-1], 20)
+        self.assertGreater(sum(1 for offset in offsets if 5 <= offset <= 15), 50)
+
+    def test_run(self):
+        # 小さい規模で最後まで実行できることだけを確認する
+        results = run(users=5, burst_minutes=0.1, speedup=60, command_ratio=0.5, client_rate_limit=0, timeout=10)
+
+        self.assertEqual(results["punches"]["total"], 5)
+        self.assertEqual(results["punches"]["succeeded"], 5)
+        self.assertEqual(results["kot"]["by_route"]["POST /daily-workings/timerecord/{employeeKey}"], 5)
+        self.assertGreaterEqual(results["kot"]["calls_per_punch"], 1)
+        self.assertGreaterEqual(results["slack"]["messages_per_punch"], 1)
+        self.assertGreaterEqual(results["punch_latency_ms"]["p99"], results["punch_latency_ms"]["p50"])
+
+    def test_run__kot_errors(self):
+        results = run(users=3, burst_minutes=0.1, speedup=60, kot_error_rate=1.0, client_rate_limit=0, timeout=10)
+
+        self.assertEqual(results["punches"]["succeeded"], 0)
+        self.assertEqual(results["punches"]["failed"], 3)
+        self.assertEqual(results["kot"]["by_status"], {"500": 3})
@@ -0,0 +1,60 @@
+import json
+import unittest
+
+import requests
+
+from benchmark.mock_kot_server import MockKOTServer
+
+
+class TestMockKOTServer(unittest.TestCase):
+    def _start(self, **kwargs) -> MockKOTServer:
+        server = MockKOTServer(employees=3, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_endpoints(self):
+        server = self._start()
+
+        employees = requests.get(f"{server.url}/employees").json()
+        self.assertListEqual([employee["key"] for employee in employees], ["key-0000", "key-0001", "key-0002"])
+        self.assertEqual(requests.get(f"{server.url}/employees/0001").json()["key"], "key-0001")
+        self.assertEqual(requests.get(f"{server.url}/employees/0003").status_code, 404)
+
+        daily_workings = requests.get(f"{server.url}/daily-workings?start=2023-04-01&end=2023-04-03").json()
+        self.assertListEqual([daily["date"] for daily in daily_workings], ["2023-04-01", "2023-04-02", "2023-04-03"])
+
+        timerecord = {"date": "2023-04-03", "time": "2023-04-03T09:00:00+09:00", "code": 1}
+        resp = requests.post(f"{server.url}/daily-workings/timerecord/key-0001", data=json.dumps(timerecord))
+        self.assertEqual(resp.status_code, 201)
+        self.assertDictEqual(resp.json(), {"employeeKey": "key-0001", **timerecord})
+
+        self.assertDictEqual(
+            server.stats(),
+            {
+                "calls": 5,
+                "by_route": {
+                    "GET /employees": 1,
+                    "GET /employees/{code}": 2,
+                    "GET /daily-workings": 1,
+                    "POST /daily-workings/timerecord/{employeeKey}": 1,
+                },
+                "by_status": {"200": 3, "201": 1, "404": 1},
+            },
+        )
+
+    def test_error_rate(self):
+        server = self._start(error_rate=1.0, error_status=503)
+
+        resp = requests.get(f"{server.url}/employees")
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertIn("errors", resp.json())
+
+    def test_rate_limit(self):
+        server = self._start(rate_limit=0.001, rate_limit_burst=2, retry_after=3)
+
+        statuses = [requests.get(f"{server.url}/employees").status_code for _ in range(3)]
+
+        self.assertListEqual(statuses, [200, 200, 429])
+        self.assertEqual(requests.get(f"{server.url}/employees").headers["Retry-After"], "3")
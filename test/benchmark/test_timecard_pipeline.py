@@ -0,0 +1,72 @@
+import unittest
+
+from benchmark.harness import compare, percentile
+from benchmark.timecard_pipeline import run
+
+
+class TestHarness(unittest.TestCase):
+    def test_percentile(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+        self.assertEqual(percentile(values, 0.5), 3.0)
+        self.assertEqual(percentile(values, 0.9), 4.6)
+        self.assertEqual(percentile(values, 1.0), 5.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare(self):
+        baseline = {
+            "results": [
+                {
+                    "name": "case",
+                    "latency_ms": {"p50": 10.0, "p99": 20.0},
+                    "throughput_ops_per_sec": 100.0,
+                    "peak_memory_bytes": 1000,
+                }
+            ]
+        }
+        current = {
+            "results": [
+                {
+                    "name": "case",
+                    "latency_ms": {"p50": 5.0, "p99": 20.0},
+                    "throughput_ops_per_sec": 200.0,
+                    "peak_memory_bytes": 1500,
+                },
+                # ベースラインにないものは比較しない
+                {"name": "new-case", "latency_ms": {}, "throughput_ops_per_sec": 1.0, "peak_memory_bytes": 1},
+            ]
+        }
+
+        self.assertListEqual(
+            compare(baseline, current),
+            [
+                {
+                    "name": "case",
+                    "p50_ratio": 0.5,
+                    "p99_ratio": 1.0,
+                    "throughput_ratio": 2.0,
+                    "peak_memory_ratio": 1.5,
+                }
+            ],
+        )
+
+
+class TestTimecardPipeline(unittest.TestCase):
+    def test_run(self):
+        # 小さいデータで最後まで実行できることだけを確認する
+        results = run(employees=20, days=3, error_rate=0.5, iterations=1)
+
+        self.assertListEqual(
+            [result["name"] for result in results["results"]],
+            [
+                "compute_error_map",
+                "compute_error_map_compact",
+                "build_timecard_errors",
+                "user_lookup",
+                "announcement_message",
+            ],
+        )
+        self.assertGreater(results["dataset"]["error_entries"], 0)
+        for result in results["results"]:
+            self.assertGreaterEqual(result["latency_ms"]["p99"], result["latency_ms"]["p50"])
+            self.assertGreater(result["peak_memory_bytes"], 0)
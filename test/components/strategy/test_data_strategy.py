@@ -0,0 +1,113 @@
+import os
+import unittest
+from unittest import mock
+
+from components.strategy import data_strategy
+from components.strategy.cache_data_strategy import InMemoryCacheDataStrategy
+from components.strategy.data_strategy import (
+    CacheDataStrategy,
+    DataStrategy,
+    clear_data_strategies,
+    create_data_strategy,
+    register_data_strategy,
+)
+from components.strategy.local_file_data_strategy import LocalFileDataStrategy
+
+
+class _DictDataStrategy(DataStrategy):
+    def __init__(self):
+        self.data = {}
+        self.get_calls = 0
+
+    def read(self) -> dict:
+        return dict(self.data)
+
+    def write(self, data):
+        self.data.update(data)
+
+    def get(self, user_id):
+        self.get_calls += 1
+        return self.data.get(user_id)
+
+
+class _DictCacheDataStrategy(CacheDataStrategy):
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.cache = {}
+        self.get_calls = 0
+
+    def _get_cached(self, user_id):
+        self.get_calls += 1
+        return self.cache.get(user_id)
+
+    def _set_cached(self, data: dict):
+        self.cache.update(data)
+
+
+class TestCreateDataStrategy(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(data_strategy._registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        register_data_strategy("DictDataStrategy", _DictDataStrategy)
+        register_data_strategy("DictCacheDataStrategy", _DictCacheDataStrategy)
+        clear_data_strategies()
+        self.addCleanup(clear_data_strategies)
+
+    def test_default(self):
+        with mock.patch.dict(os.environ, {"DATA_STRATEGY": "", "DATA_STRATEGY_CACHES": ""}):
+            strategy = create_data_strategy()
+
+            self.assertIsInstance(strategy, LocalFileDataStrategy)
+            # プロセス内で1回だけ作る
+            self.assertIs(create_data_strategy(), strategy)
+
+    def test_unknown(self):
+        with mock.patch.dict(os.environ, {"DATA_STRATEGY": "UnknownDataStrategy"}):
+            with self.assertRaises(ValueError):
+                create_data_strategy()
+
+    def test_caches(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "DATA_STRATEGY": "DictDataStrategy",
+                "DATA_STRATEGY_CACHES": "InMemoryCacheDataStrategy, DictCacheDataStrategy",
+            },
+        ):
+            strategy = create_data_strategy()
+
+        # 先頭に指定したキャッシュから順に読み込む
+        self.assertIsInstance(strategy, InMemoryCacheDataStrategy)
+        self.assertTrue(strategy.SUPPORTS_POINT_LOOKUP)
+        shared = strategy.backend
+        self.assertIsInstance(shared, _DictCacheDataStrategy)
+        base = shared.backend
+        self.assertIsInstance(base, _DictDataStrategy)
+
+        base.data["user-1"] = "key-1"
+        self.assertEqual(strategy.get("user-1"), "key-1")
+        self.assertEqual(strategy.get("user-1"), "key-1")
+        self.assertEqual((shared.get_calls, base.get_calls), (1, 1))
+        self.assertDictEqual(shared.cache, {"user-1": "key-1"})
+
+        # 他のプロセスが共有のキャッシュに登録したユーザー
+        shared.cache["user-2"] = "key-2"
+        self.assertEqual(strategy.get("user-2"), "key-2")
+        self.assertEqual(base.get_calls, 1)
+
+        # 書き込みは全ての層に反映する
+        strategy.put("user-3", "key-3")
+        self.assertEqual(base.data["user-3"], "key-3")
+        self.assertEqual(shared.cache["user-3"], "key-3")
+        self.assertEqual(strategy.get("user-3"), "key-3")
+        self.assertEqual(shared.get_calls, 2)
+
+    def test_caches__version(self):
+        with mock.patch.dict(
+            os.environ, {"DATA_STRATEGY": "DictDataStrategy", "DATA_STRATEGY_CACHES": "DictCacheDataStrategy"}
+        ):
+            strategy = create_data_strategy()
+
+        with mock.patch.object(_DictDataStrategy, "version", return_value="v1"):
+            self.assertEqual(strategy.version(), "v1")
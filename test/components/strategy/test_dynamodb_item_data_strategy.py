@@ -0,0 +1,96 @@
+import json
+import os
+import unittest
+import uuid
+from unittest import mock
+
+# DynamoDB Local（https://hub.docker.com/r/amazon/dynamodb-local）に接続できる場合のみ実行する
+# $ docker run -p 8000:8000 amazon/dynamodb-local
+# $ DYNAMODB_HOST=http://localhost:8000 poetry run python -m unittest discover
+DYNAMODB_HOST = os.environ.get("DYNAMODB_HOST")
+
+
+@unittest.skipUnless(DYNAMODB_HOST, "DYNAMODB_HOST is not set")
+class TestDynamoDBItemDataStrategy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        suffix = uuid.uuid4().hex[:8]
+        os.environ.setdefault("DYNAMODB_REGION", "ap-northeast-1")
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "dummy")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "dummy")
+        os.environ.setdefault("DYNAMODB_DATA_TABLE_NAME", f"kintai-paccho-data-{suffix}")
+        os.environ.setdefault("DYNAMODB_EMPLOYEE_TABLE_NAME", f"kintai-paccho-employee-{suffix}")
+
+        from components.strategy.dynamodb_data_strategy import DataModel
+        from components.strategy.dynamodb_item_data_strategy import EmployeeItemModel
+
+        cls.models = [DataModel, EmployeeItemModel]
+        for model in cls.models:
+            if not model.exists():
+                model.create_table(billing_mode="PAY_PER_REQUEST", wait=True)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        for model in cls.models:
+            model.delete_table()
+
+    def setUp(self) -> None:
+        from components.strategy.dynamodb_item_data_strategy import DynamoDBItemDataStrategy, EmployeeItemModel
+
+        for item in EmployeeItemModel.scan():
+            item.delete()
+        self.strategy = DynamoDBItemDataStrategy()
+
+    def test_get_put(self):
+        self.assertIsNone(self.strategy.get("user-1"))
+
+        self.strategy.put("user-1", "key-1")
+        self.strategy.put("user-2", "key-2")
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+
+        # 再登録で上書きできる
+        self.strategy.put("user-1", "key-10")
+        self.assertEqual(self.strategy.get("user-1"), "key-10")
+
+        self.assertDictEqual(self.strategy.read(), {"user-1": "key-10", "user-2": "key-2"})
+
+    def test_put__concurrent_update(self):
+        from components.strategy.data_strategy import ConcurrentUpdateError
+        from components.strategy.dynamodb_item_data_strategy import EmployeeItemModel
+
+        self.strategy.put("user-1", "key-1")
+        stale = EmployeeItemModel.get(hash_key="user-1")
+        self.strategy.put("user-1", "key-new")
+
+        # 読み込んでから書き込むまでの間に他のプロセスが書き込んだ場合は、上書きせずにエラーにする
+        with mock.patch.object(EmployeeItemModel, "get", return_value=stale):
+            with self.assertRaises(ConcurrentUpdateError):
+                self.strategy.put("user-1", "key-old")
+
+        self.assertEqual(self.strategy.get("user-1"), "key-new")
+        self.assertEqual(EmployeeItemModel.get(hash_key="user-1").version, 2)
+
+    def test_put__item_without_version(self):
+        from components.strategy.dynamodb_item_data_strategy import EmployeeItemModel
+
+        # write() で保存したアイテムや、version を追加する前に保存されたアイテム
+        self.strategy.write({"user-1": "key-1"})
+        self.assertIsNone(EmployeeItemModel.get(hash_key="user-1").version)
+
+        self.strategy.put("user-1", "key-2")
+
+        self.assertEqual(self.strategy.get("user-1"), "key-2")
+        self.assertEqual(EmployeeItemModel.get(hash_key="user-1").version, 1)
+
+    def test_migrate(self):
+        from components.strategy.dynamodb_data_strategy import DataModel, DynamoDBDataStrategy
+        from components.strategy.migrate_dynamodb_items import migrate
+
+        data = {f"user-{i}": f"key-{i}" for i in range(30)}
+        DataModel(hash_key=DynamoDBDataStrategy.DATA_KEY, value=json.dumps(data), updated_at="").save()
+
+        self.assertDictEqual(migrate(dry_run=True), data)
+        self.assertDictEqual(self.strategy.read(), {})
+
+        self.assertDictEqual(migrate(), data)
+        self.assertDictEqual(self.strategy.read(), data)
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from components.strategy.local_file_data_strategy import LocalFileDataStrategy
+
+
+class TestLocalFileDataStrategy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_json = os.path.join(self.temp_dir, "employee_data.json")
+        patcher = mock.patch.multiple(LocalFileDataStrategy, DATA_DIR=self.temp_dir, DATA_JSON=self.temp_json)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.strategy = LocalFileDataStrategy()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_write(self):
+        self.strategy.write({"user-1": "key-1"})
+
+        with open(self.temp_json) as f:
+            self.assertDictEqual(json.loads(f.read()), {"user-1": "key-1"})
+        # 一時ファイルは残らない
+        self.assertListEqual(sorted(os.listdir(self.temp_dir)), ["employee_data.json", "employee_data.json.lock"])
+
+    def test_write__keep_mode(self):
+        self.strategy.write({"user-1": "key-1"})
+        # 新しく作る場合は open() で作った場合と同じパーミッションにする
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.temp_json).st_mode), 0o666 & ~umask)
+
+        # 置き換えても元のファイルのパーミッションのまま
+        os.chmod(self.temp_json, 0o640)
+        self.strategy.write({"user-1": "key-2"})
+        self.assertEqual(stat.S_IMODE(os.stat(self.temp_json).st_mode), 0o640)
+
+    def test_write__failed(self):
+        self.strategy.write({"user-1": "key-1"})
+
+        with mock.patch("components.strategy.local_file_data_strategy.json.dumps", side_effect=TypeError):
+            with self.assertRaises(TypeError):
+                self.strategy.write({"user-2": object()})
+
+        # 書き込みに失敗しても元のファイルは壊れない
+        self.assertDictEqual(self.strategy.read(), {"user-1": "key-1"})
+        self.assertListEqual(sorted(os.listdir(self.temp_dir)), ["employee_data.json", "employee_data.json.lock"])
+
+    def test_version(self):
+        self.strategy.write({"user-1": "key-1"})
+        version = self.strategy.version()
+        self.assertEqual(self.strategy.version(), version)
+
+        # 同じサイズのデータで書き換えても、ファイルが置き換わるのでバージョンが変わる
+        self.strategy.write({"user-1": "key-2"})
+        self.assertNotEqual(self.strategy.version(), version)
+
+    def test_version__not_exists(self):
+        self.assertEqual(self.strategy.version(), (self.temp_json, None))
+
+    def test_put__concurrent(self):
+        self.strategy.write({})
+
+        def put(i):
+            # 別のプロセスと同じように、インスタンスごとにファイルを開いて読み書きする
+            LocalFileDataStrategy().put(f"user-{i}", f"key-{i}")
+
+        threads = [threading.Thread(target=put, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # ロックを取って読み込みから書き込みまで行うので、他の登録を上書きしない
+        self.assertDictEqual(self.strategy.read(), {f"user-{i}": f"key-{i}" for i in range(20)})
+
+    def test_read__concurrent_create(self):
+        exists = os.path.exists
+        calls = []
+
+        def _exists(path):
+            result = exists(path)
+            if path == self.temp_json and not calls:
+                calls.append(path)
+                # ファイルがないことを確かめた直後に、別のプロセスが最初の登録を書き込む
+                thread = threading.Thread(target=LocalFileDataStrategy().put, args=("user-1", "key-1"))
+                thread.start()
+                thread.join()
+            return result
+
+        with mock.patch("components.strategy.local_file_data_strategy.os.path.exists", side_effect=_exists):
+            self.assertDictEqual(self.strategy.read(), {"user-1": "key-1"})
+
+        # 空のデータで上書きしない
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+
+    def test_lock__reentrant(self):
+        with self.strategy.lock():
+            self.strategy.put("user-1", "key-1")
+
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
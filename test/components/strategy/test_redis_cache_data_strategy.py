@@ -0,0 +1,185 @@
+import socketserver
+import threading
+import unittest
+from unittest import mock
+
+from components.strategy.data_strategy import DataStrategy
+from components.strategy.redis_cache_data_strategy import RedisCacheDataStrategy, RedisClient, RedisError
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    def handle(self):
+        server = self.server
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            with server.lock:
+                server.commands.append(command)
+                name = command[0].upper()
+                if name == "GET":
+                    value = server.data.get(command[1])
+                    reply = b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value.encode("utf-8"))
+                elif name == "SET":
+                    server.data[command[1]] = command[2]
+                    server.ttls[command[1]] = int(command[4]) if len(command) > 4 else None
+                    reply = b"+OK\r\n"
+                else:
+                    reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+class _RESPServer(socketserver.ThreadingTCPServer):
+    """GET・SET だけに応答する Redis プロトコルのサーバー"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("localhost", 0), _RESPHandler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.ttls = {}
+        self.commands = []
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _DictDataStrategy(DataStrategy):
+    def __init__(self):
+        self.data = {}
+        self.get_calls = 0
+
+    def read(self) -> dict:
+        return dict(self.data)
+
+    def write(self, data):
+        self.data.update(data)
+
+    def get(self, user_id):
+        self.get_calls += 1
+        return self.data.get(user_id)
+
+
+class TestRedisCacheDataStrategy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = _RESPServer()
+        self.backend = _DictDataStrategy()
+        self.client = RedisClient(self.server.url, timeout=1)
+        self.strategy = RedisCacheDataStrategy(self.backend, client=self.client)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def test_get(self):
+        self.backend.data = {"user-1": "key-1"}
+
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+
+        # 2回目は Redis から読み込む
+        self.assertEqual(self.backend.get_calls, 1)
+        self.assertEqual(self.server.data["kintai-paccho:employee:user-1"], "key-1")
+        self.assertEqual(self.server.ttls["kintai-paccho:employee:user-1"], RedisCacheDataStrategy.TTL)
+        self.assertDictEqual(self.strategy.stats(), {"hits": 1, "misses": 1, "errors": 0})
+
+    def test_get__not_registered(self):
+        self.assertIsNone(self.strategy.get("user-1"))
+        self.assertIsNone(self.strategy.get("user-1"))
+
+        # 未登録のユーザーはキャッシュしない
+        self.assertEqual(self.backend.get_calls, 2)
+        self.assertDictEqual(self.server.data, {})
+
+    def test_put(self):
+        self.strategy.put("user-1", "key-1")
+
+        self.assertDictEqual(self.backend.data, {"user-1": "key-1"})
+        self.assertEqual(self.server.data["kintai-paccho:employee:user-1"], "key-1")
+
+        # 他のプロセスのインスタンスも Redis から読み込める
+        other = RedisCacheDataStrategy(_DictDataStrategy(), client=RedisClient(self.server.url, timeout=1))
+        self.assertEqual(other.get("user-1"), "key-1")
+        other.client.close()
+
+    def test_write(self):
+        self.strategy.write({"user-1": "key-1", "user-2": "key-2"})
+
+        self.assertDictEqual(self.backend.data, {"user-1": "key-1", "user-2": "key-2"})
+        self.assertDictEqual(
+            self.server.data, {"kintai-paccho:employee:user-1": "key-1", "kintai-paccho:employee:user-2": "key-2"}
+        )
+        # パイプラインで1本のコネクションから送る
+        self.assertEqual([command[0] for command in self.server.commands], ["SET", "SET"])
+
+    def test_redis_unavailable(self):
+        self.backend.data = {"user-1": "key-1"}
+        self.client.close()
+        self.server.stop()
+
+        # Redis に接続できなくても backend から読み書きできる
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+        self.strategy.put("user-2", "key-2")
+        self.assertEqual(self.backend.data["user-2"], "key-2")
+        self.assertEqual(self.strategy.stats()["errors"], 3)
+
+    def test_redis_error_reply(self):
+        with self.assertRaises(Exception) as cm:
+            self.client.execute("PING")
+        self.assertEqual(str(cm.exception), "ERR unknown command")
+
+        # エラーの応答の後もコネクションを使い続けられる
+        self.assertIsNone(self.client.execute("GET", "missing"))
+
+    def test_redis_unavailable__retry_interval(self):
+        self.backend.data = {"user-1": "key-1"}
+        client = RedisClient(self.server.url, timeout=1, retry_interval=10)
+        strategy = RedisCacheDataStrategy(self.backend, client=client)
+        self.server.stop()
+
+        with mock.patch(
+            "components.strategy.redis_cache_data_strategy.socket.create_connection", side_effect=ConnectionRefusedError
+        ) as mocked_create_connection, mock.patch(
+            "components.strategy.redis_cache_data_strategy.time.monotonic", return_value=100.0
+        ) as mocked_monotonic:
+            for _ in range(3):
+                self.assertEqual(strategy.get("user-1"), "key-1")
+
+            # 接続できなかった後の retry_interval 秒間は、接続を待たずにキャッシュなしで読み込む
+            self.assertEqual(mocked_create_connection.call_count, 1)
+            # 読み込みと、backend から読み込んだ値の書き込みで2回ずつエラーになる
+            self.assertEqual(strategy.stats()["errors"], 6)
+
+            mocked_monotonic.return_value = 110.0
+            self.assertEqual(strategy.get("user-1"), "key-1")
+            self.assertEqual(mocked_create_connection.call_count, 2)
+
+    def test_auth_failed(self):
+        client = RedisClient(f"redis://:wrong-password@localhost:{self.server.server_address[1]}/0", timeout=1)
+
+        for _ in range(2):
+            with self.assertRaises(RedisError):
+                client.execute("GET", "user-1")
+
+        # 認証できなかったコネクションは使い回さずに、次のコマンドで張り直して認証し直す
+        self.assertListEqual([command[0] for command in self.server.commands], ["AUTH", "AUTH"])
+        self.assertIsNone(getattr(client._local, "conn", None))
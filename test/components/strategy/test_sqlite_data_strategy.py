@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from components.strategy.migrate_sqlite import migrate
+from components.strategy.sqlite_data_strategy import SQLiteDataStrategy
+
+
+class TestSQLiteDataStrategy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "employee_data.db")
+        self.strategy = SQLiteDataStrategy(path=self.db_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_put(self):
+        self.assertIsNone(self.strategy.get("user-1"))
+
+        self.strategy.put("user-1", "key-1")
+        self.strategy.put("user-2", "key-2")
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+
+        # 再登録で上書きできる
+        self.strategy.put("user-1", "key-10")
+        self.assertEqual(self.strategy.get("user-1"), "key-10")
+
+        self.assertDictEqual(self.strategy.read(), {"user-1": "key-10", "user-2": "key-2"})
+
+    def test_write(self):
+        self.strategy.put("user-1", "key-1")
+
+        self.strategy.write({"user-2": "key-2", "user-3": "key-3"})
+
+        # data に含まれないユーザーは削除しない
+        self.assertDictEqual(self.strategy.read(), {"user-1": "key-1", "user-2": "key-2", "user-3": "key-3"})
+
+    def test_wal_and_primary_key(self):
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT employee_key FROM employees WHERE user_id = ?", ("u",))
+            self.assertIn("PRIMARY KEY", " ".join(str(row[-1]) for row in plan.fetchall()))
+
+    def test_shared_by_instances(self):
+        # 別のプロセス（インスタンス）が登録したユーザーも参照できる
+        SQLiteDataStrategy(path=self.db_path).put("user-1", "key-1")
+
+        self.assertEqual(self.strategy.get("user-1"), "key-1")
+
+    def test_concurrent_put(self):
+        threads = [threading.Thread(target=self.strategy.put, args=(f"user-{i}", f"key-{i}")) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.strategy.read()), 20)
+
+
+class TestMigrateSQLite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.temp_dir, "employee_data.json")
+        self.db_path = os.path.join(self.temp_dir, "employee_data.db")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_migrate(self):
+        data = {"user-1": "key-1", "user-2": "key-2"}
+        with open(self.json_path, "w") as f:
+            json.dump(data, f)
+
+        self.assertDictEqual(migrate(json_path=self.json_path, db_path=self.db_path), data)
+        self.assertDictEqual(SQLiteDataStrategy(path=self.db_path).read(), data)
+
+    def test_migrate__dry_run(self):
+        with open(self.json_path, "w") as f:
+            json.dump({"user-1": "key-1"}, f)
+
+        self.assertDictEqual(migrate(json_path=self.json_path, db_path=self.db_path, dry_run=True), {"user-1": "key-1"})
+        self.assertFalse(os.path.exists(self.db_path))
+
+    def test_migrate__no_json(self):
+        self.assertDictEqual(migrate(json_path=self.json_path, db_path=self.db_path), {})
@@ -0,0 +1,141 @@
+import importlib.util
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from components.instrumentation import add_kot_call_hook, remove_kot_call_hook
+from components.requester import KOTException
+from components.retry import RetryPolicy
+
+# asyncio 版は aiohttp がインストールされている場合のみテストする
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+if HAS_AIOHTTP:
+    import aiohttp
+
+    from components.async_requester import AsyncKOTRequester, AsyncKOTSessionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # /flaky-path で返すステータスコード。使い切った後は 200 を返す
+    flaky_statuses = []
+
+    def _send(self, resp_json):
+        body = json.dumps(resp_json).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/flaky-path" and self.flaky_statuses:
+            self.send_response(self.flaky_statuses.pop(0))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/stream-path":
+            self._send([{"date": f"2023-04-{day:02d}", "dailyWorkings": []} for day in range(1, 31)])
+        elif self.path == "/error-path":
+            self._send({"errors": [{"message": "message1"}]})
+        else:
+            self._send({"path": self.path, "authorization": self.headers["Authorization"]})
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self._send({"path": self.path, "body": json.loads(self.rfile.read(length))})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp is not installed")
+class TestAsyncKOTRequester(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.server_thread.start()
+        self.session_pool = AsyncKOTSessionPool(pool_size=2, connect_timeout=1, read_timeout=1)
+
+    async def asyncTearDown(self) -> None:
+        await self.session_pool.close()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _create_requester(self):
+        requester = AsyncKOTRequester(session_pool=self.session_pool)
+        requester.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return requester
+
+    async def test_get(self):
+        resp_json = await self._create_requester().get("/test-path")
+
+        self.assertEqual(resp_json["path"], "/test-path")
+        self.assertTrue(resp_json["authorization"].startswith("Bearer "))
+
+    async def test_get__error(self):
+        with self.assertRaises(KOTException, msg="message1"):
+            await self._create_requester().get("/error-path")
+
+    async def test_get_stream(self):
+        items = [item async for item in self._create_requester().get_stream("/stream-path")]
+
+        self.assertEqual(len(items), 30)
+        self.assertDictEqual(items[0], {"date": "2023-04-01", "dailyWorkings": []})
+
+    async def test_get_stream__error(self):
+        with self.assertRaises(KOTException, msg="message1"):
+            [item async for item in self._create_requester().get_stream("/error-path")]
+
+    async def test_post(self):
+        resp_json = await self._create_requester().post("/test-path", json.dumps({"code": 1}))
+
+        self.assertDictEqual(resp_json, {"path": "/test-path", "body": {"code": 1}})
+
+    async def test_session_shared(self):
+        await self._create_requester().get("/path-1")
+        session = await self.session_pool.get_session()
+        await self._create_requester().get("/path-2")
+
+        self.assertIs(await self.session_pool.get_session(), session)
+
+    async def test_get__retry(self):
+        _Handler.flaky_statuses = [503, 429]
+        requester = self._create_requester()
+        requester.retry_policies = {"GET": RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)}
+
+        resp_json = await requester.get("/flaky-path")
+
+        self.assertEqual(resp_json["path"], "/flaky-path")
+        self.assertListEqual(_Handler.flaky_statuses, [])
+
+    async def test_get__give_up(self):
+        _Handler.flaky_statuses = [503, 503]
+        requester = self._create_requester()
+        requester.retry_policies = {"GET": RetryPolicy(max_attempts=2, base_delay=0, max_delay=0)}
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await requester.get("/flaky-path")
+
+    async def test_instrumentation(self):
+        calls = []
+        add_kot_call_hook(calls.append)
+        self.addCleanup(remove_kot_call_hook, calls.append)
+        requester = self._create_requester()
+        requester.base_url = f"http://localhost:{self.server.server_address[1]}"
+
+        await requester.get("/employees/1234")
+        [item async for item in requester.get_stream("/stream-path")]
+
+        get_call, stream_call = calls
+        self.assertEqual((get_call.endpoint, get_call.status, get_call.retries), ("/employees/{code}", 200, 0))
+        self.assertGreater(get_call.bytes, 0)
+        for phase in ("connect", "wait", "transfer", "json_decode"):
+            self.assertGreater(get_call.phases[phase], 0, phase)
+        # TLS のハンドシェイクは connect に含める
+        self.assertNotIn("tls", get_call.phases)
+        self.assertEqual(stream_call.endpoint, "/stream-path")
+        self.assertGreater(stream_call.bytes, 0)
+        self.assertGreater(stream_call.phases["json_decode"], 0)
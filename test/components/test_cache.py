@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime
+
+from freezegun import freeze_time
+
+from components.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get(self):
+        cache = TTLCache(ttl=60)
+
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", {"value": 1})
+
+        self.assertDictEqual(cache.get("key"), {"value": 1})
+        self.assertDictEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_get__expired(self):
+        with freeze_time(datetime(2030, 4, 1, 9, 0, 0)) as frozen_time:
+            cache = TTLCache(ttl=60)
+            cache.set("key", "value")
+
+            frozen_time.tick(59)
+            self.assertEqual(cache.get("key"), "value")
+
+            frozen_time.tick(1)
+            self.assertIsNone(cache.get("key"))
+            self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_set__max_entries(self):
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("key1", 1)
+        cache.set("key2", 2)
+        cache.set("key3", 3)
+
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key2"), 2)
+        self.assertEqual(cache.get("key3"), 3)
+
+    def test_set__max_entries_lru(self):
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("key1", 1)
+        cache.set("key2", 2)
+        # 参照されたエントリは残る
+        cache.get("key1")
+        cache.set("key3", 3)
+
+        self.assertEqual(cache.get("key1"), 1)
+        self.assertIsNone(cache.get("key2"))
+        self.assertEqual(cache.get("key3"), 3)
+
+    def test_invalidate(self):
+        cache = TTLCache(ttl=60)
+        cache.set("key1", 1)
+        cache.set("key2", 2)
+
+        cache.invalidate("key1")
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key2"), 2)
+
+        cache.invalidate()
+        self.assertIsNone(cache.get("key2"))
@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from components.chunked_fetcher import ChunkedFetcher, split_date_range
+
+
+def _entries(from_date, to_date):
+    return [{"date": from_date}, {"date": to_date}]
+
+
+class TestSplitDateRange(unittest.TestCase):
+    def test_split_date_range(self):
+        self.assertListEqual(
+            split_date_range("2023-03-28", "2023-04-10", 7),
+            [("2023-03-28", "2023-04-03"), ("2023-04-04", "2023-04-10")],
+        )
+        self.assertListEqual(split_date_range("2023-04-01", "2023-04-03", 7), [("2023-04-01", "2023-04-03")])
+        self.assertListEqual(split_date_range("2023-04-01", "2023-04-01", 1), [("2023-04-01", "2023-04-01")])
+
+    def test_split_date_range__no_split(self):
+        self.assertListEqual(split_date_range("2023-03-01", "2023-04-30", 0), [("2023-03-01", "2023-04-30")])
+
+
+class TestChunkedFetcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fetcher = ChunkedFetcher(chunk_days=3, max_workers=2)
+
+    def tearDown(self) -> None:
+        self.fetcher.shutdown()
+
+    def test_fetch(self):
+        fetch_workings = MagicMock(side_effect=_entries)
+        fetch_schedules = MagicMock(side_effect=_entries)
+
+        results = self.fetcher.fetch(
+            [(fetch_workings, "2023-04-01", "2023-04-07"), (fetch_schedules, "2023-04-10", "2023-04-11")]
+        )
+
+        self.assertEqual(fetch_workings.call_count, 3)
+        self.assertEqual(fetch_schedules.call_count, 1)
+        # 分割した結果は日付順につなげる
+        self.assertListEqual(
+            [entry["date"] for entry in results[0]],
+            ["2023-04-01", "2023-04-03", "2023-04-04", "2023-04-06", "2023-04-07", "2023-04-07"],
+        )
+        self.assertListEqual([entry["date"] for entry in results[1]], ["2023-04-10", "2023-04-11"])
+
+    def test_fetch__bounded_parallelism(self):
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def fetch(from_date, to_date):
+            with lock:
+                running.append(from_date)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(from_date)
+            return _entries(from_date, to_date)
+
+        self.fetcher.fetch([(fetch, "2023-04-01", "2023-04-30")])
+
+        self.assertEqual(max(max_running), 2)
+
+    def test_fetch__error(self):
+        fetch = MagicMock(side_effect=[_entries("2023-04-01", "2023-04-03"), Exception("error")])
+
+        with self.assertRaises(Exception):
+            self.fetcher.fetch([(fetch, "2023-04-01", "2023-04-06")])
+
+
+class TestChunkedFetcherAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_fetch_async(self):
+        fetcher = ChunkedFetcher(chunk_days=3, max_workers=2)
+        fetch = AsyncMock(side_effect=_entries)
+
+        results = await fetcher.fetch_async([(fetch, "2023-04-01", "2023-04-05")])
+
+        self.assertEqual(fetch.await_count, 2)
+        self.assertListEqual(
+            [entry["date"] for entry in results[0]], ["2023-04-01", "2023-04-03", "2023-04-04", "2023-04-05"]
+        )
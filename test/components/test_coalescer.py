@@ -0,0 +1,62 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from components.coalescer import Coalescer
+
+
+class TestCoalescer(unittest.TestCase):
+    def test_submit__window(self):
+        submit_batch = MagicMock(side_effect=lambda items: [item * 10 for item in items])
+        coalescer = Coalescer(window=0.05, max_batch_size=10, submit_batch=submit_batch)
+
+        futures = [coalescer.submit(i) for i in range(3)]
+
+        self.assertListEqual([future.result(timeout=1) for future in futures], [0, 10, 20])
+        submit_batch.assert_called_once_with([0, 1, 2])
+        self.assertDictEqual(coalescer.stats(), {"batches": 1, "items": 3, "pending": 0})
+
+    def test_submit__max_batch_size(self):
+        submit_batch = MagicMock(side_effect=lambda items: items)
+        coalescer = Coalescer(window=10, max_batch_size=2, submit_batch=submit_batch)
+
+        futures = [coalescer.submit(i) for i in range(2)]
+
+        # window を待たずに登録される
+        self.assertListEqual([future.result(timeout=1) for future in futures], [0, 1])
+        submit_batch.assert_called_once_with([0, 1])
+
+    def test_submit__each_result(self):
+        error = Exception("error")
+        coalescer = Coalescer(window=0.01, max_batch_size=10, submit_batch=lambda items: ["ok", error])
+
+        future_ok = coalescer.submit("a")
+        future_error = coalescer.submit("b")
+
+        self.assertEqual(future_ok.result(timeout=1), "ok")
+        self.assertIs(future_error.exception(timeout=1), error)
+
+    def test_submit__batch_error(self):
+        coalescer = Coalescer(window=0.01, max_batch_size=10, submit_batch=MagicMock(side_effect=ValueError))
+
+        futures = [coalescer.submit(i) for i in range(2)]
+
+        for future in futures:
+            self.assertIsInstance(future.exception(timeout=1), ValueError)
+
+    def test_submit__concurrent(self):
+        submit_batch = MagicMock(side_effect=lambda items: items)
+        coalescer = Coalescer(window=0.05, max_batch_size=100, submit_batch=submit_batch)
+        results = {}
+
+        def _submit(i):
+            results[i] = coalescer.submit(i).result(timeout=1)
+
+        threads = [threading.Thread(target=_submit, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertDictEqual(results, {i: i for i in range(20)})
+        self.assertEqual(sum(len(call.args[0]) for call in submit_batch.call_args_list), 20)
@@ -0,0 +1,74 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from freezegun import freeze_time
+
+from components.daily_record_store import DailyRecordStore
+
+
+def _entries(*dates):
+    return [{"date": d, "dailyWorkings": [{"employeeKey": "key-0009"}]} for d in dates]
+
+
+class TestDailyRecordStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = DailyRecordStore(recent_days=2, revalidate_after=3600)
+        self.today = date(2023, 4, 10)
+
+    def test_plan__empty(self):
+        self.assertListEqual(self.store.plan("2023-04-01", "2023-04-09", self.today), [("2023-04-01", "2023-04-09")])
+
+    def test_plan__only_missing_and_recent(self):
+        with freeze_time("2023-04-10 10:00:00"):
+            self.store.merge("2023-04-03", "2023-04-09", _entries("2023-04-03", "2023-04-05"))
+
+            # 取得していない 4/1～4/2 と、直近 2 日以内の 4/8～4/9 だけを取得する
+            self.assertListEqual(
+                self.store.plan("2023-04-01", "2023-04-09", self.today),
+                [("2023-04-01", "2023-04-02"), ("2023-04-08", "2023-04-09")],
+            )
+
+    def test_plan__revalidate(self):
+        with freeze_time("2023-04-10 10:00:00") as frozen_time:
+            self.store.merge("2023-04-01", "2023-04-05", [])
+            frozen_time.tick(1800)
+            self.store.merge("2023-04-06", "2023-04-07", [])
+            frozen_time.tick(1800)
+
+            # 取得から revalidate_after 秒以上経った日は取得し直す
+            self.assertListEqual(
+                self.store.plan("2023-04-01", "2023-04-07", self.today), [("2023-04-01", "2023-04-05")]
+            )
+
+    def test_get_range(self):
+        fetch = MagicMock(side_effect=lambda from_date, to_date: _entries(from_date, to_date))
+
+        with freeze_time("2023-04-10 10:00:00"):
+            first = self.store.get_range("2023-04-01", "2023-04-09", fetch)
+            second = self.store.get_range("2023-04-01", "2023-04-09", fetch)
+
+        self.assertListEqual([entry["date"] for entry in first], ["2023-04-01", "2023-04-09"])
+        self.assertListEqual([entry["date"] for entry in second], ["2023-04-01", "2023-04-08", "2023-04-09"])
+        self.assertEqual(fetch.call_count, 2)
+        fetch.assert_called_with("2023-04-08", "2023-04-09")
+
+        # 保持しているデータのうち範囲内のものだけを返す
+        self.assertListEqual([entry["date"] for entry in self.store.select("2023-04-02", "2023-04-08")], ["2023-04-08"])
+
+    def test_get_range__fetch_error(self):
+        fetch = MagicMock(side_effect=Exception)
+
+        with self.assertRaises(Exception):
+            self.store.get_range("2023-04-01", "2023-04-09", fetch)
+
+        # 失敗した範囲は保持されないので次回も取得する
+        self.assertEqual(self.store.stats()["dates"], 0)
+
+    def test_prune(self):
+        self.store.merge("2023-03-30", "2023-04-02", _entries("2023-03-30", "2023-04-02"))
+
+        self.store.prune("2023-04-01")
+
+        self.assertEqual(self.store.stats()["dates"], 2)
+        self.assertListEqual([entry["date"] for entry in self.store.select("2023-03-01", "2023-04-30")], ["2023-04-02"])
@@ -0,0 +1,63 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from components.deferred import DeferredJobExecutor
+
+
+class TestDeferredJobExecutor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.executor = DeferredJobExecutor(max_workers=1, max_queue_size=2)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+
+    def test_submit(self):
+        job = MagicMock()
+
+        self.assertTrue(self.executor.submit(job, "arg", key="value"))
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+
+        job.assert_called_once_with("arg", key="value")
+        self.assertDictEqual(self.executor.stats(), {"pending": 0, "submitted": 1, "rejected": 0, "failed": 0})
+
+    def test_submit__queue_full(self):
+        release = threading.Event()
+        job = MagicMock(side_effect=lambda: release.wait(timeout=1))
+
+        self.assertTrue(self.executor.submit(job))
+        self.assertTrue(self.executor.submit(job))
+        # 実行中 1 + 待ち 1 で上限に達しているので捨てられる
+        self.assertFalse(self.executor.submit(job))
+
+        release.set()
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+
+        self.assertEqual(job.call_count, 2)
+        self.assertEqual(self.executor.stats()["rejected"], 1)
+
+    def test_submit__executor_error(self):
+        job = MagicMock()
+        self.executor.submit(job)
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+        # shutdown した ThreadPoolExecutor に登録すると RuntimeError になる
+        self.executor._get_executor().shutdown()
+
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(job)
+
+        # 登録できなかったジョブは実行待ちに残らない
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+        self.assertDictEqual(self.executor.stats(), {"pending": 0, "submitted": 1, "rejected": 0, "failed": 0})
+
+    def test_submit__job_error(self):
+        job = MagicMock(side_effect=Exception)
+
+        self.assertTrue(self.executor.submit(job))
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+
+        # 失敗しても次のジョブは実行できる
+        self.assertTrue(self.executor.submit(job))
+        self.assertTrue(self.executor.wait_until_idle(timeout=1))
+
+        self.assertEqual(self.executor.stats()["failed"], 2)
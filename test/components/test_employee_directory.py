@@ -0,0 +1,91 @@
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from freezegun import freeze_time
+
+from components.employee_directory import EmployeeDirectory
+
+EMPLOYEES = [
+    {"key": "key-0009", "code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+    {"key": "key-0010", "code": "0010", "lastName": "熊本", "firstName": "太郎"},
+]
+
+
+class TestEmployeeDirectory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fetch_all = MagicMock(return_value=EMPLOYEES)
+        self.fetch_one = MagicMock(
+            return_value={"key": "key-0011", "code": "0011", "lastName": "大阪", "firstName": "花子"}
+        )
+        self.directory = EmployeeDirectory(fetch_all=self.fetch_all, fetch_one=self.fetch_one, refresh_interval=60)
+
+    def tearDown(self) -> None:
+        self.directory.stop()
+
+    def test_active_employees(self):
+        with freeze_time(datetime(2030, 4, 1, 9, 0, 0)) as frozen_time:
+            self.assertListEqual(self.directory.active_employees(), EMPLOYEES)
+            self.assertListEqual(self.directory.active_employees(), EMPLOYEES)
+            self.assertEqual(self.fetch_all.call_count, 1)
+
+            frozen_time.tick(60)
+            self.directory.active_employees()
+            self.assertEqual(self.fetch_all.call_count, 2)
+
+    def test_get_by_code(self):
+        self.directory.refresh()
+
+        self.assertEqual(self.directory.get_by_code("0010")["key"], "key-0010")
+        self.assertEqual(self.fetch_one.call_count, 0)
+
+        # 一覧にない場合は KOT から取得して索引に追加する
+        self.assertEqual(self.directory.get_by_code("0011")["key"], "key-0011")
+        self.assertEqual(self.directory.get_by_code("0011")["key"], "key-0011")
+        self.fetch_one.assert_called_once_with("0011")
+
+        self.assertEqual(self.directory.get_by_key("key-0011")["code"], "0011")
+        self.assertIsNone(self.directory.get_by_key("key-9999"))
+        # 個別に取得した人は在籍者の一覧には追加しない
+        self.assertListEqual(self.directory.active_employees(), EMPLOYEES)
+        self.assertDictEqual(self.directory.stats(), {"employees": 2, "refreshes": 1, "hits": 2, "misses": 1})
+
+    def test_get_by_code__not_loaded(self):
+        # 一覧を取得していなくても、一覧全体は取得せずに1人分だけ取得する
+        self.assertEqual(self.directory.get_by_code("0011")["key"], "key-0011")
+        self.assertEqual(self.fetch_all.call_count, 0)
+
+    def test_refresh_if_stale__concurrent(self):
+        release = threading.Event()
+        self.fetch_all.side_effect = lambda: release.wait(timeout=1) and EMPLOYEES
+        threads = [threading.Thread(target=self.directory.active_employees) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        # 同時に古くなった一覧を参照しても取得し直すのは1回だけ
+        self.assertEqual(self.fetch_all.call_count, 1)
+
+    def test_start(self):
+        refreshed = threading.Event()
+        self.fetch_all.side_effect = lambda: refreshed.set() or EMPLOYEES
+
+        self.directory.start(can_refresh=lambda: True)
+
+        self.assertTrue(refreshed.wait(timeout=1))
+        self.directory.stop()
+        self.assertEqual(self.directory.get_by_code("0009")["key"], "key-0009")
+
+    def test_start__can_not_refresh(self):
+        can_refresh = MagicMock(return_value=False)
+        called = threading.Event()
+        can_refresh.side_effect = lambda: called.set() or False
+
+        self.directory.start(can_refresh=can_refresh)
+
+        self.assertTrue(called.wait(timeout=1))
+        self.directory.stop()
+        self.assertEqual(self.fetch_all.call_count, 0)
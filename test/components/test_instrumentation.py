@@ -0,0 +1,106 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from components.instrumentation import (
+    add_kot_call_hook,
+    endpoint_template,
+    kot_call,
+    remove_kot_call_hook,
+    timed_usecase,
+)
+from components.metrics import MetricsRegistry
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+        patcher = mock.patch("components.instrumentation.get_metrics_registry", return_value=self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_endpoint_template(self):
+        self.assertEqual(endpoint_template("/daily-workings?&start=2030-04-01"), "/daily-workings")
+        self.assertEqual(
+            endpoint_template("/daily-workings/timerecord/abc"), "/daily-workings/timerecord/{employeeKey}"
+        )
+        self.assertEqual(endpoint_template("/daily-workings/timerecord"), "/daily-workings/timerecord")
+        self.assertEqual(endpoint_template("/employees/1234"), "/employees/{code}")
+        self.assertEqual(endpoint_template("/employees"), "/employees")
+
+    def test_kot_call(self):
+        with self.assertLogs(level="INFO") as logs:
+            with kot_call("POST", "/daily-workings/timerecord/abc") as call:
+                call.attempts = 2
+                call.status = 201
+                call.bytes = 10
+                call.add_phase("wait", 0.2)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "kot_call")
+        self.assertEqual(record["endpoint"], "/daily-workings/timerecord/{employeeKey}")
+        self.assertEqual((record["status"], record["retries"], record["wait_ms"]), (201, 1, 200.0))
+        # 計測していない内訳は出さない
+        self.assertNotIn("connect_ms", record)
+        self.assertDictEqual({"event": "kot_call", **logs.records[0].kot_call}, record)
+
+        labels = {"method": "POST", "endpoint": "/daily-workings/timerecord/{employeeKey}"}
+        self.assertEqual(self.registry.get("kot_requests_total").value(status="201", **labels), 1)
+        self.assertEqual(self.registry.get("kot_retries_total").value(**labels), 1)
+        self.assertEqual(self.registry.get("kot_response_bytes_total").value(**labels), 10)
+        [(phase_labels, _)] = self.registry.get("kot_request_phase_seconds").samples()
+        self.assertEqual(phase_labels["phase"], "wait")
+
+    def test_kot_call__error(self):
+        with self.assertLogs(level="INFO") as logs, self.assertRaises(ConnectionError):
+            with kot_call("GET", "/employees"):
+                raise ConnectionError()
+
+        self.assertEqual(json.loads(logs.records[0].getMessage())["error"], "ConnectionError")
+        self.assertEqual(
+            self.registry.get("kot_requests_total").value(method="GET", endpoint="/employees", status="error"), 1
+        )
+
+    def test_kot_call__hook_failed(self):
+        def failing_hook(call):
+            raise ValueError()
+
+        add_kot_call_hook(failing_hook)
+        self.addCleanup(remove_kot_call_hook, failing_hook)
+
+        # hook が失敗しても呼び出し側には影響しない
+        with self.assertLogs(level="ERROR"):
+            with kot_call("GET", "/employees"):
+                pass
+
+    def test_timed_usecase(self):
+        @timed_usecase("record_time")
+        def record_time(fail):
+            if fail:
+                raise ValueError()
+            return "ok"
+
+        with self.assertLogs(level="INFO") as logs:
+            self.assertEqual(record_time(False), "ok")
+            with self.assertRaises(ValueError):
+                record_time(True)
+
+        outcomes = [json.loads(record.getMessage())["outcome"] for record in logs.records]
+        self.assertListEqual(outcomes, ["success", "error"])
+        samples = {
+            labels["outcome"]: sample["count"]
+            for labels, sample in self.registry.get("usecase_duration_seconds").samples()
+        }
+        self.assertDictEqual(samples, {"success": 1, "error": 1})
+
+    def test_timed_usecase__async(self):
+        @timed_usecase("record_time")
+        async def record_time():
+            return "ok"
+
+        with self.assertLogs(level="INFO"):
+            self.assertEqual(asyncio.run(record_time()), "ok")
+
+        [(labels, sample)] = self.registry.get("usecase_duration_seconds").samples()
+        self.assertDictEqual(labels, {"usecase": "record_time", "outcome": "success"})
@@ -0,0 +1,85 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+from components.json_stream import JSONArrayParser, NotJSONArrayError, iter_json_array
+
+DOCUMENT = [
+    {"date": "2023-04-01", "dailyWorkings": [{"employeeKey": "key-0009", "isError": True}]},
+    {"date": "2023-04-02", "dailyWorkings": [], "currentDateEmployee": {"lastName": "山田", "firstName": "伝蔵"}},
+    12345,
+    "文字列, ]",
+    None,
+    {"escaped": 'a\\"]}{[\\', "nested": [[], {"": [1.5e-3, True, False]}]},
+    "\\",
+]
+
+
+def _split(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJSONArrayParser(unittest.TestCase):
+    def test_iter_json_array(self):
+        data = json.dumps(DOCUMENT, ensure_ascii=False, indent=2).encode()
+
+        # どこで区切られても（マルチバイト文字・数値の途中を含む）同じ結果になる
+        for size in (1, 2, 3, 7, 64, len(data)):
+            with self.subTest(size=size):
+                self.assertListEqual(list(iter_json_array(_split(data, size))), DOCUMENT)
+
+    def test_feed(self):
+        parser = JSONArrayParser()
+
+        self.assertListEqual(parser.feed(b'[{"date": "2023-04-01"}, {"date": '), [{"date": "2023-04-01"}])
+        # 要素が閉じた時点で取り出せる
+        self.assertListEqual(parser.feed(b'"2023-04-02"}'), [{"date": "2023-04-02"}])
+        self.assertListEqual(parser.feed(b" ]"), [])
+        self.assertListEqual(parser.close(), [])
+
+    def test_empty_array(self):
+        self.assertListEqual(list(iter_json_array([b" [ ", b"] \n"])), [])
+
+    def test_not_array(self):
+        with self.assertRaises(NotJSONArrayError) as cm:
+            list(iter_json_array([b'{"errors": [{"mess', b'age": "message1"}]}']))
+
+        self.assertDictEqual(cm.exception.document, {"errors": [{"message": "message1"}]})
+
+    def test_invalid(self):
+        for data in (b"[1, 2", b"[1 2]", b"[1, 2] 3", b'[{"date": }]'):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    list(iter_json_array([data]))
+
+    def test_decode_once_per_item(self):
+        day = {
+            "date": "2023-04-01",
+            "dailyWorkings": [{"employeeKey": f"key-{i}", "isError": False} for i in range(2000)],
+        }
+        data = json.dumps([day] * 3).encode()
+
+        with mock.patch.object(
+            json.JSONDecoder, "raw_decode", autospec=True, side_effect=json.JSONDecoder.raw_decode
+        ) as mocked_raw_decode:
+            self.assertListEqual(list(iter_json_array(_split(data, 100))), [day] * 3)
+
+        # 要素が途中で区切られていても、要素ごとに1回だけデコードする
+        self.assertEqual(mocked_raw_decode.call_count, 3)
+
+    def test_large_item_is_linear(self):
+        day = {
+            "date": "2023-04-01",
+            "dailyWorkings": [{"employeeKey": f"key-{i}", "isError": False} for i in range(40000)],
+        }
+        data = json.dumps([day]).encode()
+
+        def _measure(size):
+            started_at = time.perf_counter()
+            list(iter_json_array(_split(data, size)))
+            return time.perf_counter() - started_at
+
+        # 1つの要素が多数のチャンクに分かれても、まとめて受け取った場合と同程度の時間で読める
+        # （要素が終わるまでチャンクごとにデコードし直すと、チャンク数に比例して遅くなる）
+        self.assertLess(_measure(1024), _measure(len(data)) * 5 + 0.05)
@@ -0,0 +1,89 @@
+import unittest
+
+from components.metrics import MetricsRegistry, render_prometheus
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter("requests_total", "help", ("method",))
+        counter.inc(method="GET")
+        counter.inc(2, method="GET")
+        counter.inc(method="POST")
+
+        # 同じ名前のメトリクスは作成済みのものを返す
+        self.assertIs(self.registry.counter("requests_total", "help", ("method",)), counter)
+        self.assertEqual(counter.value(method="GET"), 3)
+        self.assertListEqual(counter.samples(), [({"method": "GET"}, 3), ({"method": "POST"}, 1)])
+
+    def test_counter__labels(self):
+        counter = self.registry.counter("requests_total", "help", ("method",))
+
+        with self.assertRaises(ValueError):
+            counter.inc(status="200")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("requests_total", "help", ("method",))
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("duration_seconds", "help", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        [(labels, sample)] = histogram.samples()
+        self.assertDictEqual(labels, {})
+        self.assertListEqual(sample["buckets"], [(0.1, 2), (1, 3), (float("inf"), 4)])
+        self.assertAlmostEqual(sample["sum"], 3.65)
+        self.assertEqual(sample["count"], 4)
+
+    def test_clear(self):
+        counter = self.registry.counter("requests_total", "help")
+        counter.inc()
+
+        self.registry.clear()
+
+        self.assertListEqual(counter.samples(), [])
+        self.assertListEqual(self.registry.collect(), [counter])
+
+
+class TestRenderPrometheus(unittest.TestCase):
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.counter("kot_requests_total", "KOT API の呼び出し数", ("endpoint",)).inc(endpoint='/a"b')
+        histogram = registry.histogram("duration_seconds", "所要時間", ("usecase",), buckets=(0.1, 1))
+        histogram.observe(0.5, usecase="record_time")
+        registry.callback("queue_depth", "キューの長さ", lambda: [({}, 3)])
+
+        self.assertEqual(
+            render_prometheus(registry),
+            "\n".join(
+                [
+                    "# HELP kot_requests_total KOT API の呼び出し数",
+                    "# TYPE kot_requests_total counter",
+                    'kot_requests_total{endpoint="/a\\"b"} 1',
+                    "# HELP duration_seconds 所要時間",
+                    "# TYPE duration_seconds histogram",
+                    'duration_seconds_bucket{usecase="record_time",le="0.1"} 0',
+                    'duration_seconds_bucket{usecase="record_time",le="1"} 1',
+                    'duration_seconds_bucket{usecase="record_time",le="+Inf"} 1',
+                    'duration_seconds_sum{usecase="record_time"} 0.5',
+                    'duration_seconds_count{usecase="record_time"} 1',
+                    "# HELP queue_depth キューの長さ",
+                    "# TYPE queue_depth gauge",
+                    "queue_depth 3",
+                ]
+            )
+            + "\n",
+        )
+
+    def test_render__callback_failed(self):
+        registry = MetricsRegistry()
+        registry.callback("broken", "help", lambda: 1 / 0)
+        registry.callback("queue_depth", "help", lambda: [({}, 3)], type="counter")
+
+        # 取得に失敗したメトリクスだけを除く
+        with self.assertLogs(level="ERROR"):
+            self.assertIn("queue_depth 3", render_prometheus(registry))
@@ -0,0 +1,34 @@
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from components.metrics import MetricsRegistry
+from components.metrics_server import CONTENT_TYPE, MetricsServer
+
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+        self.server = MetricsServer(host="127.0.0.1", port=0, registry=self.registry)
+        self.server.start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_metrics(self):
+        self.registry.counter("kot_requests_total", "KOT API の呼び出し数").inc()
+
+        with urlopen(f"{self.server.url}/metrics") as resp:
+            self.assertEqual(resp.headers["Content-Type"], CONTENT_TYPE)
+            body = resp.read().decode("utf-8")
+
+        self.assertIn("# TYPE kot_requests_total counter\nkot_requests_total 1\n", body)
+
+    def test_healthz(self):
+        with urlopen(f"{self.server.url}/healthz") as resp:
+            self.assertEqual(resp.status, 200)
+
+    def test_not_found(self):
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(f"{self.server.url}/")
+        self.assertEqual(cm.exception.code, 404)
@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from os import path
+
+from components.punch_queue import PunchQueue
+from components.usecase import RecordType
+
+
+class TestPunchQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = PunchQueue(path.join(self.temp_dir, "punch_queue.db"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def _enqueue(self, user_id, record_type, recorded_at):
+        return self.queue.enqueue(
+            user_id=user_id,
+            channel_id="dummy-channel-id",
+            employee_key=f"key-{user_id}",
+            record_type=record_type,
+            recorded_at=recorded_at,
+        )
+
+    def test_enqueue(self):
+        self._enqueue("user-2", RecordType.CLOCK_OUT, datetime(2030, 4, 1, 9, 10))
+        self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+
+        # 別のインスタンスから読み込んでも残っている
+        punches = PunchQueue(self.queue.path).get_ready(now=datetime(2030, 4, 1, 10, 0))
+
+        self.assertEqual(len(punches), 2)
+        # 打刻時刻順
+        self.assertEqual(punches[0].user_id, "user-1")
+        self.assertEqual(punches[0].employee_key, "key-user-1")
+        self.assertEqual(punches[0].record_type, RecordType.CLOCK_IN)
+        self.assertEqual(punches[0].recorded_at, datetime(2030, 4, 1, 9, 5))
+        self.assertEqual(punches[1].user_id, "user-2")
+        self.assertEqual(self.queue.count_pending(), 2)
+
+    def test_mark_done(self):
+        punch_id = self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+
+        self.queue.mark_done(punch_id)
+
+        self.assertListEqual(self.queue.get_ready(now=datetime(2030, 4, 1, 10, 0)), [])
+        self.assertEqual(self.queue.count_pending(), 0)
+
+    def test_mark_retry(self):
+        punch_id = self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+
+        self.queue.mark_retry(punch_id, "error", next_attempt_at=datetime(2030, 4, 1, 10, 1))
+
+        self.assertListEqual(self.queue.get_ready(now=datetime(2030, 4, 1, 10, 0)), [])
+        punches = self.queue.get_ready(now=datetime(2030, 4, 1, 10, 1))
+        self.assertEqual(len(punches), 1)
+        self.assertEqual(punches[0].attempts, 1)
+
+    def test_mark_failed(self):
+        punch_id = self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+
+        self.queue.mark_failed(punch_id, "error")
+
+        self.assertListEqual(self.queue.get_ready(now=datetime(2030, 4, 1, 10, 0)), [])
+        self.assertEqual(self.queue.count_pending(), 0)
+
+    def test_claim(self):
+        punch_id = self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+        other = PunchQueue(self.queue.path)
+
+        # 先に確保した方だけが登録できる
+        self.assertTrue(self.queue.claim(punch_id, now=datetime(2030, 4, 1, 10, 0)))
+        self.assertFalse(other.claim(punch_id, now=datetime(2030, 4, 1, 10, 0)))
+        self.assertListEqual(other.get_ready(now=datetime(2030, 4, 1, 10, 0)), [])
+
+        # 再試行する場合は再び確保できる
+        self.queue.mark_retry(punch_id, "error", next_attempt_at=datetime(2030, 4, 1, 10, 1))
+        self.assertTrue(other.claim(punch_id, now=datetime(2030, 4, 1, 10, 1)))
+
+    def test_release_stale_claims(self):
+        stale_id = self._enqueue("user-1", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 5))
+        fresh_id = self._enqueue("user-2", RecordType.CLOCK_IN, datetime(2030, 4, 1, 9, 6))
+        self.queue.claim(stale_id, now=datetime(2030, 4, 1, 10, 0))
+        self.queue.claim(fresh_id, now=datetime(2030, 4, 1, 10, 20))
+
+        released = self.queue.release_stale_claims(claimed_before=datetime(2030, 4, 1, 10, 10), error="interrupted")
+
+        self.assertListEqual([punch.id for punch in released], [stale_id])
+        # 登録し直さず、他のプロセスからも二重に通知しない
+        self.assertFalse(self.queue.claim(stale_id, now=datetime(2030, 4, 1, 10, 30)))
+        self.assertListEqual(
+            PunchQueue(self.queue.path).release_stale_claims(claimed_before=datetime(2030, 4, 1, 10, 10), error=""), []
+        )
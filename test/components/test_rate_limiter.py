@@ -0,0 +1,124 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from components.rate_limiter import Priority, RateLimiter, RateLimitTimeout
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_disabled(self):
+        limiter = RateLimiter(rate=0, burst=1)
+
+        for _ in range(100):
+            limiter.acquire()
+
+        self.assertEqual(limiter.stats()["acquired"], 0)
+
+    def test_burst(self):
+        limiter = RateLimiter(rate=50, burst=2)
+
+        started_at = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+
+        # 2件までは待たずに送り、3件目はトークンが貯まるまで（1/50秒）待つ
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.015)
+        stats = limiter.stats()
+        self.assertEqual(stats["acquired"], 3)
+        self.assertEqual(stats["throttled"], 1)
+
+    def test_timeout(self):
+        limiter = RateLimiter(rate=0.001, burst=1)
+        limiter.acquire()
+
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(timeout=0.01)
+        self.assertEqual(limiter.stats()["timeouts"], 1)
+
+    def test_reserved_for_high_priority(self):
+        limiter = RateLimiter(rate=0.001, burst=3, reserved=2)
+
+        limiter.acquire(Priority.LOW)
+        # 残りの2個は打刻のために取っておく
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(Priority.LOW, timeout=0.01)
+        limiter.acquire(Priority.HIGH, timeout=0.01)
+        limiter.acquire(Priority.HIGH, timeout=0.01)
+
+    def test_high_priority_first(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        limiter.acquire()
+        order = []
+
+        def acquire(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        # 先に待ち始めた LOW より、後から来た HIGH を先に送る
+        low = threading.Thread(target=acquire, args=(Priority.LOW,))
+        low.start()
+        time.sleep(0.01)
+        high = threading.Thread(target=acquire, args=(Priority.HIGH,))
+        high.start()
+        low.join()
+        high.join()
+
+        self.assertListEqual(order, [Priority.HIGH, Priority.LOW])
+
+    def test_shared_by_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rate_limit.json")
+            limiter1 = RateLimiter(rate=0.001, burst=2, path=path)
+            limiter2 = RateLimiter(rate=0.001, burst=2, path=path)
+
+            limiter1.acquire(timeout=0.01)
+            limiter2.acquire(timeout=0.01)
+
+            # 別のプロセス（インスタンス）が使ったトークンも数える
+            with self.assertRaises(RateLimitTimeout):
+                limiter1.acquire(timeout=0.01)
+
+
+class TestRateLimiterAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_async(self):
+        limiter = RateLimiter(rate=50, burst=1)
+
+        await limiter.acquire_async()
+        await limiter.acquire_async()
+
+        self.assertDictEqual(
+            {key: value for key, value in limiter.stats().items() if key != "wait_seconds"},
+            {"acquired": 2, "throttled": 1, "timeouts": 0},
+        )
+
+    async def test_timeout(self):
+        limiter = RateLimiter(rate=0.001, burst=1)
+        await limiter.acquire_async()
+
+        with self.assertRaises(RateLimitTimeout):
+            await limiter.acquire_async(timeout=0.01)
+
+    async def test_acquire_async__file_locked(self):
+        import fcntl
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rate_limit.json")
+            limiter = RateLimiter(rate=50, burst=1, path=path)
+
+            with open(path, "a+") as f:
+                # 他のプロセスが 0.2 秒ロックを取っている
+                fcntl.flock(f, fcntl.LOCK_EX)
+                threading.Timer(0.2, fcntl.flock, args=(f, fcntl.LOCK_UN)).start()
+
+                acquiring = asyncio.create_task(limiter.acquire_async())
+                ticks = 0
+                while not acquiring.done():
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            # ロックを待っている間もイベントループは止まらない
+            self.assertGreater(ticks, 5)
+            self.assertEqual(limiter.stats()["acquired"], 1)
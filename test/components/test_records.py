@@ -0,0 +1,77 @@
+import unittest
+
+from components.records import compact_daily_schedules, compact_daily_workings
+
+EMPLOYEE = {"code": "0009", "lastName": "山田", "firstName": "伝蔵"}
+
+
+class TestRecords(unittest.TestCase):
+    def test_compact_daily_workings(self):
+        daily_data = {
+            "date": "2023-04-01",
+            "dailyWorkings": [
+                {
+                    "employeeKey": "key-0009",
+                    "isError": True,
+                    "currentDateEmployee": {**EMPLOYEE, "divisionName": "開発部"},
+                    "workPlaceDivisionName": "本社",
+                },
+                {"employeeKey": "key-0010", "isError": False},
+            ],
+        }
+
+        record = compact_daily_workings(daily_data)
+
+        self.assertEqual(record.date_ordinal, 738611)
+        self.assertEqual(record["date"], "2023-04-01")
+        working = record["dailyWorkings"][0]
+        self.assertTrue(working["isError"])
+        self.assertEqual(working["employeeKey"], "key-0009")
+        # 使わない項目は捨てる
+        self.assertDictEqual(dict(working["currentDateEmployee"]), EMPLOYEE)
+        self.assertNotIn("workPlaceDivisionName", working)
+
+        # レスポンスに含まれていない項目はキーが存在しない扱いになる
+        working = record["dailyWorkings"][1]
+        self.assertDictEqual(dict(working), {"employeeKey": "key-0010", "isError": False})
+        self.assertDictEqual(working.get("currentDateEmployee", {}), {})
+        with self.assertRaises(KeyError):
+            working["currentDateEmployee"]
+
+    def test_compact_daily_schedules(self):
+        daily_schedule = {
+            "date": "2023-04-01",
+            "dailySchedules": [
+                {"employeeKey": "key-0009", "scheduleTypeName": "通常勤務", "currentDateEmployee": EMPLOYEE},
+            ],
+        }
+
+        record = compact_daily_schedules(daily_schedule)
+
+        self.assertEqual(record["date"], "2023-04-01")
+        self.assertEqual(record["dailySchedules"][0], daily_schedule["dailySchedules"][0])
+        self.assertEqual(len(record), 2)
+
+        # 変換済みのデータはそのまま返す
+        self.assertIs(compact_daily_schedules(record), record)
+        workings = compact_daily_workings({"date": "2023-04-01", "dailyWorkings": []})
+        self.assertIs(compact_daily_workings(workings), workings)
+
+    def test_employee_shared(self):
+        working = compact_daily_workings(
+            {
+                "date": "2023-04-01",
+                "dailyWorkings": [{"employeeKey": "key-0009", "currentDateEmployee": dict(EMPLOYEE)}],
+            }
+        )
+        schedule = compact_daily_schedules(
+            {
+                "date": "2023-04-02",
+                "dailySchedules": [{"employeeKey": "key-0009", "currentDateEmployee": dict(EMPLOYEE)}],
+            }
+        )
+
+        # 同じ内容の従業員は同じオブジェクトを使う
+        self.assertIs(
+            working["dailyWorkings"][0]["currentDateEmployee"], schedule["dailySchedules"][0]["currentDateEmployee"]
+        )
@@ -9,6 +9,7 @@ from unittest import mock
 from unittest.mock import patch
 
 from components.repo import Employee
+from components.strategy.data_strategy import ConcurrentUpdateError, DataStrategy
 from components.strategy.local_file_data_strategy import LocalFileDataStrategy
 
 
@@ -16,11 +17,22 @@ def _random_string(n):
     return "".join(random.choices(string.ascii_letters + string.digits, k=n))
 
 
+class _PointLookupDataStrategy(DataStrategy):
+    SUPPORTS_POINT_LOOKUP = True
+
+    def __init__(self):
+        self.data = {}
+        self.get = mock.MagicMock(side_effect=lambda user_id: self.data.get(user_id))
+        self.put = mock.MagicMock(side_effect=lambda user_id, key: self.data.update({user_id: key}))
+        self.read = mock.MagicMock()
+
+
 @patch("components.strategy.data_strategy.create_data_strategy", return_value=LocalFileDataStrategy())
 class TestEmployee(unittest.TestCase):
     def setUp(self) -> None:
         self.temp_dir = tempfile.mkdtemp()
         self.temp_json = path.join(path.join(self.temp_dir, "employee_data.json"))
+        Employee.clear_cache()
 
     def tearDown(self) -> None:
         shutil.rmtree(self.temp_dir)
@@ -60,3 +72,108 @@ class TestEmployee(unittest.TestCase):
             self.assertDictEqual(LocalFileDataStrategy().read(), {user_id_1: user_key_1})
 
             self.assertEqual(Employee.get_key(user_id_1), user_key_1)
+
+    def test_get_key__cached(self, _):
+        user_id_1 = _random_string(n=10)
+        user_key_1 = _random_string(n=20)
+
+        with open(self.temp_json, "w") as f:
+            f.write(json.dumps({user_id_1: user_key_1}))
+
+        with mock.patch.multiple(
+            "components.strategy.local_file_data_strategy.LocalFileDataStrategy",
+            DATA_DIR=self.temp_dir,
+            DATA_JSON=self.temp_json,
+        ), mock.patch.object(
+            LocalFileDataStrategy, "read", autospec=True, side_effect=LocalFileDataStrategy.read
+        ) as mocked_read:
+            self.assertEqual(Employee.get_key(user_id_1), user_key_1)
+            self.assertEqual(Employee.get_key(user_id_1), user_key_1)
+            self.assertIsNone(Employee.get_key("none_key"))
+
+            # ファイルが変更されていなければ読み込まない
+            self.assertEqual(mocked_read.call_count, 1)
+            self.assertDictEqual(Employee.cache_stats(), {"hits": 2, "misses": 1})
+
+    def test_get_key__reload_when_file_changed(self, _):
+        user_id_1 = _random_string(n=10)
+        user_key_1 = _random_string(n=20)
+        user_key_2 = _random_string(n=30)
+
+        with open(self.temp_json, "w") as f:
+            f.write(json.dumps({user_id_1: user_key_1}))
+
+        with mock.patch.multiple(
+            "components.strategy.local_file_data_strategy.LocalFileDataStrategy",
+            DATA_DIR=self.temp_dir,
+            DATA_JSON=self.temp_json,
+        ):
+            self.assertEqual(Employee.get_key(user_id_1), user_key_1)
+
+            # 他のプロセスがファイルを更新した場合
+            with open(self.temp_json, "w") as f:
+                f.write(json.dumps({user_id_1: user_key_2}))
+
+            self.assertEqual(Employee.get_key(user_id_1), user_key_2)
+
+    def test_create__write_through(self, _):
+        user_id_1 = _random_string(n=10)
+        user_key_1 = _random_string(n=20)
+
+        with mock.patch.multiple(
+            "components.strategy.local_file_data_strategy.LocalFileDataStrategy",
+            DATA_DIR=self.temp_dir,
+            DATA_JSON=self.temp_json,
+        ):
+            Employee.create(user_id=user_id_1, key=user_key_1)
+
+            with mock.patch.object(LocalFileDataStrategy, "read") as mocked_read:
+                self.assertEqual(Employee.get_key(user_id_1), user_key_1)
+
+                self.assertEqual(mocked_read.call_count, 0)
+
+
+class TestEmployeePointLookup(unittest.TestCase):
+    def setUp(self) -> None:
+        Employee.clear_cache()
+        self.strategy = _PointLookupDataStrategy()
+        patcher = mock.patch("components.repo.create_data_strategy", return_value=self.strategy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create(self):
+        Employee.create(user_id="user-1", key="key-1")
+
+        self.strategy.put.assert_called_once_with("user-1", "key-1")
+        self.assertEqual(Employee.get_key("user-1"), "key-1")
+        # 登録時にキャッシュされている
+        self.assertEqual(self.strategy.get.call_count, 0)
+        self.assertEqual(self.strategy.read.call_count, 0)
+
+    def test_create__concurrent_update(self):
+        Employee.create(user_id="user-1", key="key-1")
+        # 他のプロセスが同時に登録した
+        self.strategy.data["user-1"] = "key-2"
+        self.strategy.put.side_effect = ConcurrentUpdateError("user-1")
+
+        with self.assertRaises(ConcurrentUpdateError):
+            Employee.create(user_id="user-1", key="key-3")
+
+        # 保存できなかった値はキャッシュせず、他のプロセスが登録した値を読み込み直す
+        self.assertEqual(Employee.get_key("user-1"), "key-2")
+        self.strategy.get.assert_called_once_with("user-1")
+
+    def test_get_key(self):
+        self.strategy.data["user-1"] = "key-1"
+
+        self.assertEqual(Employee.get_key("user-1"), "key-1")
+        self.assertEqual(Employee.get_key("user-1"), "key-1")
+        self.assertIsNone(Employee.get_key("none_key"))
+        self.assertIsNone(Employee.get_key("none_key"))
+
+        # 登録済みのユーザーはキャッシュし、未登録のユーザーは毎回確認する
+        self.assertListEqual(
+            self.strategy.get.call_args_list,
+            [mock.call("user-1"), mock.call("none_key"), mock.call("none_key")],
+        )
+        self.assertEqual(self.strategy.read.call_count, 0)
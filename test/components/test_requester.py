@@ -1,20 +1,36 @@
 import json
+import socket
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 from unittest.mock import MagicMock
 
-from components.requester import KOTException, KOTRequester
+import requests
+
+from components.instrumentation import add_kot_call_hook, remove_kot_call_hook
+from components.rate_limiter import Priority, RateLimiter
+from components.requester import (
+    KOTException,
+    KOTRequester,
+    KOTSessionPool,
+    get_rate_limiter,
+    get_retry_policy,
+    get_session_pool,
+    is_request_rejected,
+)
+from components.retry import RetryBudget, RetryPolicy
 
 
 class TestKOTRequester(unittest.TestCase):
     BASE_URL = "https://api.kingtime.jp/v1.0"
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_get(self, mocked_get):
         expect_resp_json = {"lastName": "last_name", "firstName": "first_name"}
         expect_path = "/test-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_resp_json)
         mocked_get.return_value = mocked_response
 
@@ -28,12 +44,12 @@ class TestKOTRequester(unittest.TestCase):
 
         self.assertDictEqual(resp_json, expect_resp_json)
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     def test_get__error(self, mocked_get):
         expect_json = {"errors": [{"message": "message1"}, {"message": "message2"}]}
         expect_path = "/error-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_json)
         mocked_get.return_value = mocked_response
 
@@ -43,13 +59,13 @@ class TestKOTRequester(unittest.TestCase):
 
         self.assertEqual(mocked_get.call_count, 1)
 
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_post(self, mocked_post):
         expect_req_json = {"req_str": "str", "req_int": 10}
         expect_resp_json = {}
         expect_path = "/test-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_resp_json)
         mocked_post.return_value = mocked_response
 
@@ -65,12 +81,12 @@ class TestKOTRequester(unittest.TestCase):
 
         self.assertDictEqual(resp_json, expect_resp_json)
 
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_post__error(self, mocked_post):
         expect_json = {"errors": [{"message": "message10"}, {"message": "message20"}]}
         expect_path = "/error-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_json)
         mocked_post.return_value = mocked_response
 
@@ -80,13 +96,13 @@ class TestKOTRequester(unittest.TestCase):
 
         self.assertEqual(mocked_post.call_count, 1)
 
-    @mock.patch("requests.put")
+    @mock.patch("requests.Session.put")
     def test_put(self, mocked_put):
         expect_req_json = {"req_bool": True, "req_none": None}
         expect_resp_json = {}
         expect_path = "/test-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_resp_json)
         mocked_put.return_value = mocked_response
 
@@ -102,12 +118,12 @@ class TestKOTRequester(unittest.TestCase):
 
         self.assertDictEqual(resp_json, expect_resp_json)
 
-    @mock.patch("requests.put")
+    @mock.patch("requests.Session.put")
     def test_put__error(self, mocked_put):
         expect_json = {"errors": [{"message": "message100"}, {"message": "message200"}]}
         expect_path = "/error-path"
 
-        mocked_response = MagicMock()
+        mocked_response = MagicMock(status_code=200)
         mocked_response.text = json.dumps(expect_json)
         mocked_put.return_value = mocked_response
 
@@ -116,3 +132,359 @@ class TestKOTRequester(unittest.TestCase):
             requester.put(uri=expect_path, payload={})
 
         self.assertEqual(mocked_put.call_count, 1)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/stream"):
+            return self._send_chunked()
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self):
+        """Content-Length を付けずに、少しずつ送信する"""
+        if self.path == "/stream-error":
+            body = json.dumps({"errors": [{"message": "message1"}]}).encode()
+        else:
+            body = json.dumps([{"date": f"2023-04-{day:02d}", "dailyWorkings": []} for day in range(1, 31)]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(body), 100):
+            chunk = body[i : i + 100]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestKOTSessionPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.server_thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_shared_by_requesters(self):
+        self.assertIs(KOTRequester().session_pool, get_session_pool())
+        self.assertIs(KOTRequester().session_pool.session, KOTRequester().session_pool.session)
+
+    def test_keep_alive(self):
+        pool = KOTSessionPool(pool_size=2, connect_timeout=1, read_timeout=1)
+        self.addCleanup(pool.close)
+
+        for i in range(3):
+            requester = KOTRequester(session_pool=pool)
+            requester.base_url = self.base_url
+            self.assertDictEqual(requester.get(f"/path-{i}"), {"path": f"/path-{i}"})
+
+        # 3 リクエストで 1 コネクションを使い回している
+        self.assertDictEqual(pool.stats(), {"requests": 3, "connections": 1, "pools": 1})
+
+    def test_get_stream(self):
+        pool = KOTSessionPool(pool_size=1, connect_timeout=1, read_timeout=1)
+        self.addCleanup(pool.close)
+        requester = KOTRequester(session_pool=pool)
+        requester.base_url = self.base_url
+        requester.STREAM_CHUNK_SIZE = 64
+
+        items = requester.get_stream("/stream")
+
+        # リクエストは最初の要素を取り出すときに送信する
+        self.assertEqual(pool.stats()["requests"], 0)
+        self.assertDictEqual(next(items), {"date": "2023-04-01", "dailyWorkings": []})
+        self.assertEqual(len(list(items)), 29)
+
+        # 読み終わったコネクションは使い回す
+        self.assertDictEqual(requester.get("/path"), {"path": "/path"})
+        self.assertEqual(pool.stats()["connections"], 1)
+
+    def test_get_stream__error(self):
+        pool = KOTSessionPool(pool_size=1, connect_timeout=1, read_timeout=1)
+        self.addCleanup(pool.close)
+        requester = KOTRequester(session_pool=pool)
+        requester.base_url = self.base_url
+
+        with self.assertRaises(KOTException, msg="message1"):
+            list(requester.get_stream("/stream-error"))
+
+    @mock.patch("requests.Session.get")
+    def test_timeout(self, mocked_get):
+        mocked_response = MagicMock(status_code=200)
+        mocked_response.text = json.dumps({})
+        mocked_get.return_value = mocked_response
+
+        pool = KOTSessionPool(pool_size=1, connect_timeout=1.5, read_timeout=10)
+        KOTRequester(session_pool=pool).get(uri="/test-path")
+
+        _, kwargs = mocked_get.call_args
+        self.assertEqual(kwargs["timeout"], (1.5, 10))
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    """responses に設定したステータスコードを順番に返す。使い切った後は 200 を返す"""
+
+    protocol_version = "HTTP/1.1"
+    responses = []
+    received = []
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.received.append((self.command, self.path))
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        if status != 200:
+            body = json.dumps({}).encode()
+        elif self.path.startswith("/stream"):
+            body = json.dumps([]).encode()
+        else:
+            body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestKOTRequesterRetry(unittest.TestCase):
+    def setUp(self) -> None:
+        _ScriptedHandler.responses = []
+        _ScriptedHandler.received = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.server_thread.start()
+        self.pool = KOTSessionPool(pool_size=1, connect_timeout=1, read_timeout=1)
+        self.budget = RetryBudget(ratio=1, min_retries_per_second=10)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _create_requester(self, base_url=None, budget=None):
+        policies = {
+            "GET": RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, budget=budget or self.budget),
+            "POST": RetryPolicy(
+                max_attempts=3, base_delay=0, max_delay=0, idempotent=False, budget=budget or self.budget
+            ),
+        }
+        requester = KOTRequester(
+            session_pool=self.pool, retry_policies=policies, rate_limiter=RateLimiter(rate=0, burst=0)
+        )
+        requester.base_url = base_url or f"http://127.0.0.1:{self.server.server_address[1]}"
+        return requester
+
+    def test_default_policies(self):
+        self.assertTrue(get_retry_policy("GET").idempotent)
+        self.assertTrue(get_retry_policy("PUT").idempotent)
+        self.assertFalse(get_retry_policy("POST").idempotent)
+        self.assertIs(get_retry_policy("PUT"), get_retry_policy("GET"))
+        self.assertIs(KOTRequester().retry_policies["GET"], get_retry_policy("GET"))
+
+    def test_rate_limit_priority(self):
+        rate_limiter = MagicMock()
+        requester = self._create_requester()
+        requester.rate_limiter = rate_limiter
+
+        requester.get("/path")
+        requester.post("/timerecord", "{}")
+
+        # 打刻（POST）は勤怠エラーチェックなどの GET より優先する
+        self.assertListEqual(
+            [call.args[0] for call in rate_limiter.acquire.call_args_list], [Priority.LOW, Priority.HIGH]
+        )
+        self.assertIs(KOTRequester().rate_limiter, get_rate_limiter())
+
+    def test_rate_limit_retry(self):
+        # 再送もレート制限に数える
+        _ScriptedHandler.responses = [(503, {})]
+        rate_limiter = MagicMock()
+        requester = self._create_requester()
+        requester.rate_limiter = rate_limiter
+
+        requester.get("/path")
+
+        self.assertEqual(rate_limiter.acquire.call_count, 2)
+
+    def test_get__retry(self):
+        _ScriptedHandler.responses = [(503, {}), (502, {})]
+
+        self.assertDictEqual(self._create_requester().get("/path"), {"path": "/path"})
+        self.assertEqual(len(_ScriptedHandler.received), 3)
+        self.assertEqual(self.pool.stats()["requests"], 3)
+
+    def test_get__give_up(self):
+        _ScriptedHandler.responses = [(500, {})] * 3
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester().get("/path")
+        self.assertEqual(len(_ScriptedHandler.received), 3)
+
+    def test_get__not_retryable_status(self):
+        _ScriptedHandler.responses = [(400, {})]
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester().get("/path")
+        self.assertEqual(len(_ScriptedHandler.received), 1)
+
+    def test_get__retry_after(self):
+        _ScriptedHandler.responses = [(429, {"Retry-After": "0"})]
+
+        with mock.patch("time.sleep") as mocked_sleep:
+            self.assertDictEqual(self._create_requester().get("/path"), {"path": "/path"})
+        mocked_sleep.assert_called_once_with(0.0)
+
+    def test_get__retry_after_too_long(self):
+        _ScriptedHandler.responses = [(429, {"Retry-After": "3600"})]
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester().get("/path")
+        self.assertEqual(len(_ScriptedHandler.received), 1)
+
+    def test_get_stream__retry(self):
+        _ScriptedHandler.responses = [(503, {})]
+
+        self.assertListEqual(list(self._create_requester().get_stream("/stream")), [])
+        self.assertEqual(len(_ScriptedHandler.received), 2)
+
+    def test_post__retry_rejected(self):
+        # 429 は KOT が処理していないので打刻でも再送する
+        _ScriptedHandler.responses = [(429, {})]
+
+        self.assertDictEqual(self._create_requester().post("/timerecord", "{}"), {"path": "/timerecord"})
+        self.assertEqual(len(_ScriptedHandler.received), 2)
+
+    def test_post__not_retry_ambiguous(self):
+        # 500 は打刻が登録されている可能性があるので再送しない
+        _ScriptedHandler.responses = [(500, {})]
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester().post("/timerecord", "{}")
+        self.assertEqual(len(_ScriptedHandler.received), 1)
+
+    def test_post__retry_connection_refused(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+
+        with self.assertRaises(requests.ConnectionError):
+            self._create_requester(base_url=f"http://127.0.0.1:{closed_port}").post("/timerecord", "{}")
+        # 接続できなかった場合は KOT に届いていないので再送する
+        self.assertEqual(self.pool.stats()["requests"], 3)
+
+    def test_is_request_rejected(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        cases = [
+            ([(503, {})] * 3, None, True),
+            ([(429, {})] * 3, None, True),
+            ([(500, {})], None, False),
+            ([], f"http://127.0.0.1:{closed_port}", True),
+        ]
+        for responses, base_url, expected in cases:
+            with self.subTest(responses=responses, base_url=base_url):
+                _ScriptedHandler.responses = list(responses)
+                with self.assertRaises(requests.RequestException) as cm:
+                    self._create_requester(base_url=base_url).post("/timerecord", "{}")
+                self.assertIs(is_request_rejected(cm.exception), expected)
+
+        # KOT がリクエストを処理してエラーを返した場合や、タイムアウトで届いたかわからない場合
+        self.assertFalse(is_request_rejected(KOTException("error")))
+        self.assertFalse(is_request_rejected(requests.exceptions.ReadTimeout("timeout")))
+
+    def test_budget_exhausted(self):
+        _ScriptedHandler.responses = [(503, {})]
+        budget = RetryBudget(ratio=0, min_retries_per_second=0)
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester(budget=budget).get("/path")
+        self.assertEqual(len(_ScriptedHandler.received), 1)
+        self.assertEqual(budget.stats()["exhausted"], 1)
+
+
+class TestKOTRequesterInstrumentation(unittest.TestCase):
+    def setUp(self) -> None:
+        _ScriptedHandler.responses = []
+        _ScriptedHandler.received = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.pool = KOTSessionPool(pool_size=1, connect_timeout=1, read_timeout=1)
+        self.calls = []
+        add_kot_call_hook(self.calls.append)
+
+    def tearDown(self) -> None:
+        remove_kot_call_hook(self.calls.append)
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _create_requester(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+        requester = KOTRequester(
+            session_pool=self.pool, retry_policies={"GET": policy}, rate_limiter=RateLimiter(rate=0, burst=0)
+        )
+        requester.base_url = f"http://localhost:{self.server.server_address[1]}"
+        return requester
+
+    def test_get(self):
+        _ScriptedHandler.responses = [(503, {})]
+        requester = self._create_requester()
+
+        requester.get("/employees/1234?date=2030-04-01")
+        requester.get("/employees/5678")
+
+        first, second = self.calls
+        self.assertEqual(first.endpoint, "/employees/{code}")
+        self.assertEqual((first.method, first.status, first.retries, first.error), ("GET", 200, 1, None))
+        self.assertEqual(first.bytes, len(json.dumps({"path": "/employees/1234?date=2030-04-01"})))
+        for phase in ("connect", "wait", "transfer", "json_decode"):
+            self.assertGreater(first.phases[phase], 0, phase)
+        # 名前解決と TLS のハンドシェイクは connect に含めるので、計測していない内訳として出さない
+        self.assertNotIn("dns", first.phases)
+        self.assertNotIn("tls", first.phases)
+        self.assertNotIn("dns_ms", first.to_dict())
+        self.assertNotIn("tls_ms", first.to_dict())
+        self.assertGreaterEqual(first.duration, sum(first.phases.values()))
+
+        # keep-alive のコネクションを使い回した場合は、コネクションを張る時間はかからない
+        self.assertEqual(second.retries, 0)
+        self.assertEqual(second.connecting_time, 0)
+        self.assertNotIn("connect", second.phases)
+
+    def test_get__error(self):
+        _ScriptedHandler.responses = [(404, {})]
+
+        with self.assertRaises(requests.HTTPError):
+            self._create_requester().get("/daily-workings")
+
+        self.assertEqual(self.calls[0].to_dict()["status"], 404)
+        self.assertEqual(self.calls[0].to_dict()["error"], "HTTPError")
+
+    def test_get_stream(self):
+        self.assertListEqual(list(self._create_requester().get_stream("/stream?start=2030-04-01")), [])
+
+        call = self.calls[0]
+        self.assertEqual(call.endpoint, "/stream")
+        self.assertEqual(call.bytes, len(b"[]"))
+        self.assertGreater(call.phases["transfer"], 0)
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from components.retry import RetryBudget, RetryPolicy, parse_retry_after
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after(" 10 "), 10.0)
+
+    def test_http_date(self):
+        now = datetime(2023, 4, 3, 10, 0, 0, tzinfo=timezone.utc)
+
+        self.assertEqual(parse_retry_after("Mon, 03 Apr 2023 10:00:05 GMT", now=now), 5.0)
+        # 過去の日時の場合はすぐに再送する
+        self.assertEqual(parse_retry_after("Mon, 03 Apr 2023 09:59:00 GMT", now=now), 0.0)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_is_retryable__idempotent(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+        self.assertTrue(policy.is_retryable(status=429))
+        self.assertTrue(policy.is_retryable(status=500))
+        self.assertTrue(policy.is_retryable(status=None, request_sent=True))
+        self.assertFalse(policy.is_retryable(status=400))
+        self.assertFalse(policy.is_retryable(status=404))
+
+    def test_is_retryable__not_idempotent(self):
+        # 打刻は KOT に届いていないことがわかる場合だけ再送する
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, idempotent=False)
+
+        self.assertTrue(policy.is_retryable(status=429))
+        self.assertTrue(policy.is_retryable(status=503))
+        self.assertTrue(policy.is_retryable(status=None, request_sent=False))
+        self.assertFalse(policy.is_retryable(status=500))
+        self.assertFalse(policy.is_retryable(status=504))
+        self.assertFalse(policy.is_retryable(status=None, request_sent=True))
+
+    def test_backoff(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=5)
+
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            self.assertListEqual([policy.backoff(attempt) for attempt in range(1, 6)], [1, 2, 4, 5, 5])
+
+        for attempt in range(1, 6):
+            self.assertTrue(0 <= policy.backoff(attempt) <= 5)
+
+    def test_backoff__retry_after(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=5, max_retry_after=30)
+
+        with mock.patch("random.uniform", return_value=0.5):
+            self.assertEqual(policy.backoff(1, retry_after=10), 10)
+            self.assertEqual(policy.backoff(1, retry_after=0), 0.5)
+            # 待ち時間が長すぎる場合は再送しない
+            self.assertIsNone(policy.backoff(1, retry_after=60))
+
+    def test_next_delay(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+        self.assertEqual(policy.next_delay(1, status=503), 0)
+        self.assertEqual(policy.next_delay(2, status=503), 0)
+        self.assertIsNone(policy.next_delay(3, status=503))
+        self.assertIsNone(policy.next_delay(1, status=400))
+
+    def test_next_delay__budget(self):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, window=60)
+        policy = RetryPolicy(max_attempts=10, base_delay=0, max_delay=0, budget=budget)
+        for _ in range(4):
+            policy.record_request()
+
+        delays = [policy.next_delay(1, status=503) for _ in range(4)]
+
+        # 4 リクエストの 0.5 倍の 2 回までしか再送しない
+        self.assertListEqual(delays, [0, 0, None, None])
+        self.assertDictEqual(budget.stats(), {"requests": 4, "retries": 2, "exhausted": 2})
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_min_retries(self):
+        budget = RetryBudget(ratio=0.1, min_retries_per_second=0.5, window=4)
+
+        # リクエストが少なくても min_retries_per_second * window 回は再送できる
+        self.assertListEqual([budget.try_acquire() for _ in range(3)], [True, True, False])
+
+    def test_window(self):
+        budget = RetryBudget(ratio=1, min_retries_per_second=0, window=10)
+        with mock.patch("time.monotonic", return_value=100):
+            budget.record_request()
+            self.assertTrue(budget.try_acquire())
+            self.assertFalse(budget.try_acquire())
+
+        # window 秒経つと古いリクエスト・再送は数えない
+        with mock.patch("time.monotonic", return_value=111):
+            self.assertFalse(budget.try_acquire())
+            budget.record_request()
+            self.assertTrue(budget.try_acquire())
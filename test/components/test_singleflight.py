@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from components.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def _run_concurrently(self, single_flight, key, fn, n):
+        results = [None] * n
+        errors = [None] * n
+
+        def _do(i):
+            try:
+                results[i] = single_flight.do(key, fn)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=_do, args=(i,)) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_do__deduplicated(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        fn = MagicMock(side_effect=lambda: release.wait(timeout=1) and {"data": 1})
+
+        threads, results, _ = self._run_concurrently(single_flight, "key", fn, n=5)
+        # 全員が実行中の処理を待つまで待つ
+        while single_flight.stats()["calls"] < 5:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(fn.call_count, 1)
+        self.assertListEqual(results, [{"data": 1}] * 5)
+        self.assertDictEqual(single_flight.stats(), {"calls": 5, "deduplicated": 4, "in_flight": 0})
+
+    def test_do__error(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def _fn():
+            release.wait(timeout=1)
+            raise ValueError("error")
+
+        threads, _, errors = self._run_concurrently(single_flight, "key", _fn, n=3)
+        while single_flight.stats()["calls"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        # 実行中の処理が失敗した場合は待っていた呼び出し元にも同じ例外を返す
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_do__sequential(self):
+        single_flight = SingleFlight()
+        fn = MagicMock(return_value="result")
+
+        self.assertEqual(single_flight.do("key", fn), "result")
+        self.assertEqual(single_flight.do("key", fn), "result")
+
+        # 実行中でなければ毎回実行する
+        self.assertEqual(fn.call_count, 2)
+        self.assertEqual(single_flight.stats()["deduplicated"], 0)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_do__deduplicated(self):
+        single_flight = AsyncSingleFlight()
+        release = asyncio.Event()
+        fn = MagicMock()
+
+        async def _fetch():
+            fn()
+            await release.wait()
+            return {"data": 1}
+
+        tasks = [asyncio.ensure_future(single_flight.do("key", _fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(fn.call_count, 1)
+        self.assertListEqual(results, [{"data": 1}] * 5)
+        self.assertDictEqual(single_flight.stats(), {"calls": 5, "deduplicated": 4, "in_flight": 0})
+
+    async def test_do__error(self):
+        single_flight = AsyncSingleFlight()
+
+        async def _fetch():
+            await asyncio.sleep(0)
+            raise ValueError("error")
+
+        results = await asyncio.gather(*[single_flight.do("key", _fetch) for _ in range(3)], return_exceptions=True)
+
+        # 実行中の処理が失敗した場合は待っていた呼び出し元にも同じ例外を返す
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(single_flight.stats()["deduplicated"], 2)
+
+    async def test_do__cancelled(self):
+        single_flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def _fetch():
+            await release.wait()
+            return "result"
+
+        first = asyncio.ensure_future(single_flight.do("key", _fetch))
+        second = asyncio.ensure_future(single_flight.do("key", _fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        # 先に呼び出した側がキャンセルされても、待っている呼び出し元には結果を返す
+        self.assertEqual(await second, "result")
+        self.assertTrue(first.cancelled())
+
+    async def test_do__sequential(self):
+        single_flight = AsyncSingleFlight()
+
+        async def _fetch():
+            return "result"
+
+        self.assertEqual(await single_flight.do("key", _fetch), "result")
+        self.assertEqual(await single_flight.do("key", _fetch), "result")
+
+        # 実行中でなければ毎回実行する
+        self.assertDictEqual(single_flight.stats(), {"calls": 2, "deduplicated": 0, "in_flight": 0})
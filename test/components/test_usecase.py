@@ -1,16 +1,39 @@
 import json
+import threading
 import unittest
 from datetime import datetime
 from unittest import mock
 
+import requests
 from freezegun import freeze_time
 
-from components.usecase import RecordType, _get_working_date, get_daily_timacard_data, record_time, register_user
+from components.coalescer import Coalescer
+from components.requester import KOTException
+from components.usecase import (
+    RecordType,
+    _get_working_date,
+    get_active_employees,
+    get_daily_timacard_data,
+    get_employee_directory,
+    get_single_flight_stats,
+    record_time,
+    record_times,
+    register_user,
+)
+
+
+def _http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} Error", response=response)
 
 
 class TestUseCase(unittest.TestCase):
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+    def setUp(self) -> None:
+        get_employee_directory().clear()
+
     @mock.patch("components.repo.Employee.create")
     @mock.patch("components.requester.KOTRequester.get")
     def test_register_user(self, mocked_get, mocked_create):
@@ -40,6 +63,39 @@ class TestUseCase(unittest.TestCase):
         self.assertEqual(mocked_create_args[0], user)
         self.assertEqual(mocked_create_args[1], employee_key)
 
+    @mock.patch("components.repo.Employee.create")
+    @mock.patch("components.requester.KOTRequester.get")
+    def test_register_user__cached(self, mocked_get, mocked_create):
+        mocked_get.return_value = [
+            {"key": "key-0009", "code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+        ]
+        get_active_employees()
+
+        # 従業員一覧に含まれている人は KOT から取得しない
+        resp_json = register_user(user="dummy-user", kot_user_code="0009")
+
+        self.assertDictEqual(resp_json, {"last_name": "山田", "first_name": "伝蔵"})
+        mocked_get.assert_called_once_with("/employees")
+        mocked_create.assert_called_once_with("dummy-user", "key-0009")
+
+    @mock.patch("components.requester.KOTRequester.get")
+    def test_get_active_employees(self, mocked_get):
+        employees = [{"key": "key-0009", "code": "0009", "lastName": "山田", "firstName": "伝蔵"}]
+        mocked_get.return_value = employees
+
+        with freeze_time(datetime(2030, 4, 1, 9, 0, 0)) as frozen_time:
+            self.assertListEqual(get_active_employees(), employees)
+            self.assertListEqual(get_active_employees(), employees)
+
+            # 従業員一覧はメモリに保持しているので1回だけ取得する
+            self.assertEqual(mocked_get.call_count, 1)
+
+            # 一定時間経つと取得し直す
+            frozen_time.tick(get_employee_directory().refresh_interval)
+            get_active_employees()
+
+            self.assertEqual(mocked_get.call_count, 2)
+
     @mock.patch("components.requester.KOTRequester.post")
     def test_record_time(self, mocked_post):
         record_type = RecordType.CLOCK_IN
@@ -64,6 +120,85 @@ class TestUseCase(unittest.TestCase):
                 },
             )
 
+    @mock.patch("components.requester.KOTRequester.post")
+    def test_record_time__coalesced(self, mocked_post):
+        mocked_post.return_value = [{"employeeKey": "key-1"}, {"employeeKey": "key-2"}]
+        coalescer = Coalescer(window=10, max_batch_size=2, submit_batch=record_times)
+
+        current_time = datetime.strptime("2030-04-01 09:00:00", self.DATE_FORMAT)
+
+        with freeze_time(current_time), mock.patch(
+            "components.usecase.get_timerecord_coalescer", return_value=coalescer
+        ):
+            thread = threading.Thread(target=record_time, args=(RecordType.CLOCK_IN, "key-1"))
+            thread.start()
+            record_time(RecordType.CLOCK_OUT, "key-2")
+            thread.join()
+
+        self.assertEqual(mocked_post.call_count, 1)
+
+        mocked_post_args, _ = mocked_post.call_args
+        self.assertEqual(mocked_post_args[0], "/daily-workings/timerecord")
+        self.assertCountEqual(
+            json.loads(mocked_post_args[1]),
+            [
+                {
+                    "employeeKey": "key-1",
+                    "time": current_time.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+                    "date": current_time.strftime("%Y-%m-%d"),
+                    "code": RecordType.CLOCK_IN.value,
+                },
+                {
+                    "employeeKey": "key-2",
+                    "time": current_time.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+                    "date": current_time.strftime("%Y-%m-%d"),
+                    "code": RecordType.CLOCK_OUT.value,
+                },
+            ],
+        )
+
+    @mock.patch("components.requester.KOTRequester.post")
+    def test_record_times(self, mocked_post):
+        mocked_post.return_value = [{"employeeKey": "key-1"}, {"errors": [{"message": "invalid"}]}]
+
+        results = record_times([{"employeeKey": "key-1", "code": 1}, {"employeeKey": "key-2", "code": 1}])
+
+        self.assertDictEqual(results[0], {"employeeKey": "key-1"})
+        self.assertIsInstance(results[1], KOTException)
+
+    @mock.patch("components.requester.KOTRequester.post")
+    def test_record_times__fallback(self, mocked_post):
+        # まとめて登録できなかった場合は1件ずつ登録し直す
+        mocked_post.side_effect = [KOTException("invalid"), {}, KOTException("invalid key-2")]
+
+        results = record_times([{"employeeKey": "key-1", "code": 1}, {"employeeKey": "key-2", "code": 2}])
+
+        self.assertDictEqual(results[0], {})
+        self.assertIsInstance(results[1], KOTException)
+
+        self.assertEqual(mocked_post.call_count, 3)
+        self.assertEqual(mocked_post.call_args_list[1].args[0], "/daily-workings/timerecord/key-1")
+        self.assertDictEqual(json.loads(mocked_post.call_args_list[1].args[1]), {"code": 1})
+        self.assertEqual(mocked_post.call_args_list[2].args[0], "/daily-workings/timerecord/key-2")
+
+    @mock.patch("components.requester.KOTRequester.post")
+    def test_record_times__fallback_http_error(self, mocked_post):
+        # まとめて登録するエンドポイントが 400 を返した場合も1件ずつ登録し直す
+        mocked_post.side_effect = [_http_error(400), {}, _http_error(400)]
+
+        results = record_times([{"employeeKey": "key-1", "code": 1}, {"employeeKey": "key-2", "code": 2}])
+
+        self.assertDictEqual(results[0], {})
+        self.assertIsInstance(results[1], requests.HTTPError)
+        self.assertEqual(mocked_post.call_count, 3)
+
+    @mock.patch("components.requester.KOTRequester.post", side_effect=_http_error(500))
+    def test_record_times__server_error(self, mocked_post):
+        # 500 は打刻が登録されている可能性があるので、1件ずつ登録し直さない
+        with self.assertRaises(requests.HTTPError):
+            record_times([{"employeeKey": "key-1", "code": 1}, {"employeeKey": "key-2", "code": 2}])
+        self.assertEqual(mocked_post.call_count, 1)
+
     def test_get_working_date(self):
         patterns = [
             (datetime.strptime("2025-06-30 23:59:59", self.DATE_FORMAT), "2025-06-30"),
@@ -78,11 +213,11 @@ class TestUseCase(unittest.TestCase):
                 with freeze_time(current_time):
                     self.assertEqual(_get_working_date(), working_date)
 
-    @mock.patch("components.requester.KOTRequester.get")
+    @mock.patch("components.requester.KOTRequester.get_stream")
     def test_get_daily_timacard_data(self, mocked_get):
         # モックのレスポンスを設定
-        expected_response = {"data": "dummy-data"}
-        mocked_get.return_value = expected_response
+        expected_response = [{"date": "2025-06-01", "dailyWorkings": []}]
+        mocked_get.return_value = iter(expected_response)
 
         # パラメータ設定
         from_date = "2025-06-01"
@@ -99,3 +234,45 @@ class TestUseCase(unittest.TestCase):
         mocked_get_args, _ = mocked_get.call_args
         expected_uri = f"/daily-workings?&start={from_date}&end={to_date}&additionalFields=currentDateEmployee"
         self.assertEqual(mocked_get_args[0], expected_uri)
+
+    @mock.patch("components.requester.KOTRequester.get_stream")
+    def test_get_daily_timacard_data__compact(self, mocked_get):
+        received = []
+
+        def get_stream(uri):
+            for daily_data in [{"date": "2025-06-01"}, {"date": "2025-06-02"}]:
+                received.append(daily_data["date"])
+                yield daily_data
+
+        def compact(daily_data):
+            # 次の日のデータを受信する前に変換する
+            self.assertEqual(received[-1], daily_data["date"])
+            return daily_data["date"]
+
+        mocked_get.side_effect = get_stream
+
+        self.assertListEqual(get_daily_timacard_data("2025-06-01", "2025-06-02", compact=compact), received)
+
+    @mock.patch("components.requester.KOTRequester.get_stream")
+    def test_get_daily_timacard_data__single_flight(self, mocked_get):
+        release = threading.Event()
+        mocked_get.side_effect = lambda uri: release.wait(timeout=1) and [{"date": "2025-06-01"}]
+        stats_before = get_single_flight_stats()
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(get_daily_timacard_data("2025-06-01", "2025-06-30")))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while get_single_flight_stats()["calls"] - stats_before["calls"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        # 同時に発生した同じ GET は1回のリクエストにまとめられる
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertListEqual(results, [[{"date": "2025-06-01"}]] * 3)
+        self.assertEqual(get_single_flight_stats()["deduplicated"] - stats_before["deduplicated"], 2)
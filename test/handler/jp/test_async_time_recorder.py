@@ -0,0 +1,133 @@
+import importlib.util
+import threading
+import unittest
+from unittest import mock
+from unittest.mock import AsyncMock
+
+from freezegun import freeze_time
+
+from components.deferred import get_async_deferred_runner
+from components.requester import KOTException
+from components.typing import SlackRequest
+from components.usecase import RecordType
+from handler.jp.timecard_check import invalidate_error_map_cache
+
+# asyncio 版は aiohttp がインストールされている場合のみテストする
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+if HAS_AIOHTTP:
+    from handler.jp.async_time_recorder import record_clock_in, record_start_break
+
+
+TIMECARD_DATA = [
+    {
+        "date": "2025-08-30",
+        "dailyWorkings": [
+            {
+                "isError": True,
+                "employeeKey": "key-0009",
+                "currentDateEmployee": {"code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+            },
+        ],
+    },
+]
+
+SCHEDULE_DATA = [
+    {
+        "date": "2025-08-30",
+        "dailySchedules": [
+            {
+                "employeeKey": "key-0009",
+                "scheduleTypeName": "通常勤務",
+                "currentDateEmployee": {"code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+            },
+        ],
+    },
+]
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp is not installed")
+class TestAsyncTimeRecorder(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        invalidate_error_map_cache()
+        patcher = mock.patch("handler.jp.async_time_recorder.is_kot_api_available", return_value=True)
+        self.mocked_is_kot_api_available = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @freeze_time("2025-08-31 10:00:00")
+    @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
+    @mock.patch("handler.jp.async_timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("components.async_usecase.get_active_employees", new_callable=AsyncMock)
+    @mock.patch("components.async_usecase.get_daily_schedule_data", new_callable=AsyncMock)
+    @mock.patch("components.async_usecase.get_daily_timacard_data", new_callable=AsyncMock)
+    @mock.patch("components.async_usecase.record_time", new_callable=AsyncMock)
+    async def test_record_clock_in__with_timecard_error(
+        self,
+        mocked_record_time,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+        mocked_get_key,
+    ):
+        mocked_get_daily_timacard_data.return_value = TIMECARD_DATA
+        mocked_get_daily_schedule_data.return_value = SCHEDULE_DATA
+        mocked_get_active_employees.return_value = [{"code": "0009", "lastName": "山田", "firstName": "伝蔵"}]
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await record_clock_in(say=say, request=request)
+
+        mocked_record_time.assert_awaited_once_with(RecordType.CLOCK_IN, "key-0009")
+        # 打刻の応答は勤怠エラーチェックを待たずに返す
+        self.assertEqual(say.await_count, 1)
+        self.assertIn("おはー", say.await_args_list[0].args[0])
+
+        await get_async_deferred_runner().wait_until_idle()
+
+        self.assertEqual(say.await_count, 2)
+        self.assertIn("勤怠エラーがあるみたい！早めに修正しようね！", say.await_args_list[1].args[0])
+        self.assertIn("2025-08-30", say.await_args_list[1].args[0])
+
+    @mock.patch("components.repo.Employee.get_key", return_value=None)
+    @mock.patch("components.async_usecase.record_time", new_callable=AsyncMock)
+    async def test_record_clock_in__employee_not_found(self, mocked_record_time, mocked_get_key):
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await record_clock_in(say=say, request=request)
+
+        self.assertEqual(mocked_record_time.await_count, 0)
+        self.assertEqual(say.await_count, 1)
+        self.assertIn("/employee-code 1234", say.await_args.args[0])
+
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    @mock.patch("components.async_usecase.record_time", new_callable=AsyncMock, side_effect=KOTException)
+    async def test_record_start_break__error(self, mocked_record_time, mocked_get_key):
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await record_start_break(say=say, request=request)
+
+        mocked_record_time.assert_awaited_once_with(RecordType.START_BREAK, "dummy-employee-key")
+        self.assertEqual(say.await_count, 1)
+        self.assertIn("エラーレスポンスが返ってきた", say.await_args.args[0])
+
+    @mock.patch("handler.jp.async_time_recorder.queue_punch")
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    @mock.patch("components.async_usecase.record_time", new_callable=AsyncMock)
+    async def test_record_clock_in__api_not_available(self, mocked_record_time, mocked_get_key, mocked_queue_punch):
+        self.mocked_is_kot_api_available.return_value = False
+        queue_threads = []
+        mocked_queue_punch.side_effect = lambda say, *args: (queue_threads.append(threading.get_ident()), say("queued"))
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await record_clock_in(say=say, request=request)
+
+        self.assertEqual(mocked_record_time.await_count, 0)
+        self.assertEqual(mocked_queue_punch.call_count, 1)
+        self.assertEqual(mocked_queue_punch.call_args.args[1:], (request, RecordType.CLOCK_IN, "dummy-employee-key"))
+        # SQLite への書き込みでイベントループを止めないように、スレッドで保存する
+        self.assertEqual(len(queue_threads), 1)
+        self.assertNotEqual(queue_threads[0], threading.get_ident())
+        say.assert_awaited_once_with("queued")
@@ -0,0 +1,104 @@
+import importlib.util
+import threading
+import unittest
+from unittest import mock
+from unittest.mock import AsyncMock
+
+from freezegun import freeze_time
+
+from components.requester import KOTException
+from components.typing import SlackRequest
+from handler.jp.timecard_check import _build_timecard_errors, invalidate_error_map_cache
+
+# asyncio 版は aiohttp がインストールされている場合のみテストする
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+if HAS_AIOHTTP:
+    from handler.jp.async_timecard_check import announce_timecard_errors
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp is not installed")
+class TestAsyncTimecardCheck(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        invalidate_error_map_cache()
+
+    @freeze_time("2023-04-03 10:00:00")
+    @mock.patch("handler.jp.async_timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("components.async_usecase.get_active_employees", new_callable=AsyncMock)
+    @mock.patch("components.async_usecase.get_daily_schedule_data", new_callable=AsyncMock)
+    @mock.patch("components.async_usecase.get_daily_timacard_data", new_callable=AsyncMock)
+    async def test_announce_timecard_errors__success_with_errors(
+        self,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+    ):
+        mocked_get_daily_timacard_data.return_value = [
+            {
+                "date": "2023-04-01",
+                "dailyWorkings": [
+                    {
+                        "isError": True,
+                        "employeeKey": "key-0009",
+                        "currentDateEmployee": {"code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+                    },
+                ],
+            },
+        ]
+        mocked_get_daily_schedule_data.return_value = [
+            {
+                "date": "2023-04-01",
+                "dailySchedules": [
+                    {
+                        "scheduleTypeName": "通常勤務",
+                        "employeeKey": "key-0011",
+                        "currentDateEmployee": {"code": "0011", "lastName": "大阪", "firstName": "花子"},
+                    },
+                ],
+            },
+        ]
+        mocked_get_active_employees.return_value = [{"code": "0009"}, {"code": "0011"}]
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+        build_threads = []
+
+        def _build(*args):
+            build_threads.append(threading.get_ident())
+            return _build_timecard_errors(*args)
+
+        with mock.patch("handler.jp.async_timecard_check._build_timecard_errors", side_effect=_build):
+            await announce_timecard_errors(say=say, request=request)
+
+        # 勤怠エラーの計算はイベントループを止めないようにスレッドで実行する
+        self.assertEqual(len(build_threads), 1)
+        self.assertNotEqual(build_threads[0], threading.get_ident())
+        self.assertEqual(say.await_count, 1)
+        message = say.await_args.args[0]
+        self.assertIn("勤怠エラーがある人をお知らせするよ", message)
+        self.assertIn("■2023-04-01", message)
+        self.assertIn("0009 山田 伝蔵", message)
+        self.assertIn("0011 大阪 花子", message)
+
+    @mock.patch("handler.jp.async_timecard_check.is_kot_api_available", return_value=False)
+    async def test_announce_timecard_errors__api_not_available(self, mocked_is_kot_api_available):
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await announce_timecard_errors(say=say, request=request)
+
+        self.assertEqual(say.await_count, 1)
+        self.assertIn("勤怠関連の操作", say.await_args.args[0])
+
+    @mock.patch("handler.jp.async_timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("components.async_usecase.get_daily_schedule_data", new_callable=AsyncMock, return_value=[])
+    @mock.patch("components.async_usecase.get_daily_timacard_data", new_callable=AsyncMock, side_effect=KOTException)
+    async def test_announce_timecard_errors__kot_error(
+        self, mocked_get_daily_timacard_data, mocked_get_daily_schedule_data, mocked_is_kot_api_available
+    ):
+        say = AsyncMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        await announce_timecard_errors(say=say, request=request)
+
+        self.assertEqual(say.await_count, 1)
+        self.assertIn("エラーレスポンスが返ってきた", say.await_args.args[0])
@@ -6,9 +6,10 @@ from unittest.mock import MagicMock
 from freezegun import freeze_time
 
 from components.requester import KOTException
+from components.strategy.data_strategy import ConcurrentUpdateError
 from components.typing import SlackRequest
 from handler.jp.configuration import register_employee_code
-from handler.jp.helper import is_kot_api_available
+from handler.jp.helper import CONCURRENT_UPDATE_MESSAGE, is_kot_api_available
 
 
 class TestConfiguration(unittest.TestCase):
@@ -88,3 +89,13 @@ class TestConfiguration(unittest.TestCase):
 
         self.assertIn("King of Time からエラーレスポンス", call_args_list[0][0][0])
         self.assertIn(error_message, call_args_list[0][0][0])
+
+    @mock.patch("handler.jp.configuration.is_kot_api_available", return_value=True)
+    @mock.patch("handler.jp.configuration.register_user", side_effect=ConcurrentUpdateError("dummy-user-id"))
+    def test_register_employee_code__concurrent_update(self, mocked_register_user, mocked_is_kot_api_available):
+        say = MagicMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        register_employee_code(say=say, request=request)
+
+        say.assert_called_once_with(CONCURRENT_UPDATE_MESSAGE)
@@ -0,0 +1,42 @@
+import queue
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from unittest.mock import MagicMock
+
+from components.metrics import MetricsRegistry, render_prometheus
+from handler.jp.metrics import register_process_metrics
+
+
+class TestRegisterProcessMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("handler.jp.metrics.get_punch_queue")
+        patcher.start().return_value.count_pending.return_value = 2
+        self.addCleanup(patcher.stop)
+
+    def test_register_process_metrics(self):
+        registry = MetricsRegistry()
+        socket_mode_handler = MagicMock()
+        socket_mode_handler.client.message_queue = queue.Queue()
+        socket_mode_handler.client.message_queue.put("message")
+        socket_mode_handler.client.message_workers = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(socket_mode_handler.client.message_workers.shutdown)
+
+        register_process_metrics(registry, socket_mode_handler=socket_mode_handler)
+        body = render_prometheus(registry)
+
+        for cache in ("employee", "employee_directory", "timecard_errors", "daily_workings", "daily_schedules"):
+            self.assertIn(f'cache_hits_total{{cache="{cache}"}} ', body)
+            self.assertIn(f'cache_misses_total{{cache="{cache}"}} ', body)
+        self.assertIn('slack_socket_mode_queue_depth{queue="received"} 1\n', body)
+        self.assertIn('slack_socket_mode_queue_depth{queue="workers"} 0\n', body)
+        self.assertIn("kot_rate_limit_throttled_total ", body)
+        self.assertIn("deferred_jobs_pending ", body)
+        self.assertIn("punch_queue_pending 2\n", body)
+
+    def test_register_process_metrics__without_socket_mode_handler(self):
+        registry = MetricsRegistry()
+
+        register_process_metrics(registry)
+
+        self.assertIsNone(registry.get("slack_socket_mode_queue_depth"))
@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from os import path
+from unittest import mock
+from unittest.mock import MagicMock
+
+import requests
+from freezegun import freeze_time
+
+from components.punch_queue import PunchQueue
+from components.requester import KOTException
+from components.usecase import RecordType
+from handler.jp.punch_queue_drainer import PunchQueueDrainer
+
+
+def _http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} Error", response=response)
+
+
+class TestPunchQueueDrainer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.queue = PunchQueue(path.join(self.temp_dir, "punch_queue.db"))
+        self.notify = MagicMock()
+        self.drainer = PunchQueueDrainer(
+            queue=self.queue, notify=self.notify, rate_per_second=1000, max_attempts=2, retry_interval=60
+        )
+        self.queue.enqueue(
+            user_id="user-1",
+            channel_id="channel-1",
+            employee_key="key-1",
+            record_type=RecordType.CLOCK_IN,
+            recorded_at=datetime(2030, 4, 1, 9, 5),
+        )
+
+    @mock.patch("handler.jp.punch_queue_drainer.record_time")
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=False)
+    def test_drain_once__api_not_available(self, mocked_is_kot_api_available, mocked_record_time):
+        self.assertEqual(self.drainer.drain_once(), 0)
+
+        self.assertEqual(mocked_record_time.call_count, 0)
+        self.assertEqual(self.queue.count_pending(), 1)
+
+    @mock.patch("handler.jp.punch_queue_drainer.record_time")
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=True)
+    def test_drain_once(self, mocked_is_kot_api_available, mocked_record_time):
+        with freeze_time(datetime(2030, 4, 1, 10, 1)):
+            self.assertEqual(self.drainer.drain_once(), 1)
+
+        # 受け付けた時刻で打刻する
+        mocked_record_time.assert_called_once_with(RecordType.CLOCK_IN, "key-1", recorded_at=datetime(2030, 4, 1, 9, 5))
+        self.assertEqual(self.queue.count_pending(), 0)
+
+        self.notify.assert_called_once()
+        channel_id, text = self.notify.call_args.args
+        self.assertEqual(channel_id, "channel-1")
+        self.assertIn("<@user-1>", text)
+        self.assertIn("09:05 の出勤を打刻した", text)
+
+    @mock.patch("handler.jp.punch_queue_drainer.record_time", side_effect=_http_error(503))
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=True)
+    def test_drain_once__retry(self, mocked_is_kot_api_available, mocked_record_time):
+        with freeze_time(datetime(2030, 4, 1, 10, 1)):
+            self.assertEqual(self.drainer.drain_once(), 1)
+
+        # 再試行を待っている間は通知しない
+        self.assertEqual(self.queue.count_pending(), 1)
+        self.assertEqual(self.notify.call_count, 0)
+
+        with freeze_time(datetime(2030, 4, 1, 10, 1, 30)):
+            self.assertEqual(self.drainer.drain_once(), 0)
+
+        with freeze_time(datetime(2030, 4, 1, 10, 2)):
+            self.assertEqual(self.drainer.drain_once(), 1)
+
+        # max_attempts 回失敗したら諦めて通知する
+        self.assertEqual(mocked_record_time.call_count, 2)
+        self.assertEqual(self.queue.count_pending(), 0)
+        self.notify.assert_called_once()
+        self.assertIn("打刻できなかった", self.notify.call_args.args[1])
+
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=True)
+    def test_drain_once__not_retry(self, mocked_is_kot_api_available):
+        cases = [
+            # KOT 側で打刻が登録されている可能性があるので、再試行せずに確認してもらう
+            (requests.exceptions.ReadTimeout("timeout"), "打刻できたかわからなかった"),
+            (_http_error(500), "打刻できたかわからなかった"),
+            # KOT が打刻を登録しなかったことがわかる
+            (KOTException("error"), "打刻できなかった"),
+            (_http_error(400), "打刻できなかった"),
+        ]
+        for error, message in cases:
+            with self.subTest(error=error):
+                # ケースごとに打刻が1件だけ入った新しいキューから始める
+                self.setUp()
+                with mock.patch("handler.jp.punch_queue_drainer.record_time", side_effect=error) as mocked_record_time:
+                    with freeze_time(datetime(2030, 4, 1, 10, 1)):
+                        self.assertEqual(self.drainer.drain_once(), 1)
+                    with freeze_time(datetime(2030, 4, 1, 10, 2)):
+                        self.assertEqual(self.drainer.drain_once(), 0)
+
+                self.assertEqual(mocked_record_time.call_count, 1)
+                self.assertEqual(self.queue.count_pending(), 0)
+                self.notify.assert_called_once()
+                self.assertIn(message, self.notify.call_args.args[1])
+
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=True)
+    def test_drain_once__shared_queue(self, mocked_is_kot_api_available):
+        # run.py と run_async.py など、別のプロセスの drainer が同じキューから登録する
+        other = PunchQueueDrainer(
+            queue=PunchQueue(self.queue.path),
+            notify=MagicMock(),
+            rate_per_second=1000,
+            max_attempts=2,
+            retry_interval=60,
+        )
+        submitting = threading.Event()
+        release = threading.Event()
+
+        def _record_time(*args, **kwargs):
+            submitting.set()
+            release.wait(timeout=1)
+
+        with freeze_time(datetime(2030, 4, 1, 10, 1)), mock.patch(
+            "handler.jp.punch_queue_drainer.record_time", side_effect=_record_time
+        ) as mocked_record_time:
+            thread = threading.Thread(target=self.drainer.drain_once)
+            thread.start()
+            self.assertTrue(submitting.wait(timeout=1))
+            # 登録している途中の打刻は他の drainer からは登録しない
+            self.assertEqual(other.drain_once(), 0)
+            release.set()
+            thread.join()
+
+        self.assertEqual(mocked_record_time.call_count, 1)
+        self.assertEqual(self.queue.count_pending(), 0)
+        self.notify.assert_called_once()
+        self.assertIn("打刻したよ", self.notify.call_args.args[1])
+
+    @mock.patch("handler.jp.punch_queue_drainer.record_time")
+    @mock.patch("handler.jp.punch_queue_drainer.is_kot_api_available", return_value=True)
+    def test_drain_once__stale_claim(self, mocked_is_kot_api_available, mocked_record_time):
+        # 登録している途中でプロセスが止まった
+        [punch] = self.queue.get_ready(now=datetime(2030, 4, 1, 10, 1))
+        self.queue.claim(punch.id, now=datetime(2030, 4, 1, 10, 1))
+
+        with freeze_time(datetime(2030, 4, 1, 10, 5)):
+            self.assertEqual(self.drainer.drain_once(), 0)
+        # 他のプロセスが登録している途中かもしれないので、claim_timeout 秒経つまでは何もしない
+        self.assertEqual(self.notify.call_count, 0)
+
+        with freeze_time(datetime(2030, 4, 1, 10, 12)):
+            self.assertEqual(self.drainer.drain_once(), 0)
+            self.assertEqual(self.drainer.drain_once(), 0)
+
+        # KOT に登録されている可能性があるので、登録し直さずに確認してもらう
+        self.assertEqual(mocked_record_time.call_count, 0)
+        self.notify.assert_called_once()
+        self.assertIn("打刻できたかわからなかった", self.notify.call_args.args[1])
@@ -1,14 +1,27 @@
+import threading
 import unittest
+from datetime import datetime
 from unittest import mock
 from unittest.mock import MagicMock
 
+from freezegun import freeze_time
+
+from components.deferred import get_deferred_executor
+from components.metrics import MetricsRegistry
 from components.requester import KOTException
 from components.typing import SlackRequest
 from components.usecase import RecordType
 from handler.jp.time_recorder import record_clock_in, record_clock_out, record_end_break, record_start_break
+from handler.jp.timecard_check import invalidate_error_map_cache
 
 
 class TestTimeRecorder(unittest.TestCase):
+    def setUp(self) -> None:
+        invalidate_error_map_cache()
+        patcher = mock.patch("handler.jp.time_recorder.is_kot_api_available", return_value=True)
+        self.mocked_is_kot_api_available = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch("handler.jp.time_recorder.response_kot_error")
     @mock.patch("handler.jp.time_recorder.record_time")
     @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
@@ -35,6 +48,7 @@ class TestTimeRecorder(unittest.TestCase):
         mocked_get_daily_schedule_data.return_value = []
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -51,6 +65,7 @@ class TestTimeRecorder(unittest.TestCase):
         say_call_args, _ = say.call_args
         self.assertIn("おはー", say_call_args[0])
 
+    @freeze_time("2025-08-31 10:00:00")
     @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
     @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
     @mock.patch("handler.jp.timecard_check.get_active_employees")
@@ -105,6 +120,7 @@ class TestTimeRecorder(unittest.TestCase):
         ]
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる（record_clock_in + check_timecard_errors_for_user）
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -178,6 +194,7 @@ class TestTimeRecorder(unittest.TestCase):
         ]
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -203,6 +220,7 @@ class TestTimeRecorder(unittest.TestCase):
         request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         self.assertEqual(mocked_get_key.call_count, 1)
 
@@ -217,6 +235,7 @@ class TestTimeRecorder(unittest.TestCase):
         request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         self.assertEqual(mocked_get_key.call_count, 1)
 
@@ -233,6 +252,7 @@ class TestTimeRecorder(unittest.TestCase):
         request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
 
         record_clock_in(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         self.assertEqual(mocked_get_key.call_count, 1)
 
@@ -268,6 +288,7 @@ class TestTimeRecorder(unittest.TestCase):
         mocked_get_daily_schedule_data.return_value = []
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -284,6 +305,7 @@ class TestTimeRecorder(unittest.TestCase):
         say_call_args, _ = say.call_args
         self.assertIn("おつー", say_call_args[0])
 
+    @freeze_time("2025-08-31 10:00:00")
     @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
     @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
     @mock.patch("handler.jp.timecard_check.get_active_employees")
@@ -338,6 +360,7 @@ class TestTimeRecorder(unittest.TestCase):
         ]
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる（record_clock_out + check_timecard_errors_for_user）
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -411,6 +434,7 @@ class TestTimeRecorder(unittest.TestCase):
         ]
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが2回呼ばれる
         self.assertEqual(mocked_get_key.call_count, 2)
@@ -454,6 +478,7 @@ class TestTimeRecorder(unittest.TestCase):
         mocked_get_daily_schedule_data.return_value = []
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが0回呼ばれる（record_clock_outでNoneが返されるため、check_timecard_errors_for_userは呼ばれない）
         self.assertEqual(mocked_get_key.call_count, 0)
@@ -486,6 +511,7 @@ class TestTimeRecorder(unittest.TestCase):
         mocked_get_daily_schedule_data.return_value = []
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが1回呼ばれる（record_clock_outのみ、KOTExceptionによりcheck_timecard_errors_for_userは呼ばれない）
         self.assertEqual(mocked_get_key.call_count, 1)
@@ -520,6 +546,7 @@ class TestTimeRecorder(unittest.TestCase):
         mocked_get_daily_schedule_data.return_value = []
 
         record_clock_out(say=say, request=request)
+        get_deferred_executor().wait_until_idle()
 
         # Employee.get_keyが1回呼ばれる（record_clock_outのみ、employee_keyがNoneのためcheck_timecard_errors_for_userは呼ばれない）
         self.assertEqual(mocked_get_key.call_count, 1)
@@ -553,6 +580,20 @@ class TestTimeRecorder(unittest.TestCase):
         say_call_args, _ = say.call_args
         self.assertIn("ゆっくり休んでね", say_call_args[0])
 
+    @mock.patch("handler.jp.time_recorder.record_time")
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    def test_record_start_break__metrics(self, mocked_get_key, mocked_record_time):
+        registry = MetricsRegistry()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        with mock.patch("components.instrumentation.get_metrics_registry", return_value=registry):
+            record_start_break(say=MagicMock(), request=request)
+
+        # 打刻の種類ごとに所要時間を記録する
+        [(labels, sample)] = registry.get("punch_duration_seconds").samples()
+        self.assertDictEqual(labels, {"record_type": "START_BREAK"})
+        self.assertEqual(sample["count"], 1)
+
     @mock.patch("handler.jp.time_recorder.response_kot_error")
     @mock.patch("handler.jp.time_recorder.record_time")
     @mock.patch("components.repo.Employee.get_key", return_value=None)
@@ -671,3 +712,68 @@ class TestTimeRecorder(unittest.TestCase):
         self.assertEqual(say.call_count, 1)
         say_call_args, _ = say.call_args
         self.assertIn("しばらく待ってからもう一度試して", say_call_args[0])
+
+    @mock.patch("handler.jp.time_recorder.check_timecard_errors_for_user")
+    @mock.patch("handler.jp.time_recorder.record_time")
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    def test_record_clock_in__does_not_wait_timecard_check(
+        self, mocked_get_key, mocked_record_time, mocked_check_timecard_errors_for_user
+    ):
+        release = threading.Event()
+        mocked_check_timecard_errors_for_user.side_effect = lambda *args: release.wait(timeout=1)
+        say = MagicMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        record_clock_in(say=say, request=request)
+
+        # 勤怠エラーチェックの完了を待たずに打刻の応答を返している
+        self.assertEqual(say.call_count, 1)
+        self.assertIn("おはー", say.call_args[0][0])
+        self.assertFalse(release.is_set())
+
+        release.set()
+        get_deferred_executor().wait_until_idle()
+
+        self.assertEqual(mocked_check_timecard_errors_for_user.call_count, 1)
+        self.assertEqual(mocked_check_timecard_errors_for_user.call_args[0], ("dummy-user-id", say))
+
+    @mock.patch("handler.jp.time_recorder.get_punch_queue")
+    @mock.patch("handler.jp.time_recorder.record_time")
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    def test_record_clock_in__api_not_available(self, mocked_get_key, mocked_record_time, mocked_get_punch_queue):
+        self.mocked_is_kot_api_available.return_value = False
+        say = MagicMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        current_time = datetime(2030, 4, 1, 9, 5, 0)
+        with freeze_time(current_time):
+            record_clock_in(say=say, request=request)
+
+        # 制限時間帯は打刻せずにキューに保存する
+        self.assertEqual(mocked_record_time.call_count, 0)
+        mocked_get_punch_queue.return_value.enqueue.assert_called_once_with(
+            user_id="dummy-user-id",
+            channel_id="dummy-channel-id",
+            employee_key="dummy-employee-key",
+            record_type=RecordType.CLOCK_IN,
+            recorded_at=current_time,
+        )
+
+        self.assertEqual(say.call_count, 1)
+        self.assertIn("09:05 の出勤として受け付けた", say.call_args[0][0])
+
+    @mock.patch("handler.jp.time_recorder.get_punch_queue")
+    @mock.patch("handler.jp.time_recorder.record_time")
+    @mock.patch("components.repo.Employee.get_key", return_value="dummy-employee-key")
+    def test_record_end_break__api_not_available(self, mocked_get_key, mocked_record_time, mocked_get_punch_queue):
+        self.mocked_is_kot_api_available.return_value = False
+        say = MagicMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        record_end_break(say=say, request=request)
+
+        self.assertEqual(mocked_record_time.call_count, 0)
+        self.assertEqual(
+            mocked_get_punch_queue.return_value.enqueue.call_args.kwargs["record_type"], RecordType.END_BREAK
+        )
+        self.assertIn("休憩終了として受け付けた", say.call_args[0][0])
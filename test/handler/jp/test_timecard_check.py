@@ -1,13 +1,63 @@
+import random
 import unittest
 from unittest import mock
 from unittest.mock import MagicMock
 
+from freezegun import freeze_time
+
+from components.chunked_fetcher import get_chunked_fetcher
+from components.records import compact_daily_schedules, compact_daily_workings
 from components.requester import KOTException
 from components.typing import SlackRequest
-from handler.jp.timecard_check import announce_timecard_errors
+from handler.jp.timecard_check import (
+    TimecardErrors,
+    _compute_error_map,
+    announce_timecard_errors,
+    check_timecard_errors_for_user,
+    get_daily_record_store_stats,
+    get_error_map_cache_stats,
+    invalidate_error_map_cache,
+)
+
+TIMECARD_DATA = [
+    {
+        "date": "2023-04-01",
+        "dailyWorkings": [
+            {
+                "isError": True,
+                "employeeKey": "key-0009",
+                "currentDateEmployee": {"code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+            },
+        ],
+    },
+]
+
+SCHEDULE_DATA = [
+    {
+        "date": "2023-04-01",
+        "dailySchedules": [
+            {
+                "scheduleTypeName": "通常勤務",
+                "employeeKey": "key-0009",
+                "currentDateEmployee": {"code": "0009", "lastName": "山田", "firstName": "伝蔵"},
+            },
+        ],
+    },
+]
 
+ACTIVE_EMPLOYEES = [{"code": "0009", "lastName": "山田", "firstName": "伝蔵"}]
 
+
+# 勤怠データは先月1日～前日の範囲で保持するので、テストデータの日付が範囲内になるように日時を固定する
+@freeze_time("2023-04-03 10:00:00")
 class TestTimecardCheck(unittest.TestCase):
+    def setUp(self) -> None:
+        invalidate_error_map_cache()
+        # 取得範囲を分割しないようにして、1回のチェックでKOTに1回ずつリクエストするようにする
+        patcher = mock.patch.object(get_chunked_fetcher(), "chunk_days", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
     @mock.patch("handler.jp.timecard_check.get_active_employees")
     @mock.patch("handler.jp.timecard_check.get_daily_schedule_data")
@@ -302,3 +352,356 @@ class TestTimecardCheck(unittest.TestCase):
 
         self.assertEqual(mocked_get_daily_timacard_data.call_count, 1)
         self.assertEqual(mocked_response_general_error.call_count, 1)
+
+    @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
+    @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("handler.jp.timecard_check.get_active_employees", return_value=ACTIVE_EMPLOYEES)
+    @mock.patch("handler.jp.timecard_check.get_daily_schedule_data", return_value=SCHEDULE_DATA)
+    @mock.patch("handler.jp.timecard_check.get_daily_timacard_data", return_value=TIMECARD_DATA)
+    def test_check_timecard_errors_for_user__cached(
+        self,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+        mocked_get_key,
+    ):
+        stats_before = get_error_map_cache_stats()
+        say = MagicMock()
+
+        for _ in range(3):
+            check_timecard_errors_for_user("dummy-user-id", say)
+
+        # 2回目以降はキャッシュが使われる
+        self.assertEqual(mocked_get_daily_timacard_data.call_count, 1)
+        self.assertEqual(mocked_get_daily_schedule_data.call_count, 1)
+        self.assertEqual(mocked_get_active_employees.call_count, 1)
+        self.assertEqual(say.call_count, 3)
+
+        stats = get_error_map_cache_stats()
+        self.assertEqual(stats["hits"] - stats_before["hits"], 2)
+        self.assertEqual(stats["misses"] - stats_before["misses"], 1)
+
+        # キャッシュを削除すると取得し直す
+        invalidate_error_map_cache()
+        check_timecard_errors_for_user("dummy-user-id", say)
+
+        self.assertEqual(mocked_get_daily_timacard_data.call_count, 2)
+
+    @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
+    @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("handler.jp.timecard_check.get_active_employees", return_value=ACTIVE_EMPLOYEES)
+    @mock.patch("handler.jp.timecard_check.get_daily_schedule_data", return_value=SCHEDULE_DATA)
+    @mock.patch("handler.jp.timecard_check.get_daily_timacard_data", return_value=TIMECARD_DATA)
+    def test_announce_timecard_errors__refresh_cache(
+        self,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+        mocked_get_key,
+    ):
+        say = MagicMock()
+        request = SlackRequest(channel_id="dummy-channel-id", user_id="dummy-user-id", text="dummy-text")
+
+        check_timecard_errors_for_user("dummy-user-id", say)
+        # アナウンスはキャッシュを使わずに取得し直す
+        announce_timecard_errors(say=say, request=request)
+
+        self.assertEqual(mocked_get_daily_timacard_data.call_count, 2)
+
+        # アナウンス時に取得したデータでキャッシュが更新されている
+        check_timecard_errors_for_user("dummy-user-id", say)
+
+        self.assertEqual(mocked_get_daily_timacard_data.call_count, 2)
+        self.assertEqual(say.call_count, 3)
+
+    @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
+    @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("handler.jp.timecard_check.get_active_employees", return_value=ACTIVE_EMPLOYEES)
+    @mock.patch("handler.jp.timecard_check.get_daily_schedule_data", return_value=SCHEDULE_DATA)
+    @mock.patch("handler.jp.timecard_check.get_daily_timacard_data", return_value=TIMECARD_DATA)
+    def test_check_timecard_errors_for_user__incremental_fetch(
+        self,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+        mocked_get_key,
+    ):
+        stats_before = get_daily_record_store_stats()["daily_workings"]
+        say = MagicMock()
+
+        # 初回は先月1日～前日までを取得する
+        check_timecard_errors_for_user("dummy-user-id", say)
+        mocked_get_daily_timacard_data.assert_called_once_with(
+            from_date="2023-03-01", to_date="2023-04-02", compact=compact_daily_workings
+        )
+        mocked_get_daily_schedule_data.assert_called_once_with(
+            from_date="2023-03-01", to_date="2023-04-02", compact=compact_daily_schedules
+        )
+
+        # 勤怠エラーのキャッシュが切れても、取得し直すのは直近の日だけ
+        invalidate_error_map_cache("2023-03-01", "2023-04-02")
+        check_timecard_errors_for_user("dummy-user-id", say)
+        mocked_get_daily_timacard_data.assert_called_with(
+            from_date="2023-03-27", to_date="2023-04-02", compact=compact_daily_workings
+        )
+        mocked_get_daily_schedule_data.assert_called_with(
+            from_date="2023-03-27", to_date="2023-04-02", compact=compact_daily_schedules
+        )
+
+        # 保持しているデータと取得し直したデータを合わせてチェックする
+        self.assertEqual(say.call_count, 2)
+        self.assertIn("2023-04-01", say.call_args.args[0])
+        stats = get_daily_record_store_stats()["daily_workings"]
+        self.assertEqual(stats["fetches"] - stats_before["fetches"], 2)
+        self.assertEqual(stats["reused_dates"] - stats_before["reused_dates"], 26)
+
+    @mock.patch("components.repo.Employee.get_key", return_value="key-0009")
+    @mock.patch("handler.jp.timecard_check.is_kot_api_available", return_value=True)
+    @mock.patch("handler.jp.timecard_check.get_active_employees", return_value=ACTIVE_EMPLOYEES)
+    @mock.patch("handler.jp.timecard_check.get_daily_schedule_data")
+    @mock.patch("handler.jp.timecard_check.get_daily_timacard_data")
+    def test_check_timecard_errors_for_user__chunked_fetch(
+        self,
+        mocked_get_daily_timacard_data,
+        mocked_get_daily_schedule_data,
+        mocked_get_active_employees,
+        mocked_is_kot_api_available,
+        mocked_get_key,
+    ):
+        # 範囲ごとに、その範囲の日付のデータだけを受信した順に変換して返す
+        mocked_get_daily_timacard_data.side_effect = lambda from_date, to_date, compact: [
+            compact(entry) for entry in TIMECARD_DATA if from_date <= entry["date"] <= to_date
+        ]
+        mocked_get_daily_schedule_data.side_effect = lambda from_date, to_date, compact: [
+            compact(entry) for entry in SCHEDULE_DATA if from_date <= entry["date"] <= to_date
+        ]
+        say = MagicMock()
+
+        with mock.patch.object(get_chunked_fetcher(), "chunk_days", 14):
+            check_timecard_errors_for_user("dummy-user-id", say)
+
+        # 先月1日～前日までを14日ごとに分割して取得する
+        expected_ranges = [
+            {"from_date": "2023-03-01", "to_date": "2023-03-14"},
+            {"from_date": "2023-03-15", "to_date": "2023-03-28"},
+            {"from_date": "2023-03-29", "to_date": "2023-04-02"},
+        ]
+        self.assertCountEqual(
+            mocked_get_daily_timacard_data.call_args_list,
+            [mock.call(**kwargs, compact=compact_daily_workings) for kwargs in expected_ranges],
+        )
+        self.assertCountEqual(
+            mocked_get_daily_schedule_data.call_args_list,
+            [mock.call(**kwargs, compact=compact_daily_schedules) for kwargs in expected_ranges],
+        )
+
+        self.assertEqual(say.call_count, 1)
+        self.assertIn("2023-04-01", say.call_args.args[0])
+
+
+class TestTimecardErrors(unittest.TestCase):
+    def test_build(self):
+        error_data = {
+            "2023-04-02": [
+                {"employeeKey": "key-0009", "isError": True},
+                {"employeeKey": "key-0010", "isError": True},
+            ],
+            "2023-04-01": [
+                {"employeeKey": "key-0009", "isError": True},
+                # 勤怠エラーと勤怠記録なしの両方に該当する場合
+                {"employeeKey": "key-0009", "isError": True},
+            ],
+        }
+
+        timecard_errors = TimecardErrors.build(error_data)
+
+        self.assertIs(timecard_errors.by_date, error_data)
+        self.assertDictEqual(
+            timecard_errors.dates_by_employee,
+            {"key-0009": ["2023-04-01", "2023-04-02"], "key-0010": ["2023-04-02"]},
+        )
+        self.assertListEqual(timecard_errors.dates_for("key-0010"), ["2023-04-02"])
+        self.assertListEqual(timecard_errors.dates_for("key-9999"), [])
+
+
+def _reference_compute_error_map(timecard_data: list, schedule_data: list, active_employee_codes: set) -> dict:
+    """
+    書き換え前の _compute_error_map（差分テスト用に同じ実装を残している）
+
+    Returns:
+        dict: 日付ごとのエラーデータ
+        { "2025-02-01": [{ "code": "0009", "lastName": "山田", "firstName": "伝蔵", "isError": True ...}] }
+    """
+
+    # ----------------------------------------
+    # 勤怠データから勤怠エラーの人を抽出
+    # ----------------------------------------
+
+    # 日付ごとのエラーデータ格納用
+    # 勤怠エラーがある人のデータを日付ごとに格納する
+    # { "2025-02-01": { "code": "0009", "lastName": "山田", "firstName": 伝蔵", "isError": True ....} }
+    error_data = {}
+
+    for daily_data in timecard_data:
+        error_timecard = []
+        for daily_working in daily_data["dailyWorkings"]:
+            if daily_working["isError"]:
+                error_timecard.append(daily_working)
+
+        if error_timecard:
+            timecard_date = daily_data.get("date", "不明")
+            error_data[timecard_date] = error_timecard
+
+    # ----------------------------------------
+    # スケジュールデータから勤怠情報なしの人を抽出
+    # ----------------------------------------
+
+    # 退職タイミングによって退職者の勤務予定が中途半端に作成されているため、退職者の勤務予定を除外する必要がある
+
+    # スケジュールで「通常勤務」の人と日付のマッピングを作成
+    scheduled_normal_work = {}
+    for daily_schedule in schedule_data:
+        schedule_date = daily_schedule.get("date", "")
+        daily_schedules = daily_schedule.get("dailySchedules", [])
+
+        for schedule in daily_schedules:
+            # 従業員番号比較で退職者のデータは除外
+            if schedule.get("currentDateEmployee", {}).get("code") not in active_employee_codes:
+                continue
+
+            # 通常勤務のスケジュールのみ対象
+            if schedule.get("scheduleTypeName") == "通常勤務":
+                employee = schedule.get("currentDateEmployee", {})
+                employee_key = schedule.get("employeeKey", "")
+
+                if schedule_date not in scheduled_normal_work:
+                    scheduled_normal_work[schedule_date] = []
+
+                scheduled_normal_work[schedule_date].append(
+                    {"employeeKey": employee_key, "currentDateEmployee": employee}
+                )
+
+    # 勤怠データから勤怠記録がある社員のキーを日付ごとに抽出
+    timecard_recorded = {}
+    for daily_data in timecard_data:
+        timecard_date = daily_data.get("date", "")
+        daily_workings = daily_data.get("dailyWorkings", [])
+
+        if timecard_date not in timecard_recorded:
+            timecard_recorded[timecard_date] = set()
+
+        for working in daily_workings:
+            employee_key = working.get("employeeKey", "")
+            timecard_recorded[timecard_date].add(employee_key)
+
+    # スケジュールでは「通常勤務」だが勤怠記録がない社員を抽出
+    for day, employees in scheduled_normal_work.items():
+        # その日の勤怠記録がある社員のセット
+        recorded_employees = timecard_recorded.get(day, set())
+        missing_timecard = []
+
+        for employee_data in employees:
+            employee_key = employee_data.get("employeeKey", "")
+            # 勤怠記録がない場合
+            if employee_key not in recorded_employees:
+                # エラー情報として追加
+                employee_info = employee_data.get("currentDateEmployee", {})
+                missing_timecard.append(
+                    {
+                        "employeeKey": employee_key,
+                        "currentDateEmployee": employee_info,
+                        "isError": True,  # 勤怠記録なしもエラー扱い
+                    }
+                )
+
+        # エラーデータに追加
+        if missing_timecard:
+            if day in error_data:
+                error_data[day].extend(missing_timecard)
+            else:
+                error_data[day] = missing_timecard
+
+    return error_data
+
+
+def _generate_dataset(seed: int, days: int, employees: int):
+    """勤怠エラー・勤怠記録なし・退職者・通常勤務以外の予定を含む合成データを作る"""
+    rng = random.Random(seed)
+    codes = [f"{i:04d}" for i in range(employees)]
+    active_employee_codes = {code for code in codes if rng.random() > 0.05}
+
+    timecard_data = []
+    schedule_data = []
+    for day in range(days):
+        date_str = f"2023-{day // 28 + 1:02d}-{day % 28 + 1:02d}"
+        daily_workings = []
+        daily_schedules = []
+        for code in codes:
+            employee = {"code": code, "lastName": f"姓{code}", "firstName": f"名{code}"}
+            schedule_type = rng.choice(["通常勤務", "通常勤務", "通常勤務", "法定休日", "所定休日"])
+            daily_schedules.append(
+                {"scheduleTypeName": schedule_type, "employeeKey": f"key-{code}", "currentDateEmployee": employee}
+            )
+            if rng.random() < 0.9:
+                daily_workings.append(
+                    {"isError": rng.random() < 0.05, "employeeKey": f"key-{code}", "currentDateEmployee": employee}
+                )
+        timecard_data.append({"date": date_str, "dailyWorkings": daily_workings})
+        schedule_data.append({"date": date_str, "dailySchedules": daily_schedules})
+
+    # 同じ日付が複数回出てくる・日付がないといった崩れたデータ
+    timecard_data.append({"dailyWorkings": [{"isError": True, "employeeKey": "key-0000"}]})
+    timecard_data.append({"date": "2023-01-01", "dailyWorkings": [{"isError": True, "employeeKey": "key-9999"}]})
+    schedule_data.append({"date": "2023-01-02", "dailySchedules": schedule_data[0]["dailySchedules"]})
+    schedule_data.append({"dailySchedules": schedule_data[1]["dailySchedules"]})
+    rng.shuffle(schedule_data)
+
+    return timecard_data, schedule_data, active_employee_codes
+
+
+class TestComputeErrorMap(unittest.TestCase):
+    def test_compute_error_map__same_as_reference(self):
+        for seed in range(3):
+            timecard_data, schedule_data, active_employee_codes = _generate_dataset(seed, days=62, employees=300)
+
+            expected = _reference_compute_error_map(timecard_data, schedule_data, active_employee_codes)
+            actual = _compute_error_map(timecard_data, schedule_data, active_employee_codes)
+
+            self.assertEqual(actual, expected)
+            # 日付の並び順も変わらない
+            self.assertListEqual(list(actual.keys()), list(expected.keys()))
+
+    def test_compute_error_map__iterators(self):
+        timecard_data, schedule_data, active_employee_codes = _generate_dataset(10, days=31, employees=100)
+
+        expected = _reference_compute_error_map(timecard_data, schedule_data, active_employee_codes)
+        actual = _compute_error_map(
+            (daily_data for daily_data in timecard_data),
+            (daily_schedule for daily_schedule in schedule_data),
+            active_employee_codes,
+        )
+
+        self.assertEqual(actual, expected)
+        self.assertListEqual(list(actual.keys()), list(expected.keys()))
+
+    def test_compute_error_map__compact_records(self):
+        timecard_data, schedule_data, active_employee_codes = _generate_dataset(20, days=31, employees=100)
+        # 日付がないデータは保持しないので除く
+        timecard_data = [daily_data for daily_data in timecard_data if "date" in daily_data]
+        schedule_data = [daily_schedule for daily_schedule in schedule_data if "date" in daily_schedule]
+
+        expected = _reference_compute_error_map(timecard_data, schedule_data, active_employee_codes)
+        actual = _compute_error_map(
+            [compact_daily_workings(daily_data) for daily_data in timecard_data],
+            [compact_daily_schedules(daily_schedule) for daily_schedule in schedule_data],
+            active_employee_codes,
+        )
+
+        self.assertEqual(actual, expected)
+        self.assertListEqual(list(actual.keys()), list(expected.keys()))
+
+    def test_compute_error_map__empty(self):
+        self.assertDictEqual(_compute_error_map(iter([]), iter([]), set()), {})
@@ -0,0 +1,77 @@
+import asyncio
+import importlib.util
+import json
+import unittest
+from test.mock_web_api_server import cleanup_mock_web_api_server, setup_mock_web_api_server
+from test.test_run import _create_command_event, _create_message_event
+from unittest import mock
+
+# asyncio 版は aiohttp がインストールされている場合のみテストする
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+if HAS_AIOHTTP:
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+    from run_async import create_async_app
+
+
+def _to_async_request(request):
+    if request.mode == "socket_mode":
+        return AsyncBoltRequest(body=json.dumps(request.body), mode=request.mode)
+    return AsyncBoltRequest(body=request.raw_body, headers=request.headers)
+
+
+async def _wait_for_await(mocked, timeout=1.0):
+    # メッセージイベントのリスナーは ack の後にバックグラウンドで実行される
+    for _ in range(int(timeout / 0.01)):
+        if mocked.await_count:
+            return
+        await asyncio.sleep(0.01)
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp is not installed")
+class TestAsyncApp(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        setup_mock_web_api_server(self)
+
+    def tearDown(self) -> None:
+        cleanup_mock_web_api_server(self)
+
+    @mock.patch("run_async.record_clock_in", new_callable=mock.AsyncMock)
+    async def test_app__message__record_clock_in(self, mocked_record_clock_in):
+        app = create_async_app(is_test=True)
+
+        response = await app.async_dispatch(_to_async_request(_create_message_event(text="おはー")))
+
+        self.assertEqual(response.status, 200)
+        await _wait_for_await(mocked_record_clock_in)
+        self.assertEqual(mocked_record_clock_in.await_count, 1)
+
+    @mock.patch("run_async.record_clock_out", new_callable=mock.AsyncMock)
+    async def test_app__message__record_clock_out(self, mocked_record_clock_out):
+        app = create_async_app(is_test=True)
+
+        response = await app.async_dispatch(_to_async_request(_create_message_event(text="おつー")))
+
+        self.assertEqual(response.status, 200)
+        await _wait_for_await(mocked_record_clock_out)
+        self.assertEqual(mocked_record_clock_out.await_count, 1)
+
+    @mock.patch("run_async.record_clock_in", new_callable=mock.AsyncMock)
+    async def test_app__command__record_clock_in(self, mocked_record_clock_in):
+        app = create_async_app(is_test=True)
+
+        response = await app.async_dispatch(_to_async_request(_create_command_event(command="/clock-in")))
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(mocked_record_clock_in.await_count, 1)
+
+    @mock.patch("run_async.register_employee_code", new_callable=mock.AsyncMock)
+    async def test_app__command__register_employee_code(self, mocked_register_employee_code):
+        app = create_async_app(is_test=True)
+
+        response = await app.async_dispatch(
+            _to_async_request(_create_command_event(command="/employee-code", text="1234"))
+        )
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(mocked_register_employee_code.await_count, 1)